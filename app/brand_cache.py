@@ -0,0 +1,106 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .workers import cache_maxsize
+
+BRAND_CACHE_TTL = float(os.getenv("BRAND_CACHE_TTL", "60"))
+BRAND_CACHE_MAXSIZE = cache_maxsize("brand", "BRAND_CACHE_MAXSIZE", 10000)
+
+# 상품 조인에 필요한 필드만 가져온다
+BRAND_PROJECTION = {"_id": 0, "id": 1, "brand_kor": 1, "brand_eng": 1, "like_count": 1}
+
+_MISSING = object()
+
+
+class BrandCache:
+    """
+    브랜드 문서 인-프로세스 캐시 (TTL + LRU 크기 제한)
+    - 없는 브랜드도 None 으로 캐시해서 반복 조회를 막는다
+    - like_brand / unlike_brand 에서 invalidate 호출
+    - invalidate 는 세대(epoch)를 올린다. 조회 중 세대가 바뀌면 조회 결과는 돌려주기만 하고 캐시하지 않는다
+      (무효화 전에 읽은 문서가 TTL 동안 다시 남지 않도록)
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[float, Optional[dict]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._epoch = 0
+
+    def _lookup(self, brand_id: int, now: float):
+        entry = self._entries.get(brand_id)
+        if entry is None:
+            return _MISSING
+        expires_at, doc = entry
+        if expires_at <= now:
+            del self._entries[brand_id]
+            return _MISSING
+        self._entries.move_to_end(brand_id)
+        return doc
+
+    def _store(self, brand_id: int, doc: Optional[dict], now: float):
+        self._entries[brand_id] = (now + self.ttl, doc)
+        self._entries.move_to_end(brand_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, coll: AsyncIOMotorCollection, brand_ids: Iterable[Optional[int]]) -> Dict[int, dict]:
+        now = time.monotonic()
+        found: Dict[int, dict] = {}
+        missing = []
+        for brand_id in {b for b in brand_ids if b is not None}:
+            doc = self._lookup(brand_id, now)
+            if doc is _MISSING:
+                missing.append(brand_id)
+                continue
+            self.hits += 1
+            if doc is not None:
+                found[brand_id] = doc
+
+        if missing:
+            self.misses += len(missing)
+            epoch = self._epoch
+            docs = await coll.find({"id": {"$in": missing}}, BRAND_PROJECTION).to_list(length=None)
+            fetched = {d["id"]: d for d in docs}
+            for brand_id in missing:
+                doc = fetched.get(brand_id)
+                if epoch == self._epoch:
+                    self._store(brand_id, doc, now)
+                if doc is not None:
+                    found[brand_id] = doc
+        return found
+
+    async def get(self, coll: AsyncIOMotorCollection, brand_id: Optional[int]) -> Optional[dict]:
+        if brand_id is None:
+            return None
+        return (await self.get_many(coll, [brand_id])).get(brand_id)
+
+    def invalidate(self, brand_id: Optional[int] = None):
+        self._epoch += 1
+        if brand_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(brand_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+brand_cache = BrandCache(BRAND_CACHE_TTL, BRAND_CACHE_MAXSIZE)
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .singleflight import get_flight
+from .workers import WEB_CONCURRENCY, cache_maxsize
+
+logger = logging.getLogger("product")
+
+# redis | memory | off (기본: REDIS_URL 이 있으면 redis, 없으면 memory)
+# memory 는 워커마다 따로라 다른 워커/파드의 쓰기는 change stream 으로만 무효화된다
+#   - change stream 동작 중: 변경 이벤트 지연(보통 1초 미만)만큼 이전 응답
+#   - change stream 이 없거나 끊긴 동안: 최대 PRODUCT_CACHE_TTL / LIST_CACHE_TTL 초 동안 이전 응답
+# 그래서 워커가 여러 개인데 change stream 이 꺼져 있으면 memory 를 쓰지 않는다 (build_response_cache)
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "")
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", "30"))
+LIST_CACHE_TTL = int(os.getenv("LIST_CACHE_TTL", "15"))
+# 목록 캐시 세대(generation) 값을 프로세스에 들고 있는 시간(초). 다른 파드의 무효화 반영 지연 상한
+CACHE_GEN_LOCAL_TTL = float(os.getenv("CACHE_GEN_LOCAL_TTL", "1.0"))
+# 목록 무효화(로컬 쓰기 또는 change stream) 후 이 시간(초) 동안 목록 캐시는 primary 에서 채운다
+# secondary 가 쓰기를 아직 복제하지 못해 이전 목록이 LIST_CACHE_TTL 동안 캐시되는 것을 막는다
+CACHE_PRIMARY_READ_WINDOW = float(os.getenv("CACHE_PRIMARY_READ_WINDOW", "5"))
+MEMORY_CACHE_MAXSIZE = cache_maxsize("response", "MEMORY_CACHE_MAXSIZE", 10000)
+
+KEY_PREFIX = "product-svc:v1"
+
+
+class MemoryBackend:
+    """
+    Redis 없이 쓰는 인-프로세스 백엔드 (테스트/로컬용). Redis 명령 중 필요한 것만 흉내낸다
+    - incr 카운터(목록 세대 등)는 크기 제한 밖에 따로 둔다. 밀려나서 0 으로 돌아가면 이전 세대 목록이 다시 적중한다
+    """
+
+    def __init__(self, maxsize: int = MEMORY_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+        self._counters: Dict[str, int] = {}
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        if key in self._counters:
+            return str(self._counters[key])
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        self._counters.pop(key, None)
+        if len(self._data) >= self.maxsize and key not in self._data:
+            # 가장 오래 넣은 키부터 제거 (dict 삽입 순서)
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + ex if ex else None, value)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        if key not in self._counters:
+            self._counters[key] = int(self._live(key) or 0)
+            self._data.pop(key, None)
+        self._counters[key] += 1
+        return self._counters[key]
+
+
+class RedisBackend:
+    """redis.asyncio 래퍼. 캐시 장애는 요청 실패가 아니라 미스로 처리한다"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self.redis.get(key)
+        except RedisError as e:
+            self._error("get", e)
+            return None
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        try:
+            await self.redis.set(key, value, ex=ex)
+        except RedisError as e:
+            self._error("set", e)
+
+    async def delete(self, *keys: str):
+        try:
+            await self.redis.delete(*keys)
+        except RedisError as e:
+            self._error("delete", e)
+
+    async def incr(self, key: str) -> int:
+        try:
+            return await self.redis.incr(key)
+        except RedisError as e:
+            self._error("incr", e)
+            return 0
+
+    def _error(self, op: str, e: Exception):
+        self.errors += 1
+        logger.warning(f"cache_error\top={op}\terror={e}")
+
+
+def _dumps(value: Any) -> str:
+    # 응답 본문이 되는 텍스트. Redis 클라이언트가 decode_responses 라 str 로 저장
+    return orjson.dumps(value).decode()
+
+
+class ResponseCache:
+    """
+    read-through 응답 캐시
+    - 상품 상세: product:{id}. 채울 때 product-oid:{_id} -> id 도 같은 TTL 로 남긴다
+      (pre-image 없는 삭제 change 이벤트는 documentKey._id 만 있으므로 이것으로 id 를 찾는다)
+    - 목록: list:{세대}:{정규화된 파라미터 해시}. 상품 쓰기 시 세대를 올려 한 번에 무효화
+    - 같은 키 동시 미스는 SingleFlight(핸들러별 이름) 로 한 번만 Mongo 조회
+    - 목록 무효화 직후 CACHE_PRIMARY_READ_WINDOW 초 동안은 read_from_primary() 가 True (목록을 primary 에서 채움)
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._gen: Optional[Tuple[float, str]] = None
+        self._primary_until = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def product_key(id: int) -> str:
+        return f"{KEY_PREFIX}:product:{id}"
+
+    @staticmethod
+    def product_oid_key(oid: Any) -> str:
+        return f"{KEY_PREFIX}:product-oid:{oid}"
+
+    @staticmethod
+    def params_hash(params: Dict[str, Any]) -> str:
+        normalized = {k: v for k, v in params.items() if v is not None and v != ""}
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def _list_generation(self) -> str:
+        now = time.monotonic()
+        if self._gen and self._gen[0] > now:
+            return self._gen[1]
+        gen = await self.backend.get(f"{KEY_PREFIX}:list-gen") or "0"
+        self._gen = (now + CACHE_GEN_LOCAL_TTL, gen)
+        return gen
+
+    async def list_key(self, kind: str, params: Dict[str, Any]) -> str:
+        return f"{KEY_PREFIX}:{kind}:{await self._list_generation()}:{self.params_hash(params)}"
+
+    async def get_or_load_text(self, key: str, ttl: int, loader: Callable[[], Awaitable[Any]],
+                               flight: str = "cache") -> Optional[str]:
+        """
+        loader 결과(JSON 직렬화 가능한 값)를 JSON 텍스트로 캐시하고 텍스트를 돌려준다. None 은 캐시하지 않는다
+        - 적중 시 파싱/재직렬화 없이 그대로 응답 본문으로 쓴다
+        """
+        async def dump():
+            value = await loader()
+            return None if value is None else _dumps(value)
+
+        if not self.enabled:
+            # 캐시를 꺼도 동시에 들어온 같은 요청은 한 번만 조회
+            return await get_flight(flight).do(key, dump)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        async def load():
+            text = await dump()
+            if text is not None:
+                await self.backend.set(key, text, ex=ttl)
+            return text
+
+        self.misses += 1
+        return await get_flight(flight).do(key, load)
+
+    async def put(self, key: str, value: Any, ttl: int):
+        """미리 채우기(warm-up)용"""
+        if self.enabled and value is not None:
+            await self.backend.set(key, _dumps(value), ex=ttl)
+
+    async def remember_product_oid(self, oid: Any, id: int, ttl: int):
+        if self.enabled:
+            await self.backend.set(self.product_oid_key(oid), str(id), ex=ttl)
+
+    async def product_id_for(self, oid: Any) -> Optional[int]:
+        """상세 캐시를 채운 상품의 Mongo _id -> id. 모르면(캐시에 없으면) None"""
+        if not self.enabled:
+            return None
+        value = await self.backend.get(self.product_oid_key(oid))
+        return int(value) if value is not None else None
+
+    async def invalidate_product(self, id: int):
+        if self.enabled:
+            await self.backend.delete(self.product_key(id))
+
+    async def invalidate_products(self, ids: List[int]):
+        """여러 상품 상세 키를 삭제 명령 한 번으로"""
+        if self.enabled and ids:
+            await self.backend.delete(*(self.product_key(id) for id in ids))
+
+    async def invalidate_lists(self):
+        if self.enabled:
+            now = time.monotonic()
+            self._primary_until = now + CACHE_PRIMARY_READ_WINDOW
+            gen = await self.backend.incr(f"{KEY_PREFIX}:list-gen")
+            self._gen = (now + CACHE_GEN_LOCAL_TTL, str(gen))
+
+    def read_from_primary(self) -> bool:
+        """최근 무효화 이후라 secondary 가 아직 쓰기를 복제하지 못했을 수 있으면 True"""
+        return time.monotonic() < self._primary_until
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "backend_errors": getattr(self.backend, "errors", 0),
+        }
+
+
+def build_response_cache(redis: Optional[Redis], change_stream: bool = True,
+                         mode: str = RESPONSE_CACHE, workers: int = WEB_CONCURRENCY) -> ResponseCache:
+    """
+    응답 캐시 구성
+    - 워커가 여러 개면 memory 는 change stream 무효화가 있을 때만 쓴다
+      RESPONSE_CACHE=memory 를 명시했으면 기동 실패, 기본값이면 캐시를 끈다 (경고 로그)
+    """
+    explicit = bool(mode)
+    mode = mode or ("redis" if redis is not None else "memory")
+    if mode == "redis" and redis is not None:
+        return ResponseCache(RedisBackend(redis))
+    if mode == "memory" and workers > 1 and not change_stream:
+        message = (f"RESPONSE_CACHE=memory 는 워커 {workers}개에서 다른 워커의 쓰기를 무효화하지 못합니다. "
+                   f"REDIS_URL 을 설정하거나 CHANGE_STREAM_ENABLED=true 로 두세요.")
+        if explicit:
+            raise RuntimeError(message)
+        logger.warning(f"response_cache_disabled\tworkers={workers}\treason=no_shared_invalidation")
+        mode = "off"
+    return ResponseCache(MemoryBackend(), enabled=mode != "off")
@@ -0,0 +1,242 @@
+"""
+Mongo change stream 소비자
+
+다른 파드/서비스가 쓴 변경을 받아 로컬 캐시(브랜드 캐시, 상품 상세/목록 캐시, 랭킹)에 반영한다.
+- DB 단위 스트림 하나로 product / brand / likes / brand_likes 를 함께 구독
+- 컬렉션별 핸들러는 subscribe 로 등록 (핸들러는 change 문서를 받는다)
+- resume token 은 change_stream_tokens 컬렉션에 주기적으로 저장하고, 재기동/재연결 시 이어서 읽는다
+  (호스트/슬롯마다 문서 하나. 파드가 바뀌며 남는 문서는 updated_at TTL 로 지워진다)
+- 토큰이 oplog 밖으로 밀려났으면(ChangeStreamHistoryLost) 지금부터 다시 읽고 reset_handlers 로 전체 무효화
+- 조회/구매 카운터만 바뀐 상품 update 는 서버 쪽 $match 에서 버린다 (이벤트 flush 마다 생기고, 캐시는 TTL 로 갱신)
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .workers import slot_path
+
+logger = logging.getLogger("product")
+
+CHANGE_STREAM_ENABLED = os.getenv("CHANGE_STREAM_ENABLED", "true").lower() == "true"
+# 토큰 저장 키. 워커마다 자기 캐시를 갖고 있으므로 기본은 호스트명 (멀티 워커면 .<슬롯> 이 붙는다)
+CHANGE_STREAM_NAME = os.getenv("CHANGE_STREAM_NAME", socket.gethostname())
+CHANGE_STREAM_TOKEN_SAVE_INTERVAL = float(os.getenv("CHANGE_STREAM_TOKEN_SAVE_INTERVAL", "5"))
+CHANGE_STREAM_MAX_AWAIT_MS = int(os.getenv("CHANGE_STREAM_MAX_AWAIT_MS", "1000"))
+CHANGE_STREAM_RETRY_DELAY = float(os.getenv("CHANGE_STREAM_RETRY_DELAY", "2"))
+# 이 기간 저장되지 않은 토큰 문서는 TTL 삭제 (oplog 보관 기간보다 길면 어차피 이어 읽을 수 없다)
+CHANGE_STREAM_TOKEN_RETENTION_DAYS = int(os.getenv("CHANGE_STREAM_TOKEN_RETENTION_DAYS", "7"))
+# 삭제 이벤트에서 id 를 알려면 pre-image 필요 (MongoDB 6.0+, 컬렉션에 changeStreamPreAndPostImages 설정)
+# off | whenAvailable
+CHANGE_STREAM_PRE_IMAGES = os.getenv("CHANGE_STREAM_PRE_IMAGES", "off")
+
+TOKEN_COLLECTION = "change_stream_tokens"
+WATCHED_COLLECTIONS = ("product", "brand", "likes", "brand_likes")
+# 컬렉션 -> 이 필드들만 바뀐 update 는 받지 않는다
+IGNORED_UPDATE_FIELDS = {"product": ("view_count", "purchase_count")}
+
+# 핸들러에 필요한 필드만 받는다 (_id 는 resume token 이라 빼면 안 됨)
+CHANGE_PROJECTION = {
+    "operationType": 1, "ns": 1, "documentKey": 1, "updateDescription.updatedFields": 1,
+    "fullDocument.id": 1, "fullDocument.brand_id": 1, "fullDocument.user_id": 1,
+    "fullDocumentBeforeChange.id": 1, "fullDocumentBeforeChange.user_id": 1,
+}
+
+# ChangeStreamHistoryLost / resume token 을 찾을 수 없음
+_HISTORY_LOST_CODES = {280, 286}
+
+Handler = Callable[[dict], Any]
+
+
+def change_id(change: dict) -> Optional[int]:
+    """변경된 문서의 서비스 id. 삭제 이벤트는 pre-image 가 있어야 알 수 있다"""
+    for field in ("fullDocument", "fullDocumentBeforeChange"):
+        doc = change.get(field)
+        if doc and doc.get("id") is not None:
+            return doc["id"]
+    return None
+
+
+def ignore_updates_stage(ignored: Dict[str, Iterable[str]]) -> Optional[dict]:
+    """ignored 의 필드만 바뀐(삭제된 필드 없음) update 를 걸러내는 $match"""
+    if not ignored:
+        return None
+    updated_keys = {"$map": {
+        "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+        "in": "$$this.k",
+    }}
+    conditions = [
+        {"$and": [
+            {"$eq": ["$ns.coll", coll]},
+            {"$setIsSubset": [updated_keys, list(fields)]},
+        ]}
+        for coll, fields in ignored.items()
+    ]
+    return {"$match": {"$expr": {"$not": [{"$and": [
+        {"$eq": ["$operationType", "update"]},
+        {"$eq": [{"$size": {"$ifNull": ["$updateDescription.removedFields", []]}}, 0]},
+        {"$or": conditions},
+    ]}]}}}
+
+
+class ChangeStreamConsumer:
+    def __init__(self, db: AsyncIOMotorDatabase, collections=WATCHED_COLLECTIONS, name: str = CHANGE_STREAM_NAME,
+                 save_interval: float = CHANGE_STREAM_TOKEN_SAVE_INTERVAL,
+                 ignored_updates: Dict[str, Iterable[str]] = IGNORED_UPDATE_FIELDS):
+        self.db = db
+        self.collections = list(collections)
+        self.ignored_updates = ignored_updates
+        # 같은 파드의 워커들이 한 토큰 문서를 번갈아 덮어쓰지 않도록 워커 슬롯별로
+        self.name = slot_path(name)
+        self.save_interval = save_interval
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self.reset_handlers: List[Callable[[], Any]] = []
+        self._token: Optional[dict] = None
+        self._saved_token: Optional[dict] = None
+        self._task = None
+
+        self.events = 0
+        self.handler_errors = 0
+        self.resets = 0
+        self.reconnects = 0
+        self.running = False
+        self.last_event_at: Optional[float] = None
+
+    def subscribe(self, collection: str, handler: Handler):
+        self._handlers[collection].append(handler)
+
+    # ───── resume token ─────
+    async def _load_token(self) -> Optional[dict]:
+        doc = await self.db[TOKEN_COLLECTION].find_one({"_id": self.name})
+        return doc.get("token") if doc else None
+
+    async def _save_token(self):
+        if self._token is None or self._token == self._saved_token:
+            return
+        await self.db[TOKEN_COLLECTION].update_one(
+            {"_id": self.name},
+            {"$set": {"token": self._token, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        self._saved_token = self._token
+
+    # ───── 처리 ─────
+    async def _dispatch(self, change: dict):
+        self.events += 1
+        self.last_event_at = time.time()
+        for handler in self._handlers.get(change["ns"]["coll"], []):
+            try:
+                res = handler(change)
+                if inspect.isawaitable(res):
+                    await res
+            except Exception as e:
+                # 캐시 반영 실패가 스트림을 멈추지 않도록 (TTL 이 결국 정리한다)
+                self.handler_errors += 1
+                logger.error(f"change_stream_handler_failed\tcoll={change['ns']['coll']}\terror={e}")
+
+    async def _reset(self):
+        self.resets += 1
+        self._token = None
+        for handler in self.reset_handlers:
+            res = handler()
+            if inspect.isawaitable(res):
+                await res
+
+    async def _consume(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        ignore = ignore_updates_stage(self.ignored_updates)
+        if ignore is not None:
+            pipeline.append(ignore)
+        pipeline.append({"$project": CHANGE_PROJECTION})
+        options = {}
+        if CHANGE_STREAM_PRE_IMAGES != "off":
+            options["full_document_before_change"] = CHANGE_STREAM_PRE_IMAGES
+        async with self.db.watch(
+                pipeline,
+                full_document="updateLookup",
+                resume_after=self._token,
+                max_await_time_ms=CHANGE_STREAM_MAX_AWAIT_MS,
+                **options,
+        ) as stream:
+            self.running = True
+            next_save = time.monotonic() + self.save_interval
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    await self._dispatch(change)
+                # 이벤트가 없어도 postBatchResumeToken 이 전진하므로 같이 저장
+                self._token = stream.resume_token
+                if time.monotonic() >= next_save:
+                    await self._save_token()
+                    next_save = time.monotonic() + self.save_interval
+
+    async def _run(self):
+        try:
+            self._token = self._saved_token = await self._load_token()
+        except PyMongoError as e:
+            logger.warning(f"change_stream_token_load_failed\terror={e}")
+        reset_pending = False
+        while True:
+            if reset_pending:
+                # 전체 무효화가 끝나기 전에는 스트림을 다시 열지 않는다 (실패하면 재시도)
+                try:
+                    await self._reset()
+                    reset_pending = False
+                except Exception as e:
+                    logger.error(f"change_stream_reset_failed\terror={e}")
+                    await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY)
+                    continue
+            try:
+                await self._consume()
+            except OperationFailure as e:
+                if e.code in _HISTORY_LOST_CODES:
+                    logger.warning(f"change_stream_history_lost\terror={e}")
+                    reset_pending = True
+                    continue
+                # 40573: 단일 노드(레플리카셋 아님)에서는 change stream 불가
+                logger.error(f"change_stream_unavailable\terror={e}")
+                self.running = False
+                return
+            except PyMongoError as e:
+                self.reconnects += 1
+                logger.warning(f"change_stream_reconnect\terror={e}")
+            finally:
+                self.running = False
+            await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY)
+
+    # ───── 백그라운드 태스크 ─────
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._save_token()
+        except PyMongoError as e:
+            logger.warning(f"change_stream_token_save_failed\terror={e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "running": self.running,
+            "events": self.events,
+            "handler_errors": self.handler_errors,
+            "resets": self.resets,
+            "reconnects": self.reconnects,
+            "idle_seconds": round(time.time() - self.last_event_at, 3) if self.last_event_at else None,
+        }
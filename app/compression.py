@@ -0,0 +1,180 @@
+"""
+응답 압축 (brotli / gzip)
+
+- Accept-Encoding 에 br 이 있고 brotli 패키지가 설치돼 있으면 br, 아니면 gzip
+- COMPRESS_MIN_SIZE 보다 작은 응답, 이미 Content-Encoding 이 있는 응답(304 포함 본문 없는 응답)은 그대로
+- 압축 여부와 상관없이 모든 응답에 Vary: Accept-Encoding (공유 캐시가 다른 인코딩 변형을 섞어 주지 않도록)
+- 스트리밍 응답(export / 좋아요 목록 stream)은 br/gzip 모두 청크마다 flush 해서 바로 내보낸다
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip 만
+    brotli = None
+
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# 요청 경로에서 압축하므로 CPU 비용이 낮은 레벨을 기본으로
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "5"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+
+def add_vary(message: Message):
+    """http.response.start 메시지 헤더에 Vary: Accept-Encoding (제자리 수정)"""
+    MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+
+
+def accepted(header: str, coding: str) -> bool:
+    """Accept-Encoding 에 coding 이 q>0 으로 들어 있는지"""
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() != coding:
+            continue
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class CompressionResponder:
+    """
+    GZipResponder 와 같은 흐름 (작은 응답/이미 인코딩된 응답은 그대로)
+    - 스트리밍 응답은 청크마다 compressor 를 flush 해서, 받은 만큼 클라이언트가 바로 풀 수 있게 한다
+    """
+
+    encoding = ""
+
+    def __init__(self, app: ASGIApp, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _start_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # 본문을 보기 전까지 헤더를 보류
+            self.initial_message = message
+            self.passthrough = "content-encoding" in Headers(raw=message["headers"])
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if self.passthrough or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                add_vary(self.initial_message)
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            headers = self._start_headers()
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compress(body) + self.flush()
+            else:
+                message["body"] = self.compress(body) + self.finish()
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if not self.passthrough:
+            chunk = self.compress(body)
+            message["body"] = chunk + (self.flush() if more_body else self.finish())
+        await self.send(message)
+
+
+class BrotliResponder(CompressionResponder):
+    encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes) -> bytes:
+        return self.compressor.process(body)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class GzipResponder(CompressionResponder):
+    """starlette GZipResponder 는 스트리밍 청크를 GzipFile 안에 모아 두므로 zlib 로 직접 (Z_SYNC_FLUSH)"""
+
+    encoding = "gzip"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, level: int):
+        super().__init__(app, minimum_size)
+        # wbits 16+ : gzip 헤더/트레일러
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes) -> bytes:
+        return self.compressor.compress(body)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            if brotli is not None and accepted(accept, "br"):
+                await BrotliResponder(self.app, self.minimum_size, COMPRESS_BROTLI_QUALITY)(scope, receive, send)
+                return
+            if accepted(accept, "gzip"):
+                await GzipResponder(self.app, self.minimum_size, COMPRESS_GZIP_LEVEL)(scope, receive, send)
+                return
+
+            async def send_with_vary(message: Message):
+                if message["type"] == "http.response.start":
+                    add_vary(message)
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,399 @@
+import asyncio
+import inspect
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from .workers import run_once, slot_path
+
+logger = logging.getLogger("product")
+
+# direct: 요청마다 $inc / buffered: 메모리에 모았다가 주기적으로 bulk_write
+LIKE_COUNTER_MODE = os.getenv("LIKE_COUNTER_MODE", "direct")
+LIKE_COUNTER_FLUSH_INTERVAL = float(os.getenv("LIKE_COUNTER_FLUSH_INTERVAL", "1.0"))
+LIKE_COUNTER_SHARDS = int(os.getenv("LIKE_COUNTER_SHARDS", "16"))
+# 비어 있으면 저널 비활성화. 설정 시 flush 전 델타를 append-only 파일에 기록(프로세스 크래시 대비)
+# 멀티 워커면 워커 슬롯별 파일 (경로.<슬롯>)
+LIKE_COUNTER_JOURNAL = os.getenv("LIKE_COUNTER_JOURNAL", "")
+# 0 이면 비활성화. likes / brand_likes 에서 like_count 를 재계산해 드리프트 보정
+# buffered 모드에서만, 주기마다 클러스터 전체에서 한 워커만 (run_once)
+LIKE_RECONCILE_INTERVAL = float(os.getenv("LIKE_RECONCILE_INTERVAL", "3600"))
+# 보정 후보를 다시 확인하기 전 대기(초). 다른 워커의 미 flush 델타가 반영될 때까지 (flush 주기보다 길게)
+LIKE_RECONCILE_SETTLE = float(os.getenv("LIKE_RECONCILE_SETTLE", str(max(5.0, LIKE_COUNTER_FLUSH_INTERVAL * 3))))
+
+Key = Tuple[str, int]
+
+
+class JournalWriter:
+    """
+    저널 기록 스레드 (shared/logging_config 의 BatchQueueListener 와 같은 방식)
+    - write 는 큐에 줄을 넣기만 한다. 이벤트 루프에서 파일 I/O 를 하지 않는다
+    - 스레드가 깨어날 때 모인 줄을 write 1회 + flush 1회로 기록
+    - 저널 교체/삭제도 같은 큐로 보내 줄 기록과 순서를 맞춘다 (교체 전에 넣은 줄은 교체 전 파일에)
+    - 크래시 시 잃는 델타는 아직 큐에 남아 있던 줄뿐 (보통 한 배치)
+    """
+
+    _sentinel = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.written = 0
+        self.errors = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._monitor, name="like-journal-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        self.queue.put(line)
+
+    def rotate(self, flushing: str):
+        """지금까지 넣은 줄이 기록된 뒤 저널을 flushing 경로로 옮기고 새 저널을 연다"""
+        self.queue.put(lambda: self._rotate(flushing))
+
+    def remove(self, path: str):
+        self.queue.put(lambda: os.remove(path) if os.path.exists(path) else None)
+
+    async def sync(self):
+        """지금까지 넣은 줄과 파일 작업이 끝날 때까지 대기"""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        self.queue.put(lambda: loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None)))
+        await done
+
+    def close(self):
+        """남은 줄을 모두 기록하고 스레드 종료"""
+        self.queue.put(self._sentinel)
+        self._thread.join()
+
+    def _rotate(self, flushing: str):
+        self._file.close()
+        if os.path.exists(flushing):
+            # 이전 flush 가 지우지 못한 파일은 덮어쓰지 않고 뒤에 붙인다 (재생 시 합산)
+            with open(self.path, encoding="utf-8") as src, open(flushing, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            self._file = open(self.path, "w", encoding="utf-8")
+        else:
+            os.replace(self.path, flushing)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, lines: List[str]):
+        if not lines:
+            return
+        try:
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.written += len(lines)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"like_counter_journal_failed\tlines={len(lines)}\terror={e!r}")
+
+    def _monitor(self):
+        stopping = False
+        while not stopping:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: List[str] = []
+            for item in items:
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                self._write(lines)
+                lines = []
+                if item is self._sentinel:
+                    stopping = True
+                    break
+                try:
+                    item()
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"like_counter_journal_failed\terror={e!r}")
+            self._write(lines)
+        self._file.close()
+
+
+class CounterTarget(NamedTuple):
+    collection: AsyncIOMotorCollection
+    likes_collection: AsyncIOMotorCollection
+
+
+class LikeCounter:
+    """
+    like_count 델타 집계기
+    - 핫 상품에 대한 문서 단위 쓰기 경합을 줄이기 위해 (대상, id) 별 델타를 샤드에 모은다
+    - flush 는 전체 샤드를 한 번에 교체(swap)하고, 샤드마다 대상별 bulk_write 한 번 (배치 크기 분산)
+    - 기록하지 못한 델타(실패/예외로 중단)는 다시 합쳐 다음 flush 에서 재시도
+    - 저널은 JournalWriter 스레드가 기록한다 (add 는 큐에 넣기만)
+    """
+
+    def __init__(self, targets: Dict[str, CounterTarget], shards: int = LIKE_COUNTER_SHARDS,
+                 flush_interval: float = LIKE_COUNTER_FLUSH_INTERVAL, journal_path: str = LIKE_COUNTER_JOURNAL,
+                 reconcile_interval: float = LIKE_RECONCILE_INTERVAL):
+        self.targets = targets
+        self.flush_interval = flush_interval
+        self.journal_path = slot_path(journal_path) if journal_path else ""
+        self.reconcile_interval = reconcile_interval
+        self.reconcile_settle = LIKE_RECONCILE_SETTLE
+        self._shards: List[Dict[Key, int]] = [defaultdict(int) for _ in range(max(1, shards))]
+        self._journal: Optional[JournalWriter] = None
+        # flush 는 한 번에 하나만 (주기 flush 와 재계산/종료 flush 가 같은 .flushing 파일을 쓰므로)
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = asyncio.Event()
+        # flush 된 (대상, id 목록) 을 받는 콜백 (캐시 무효화 등). 코루틴 함수도 가능
+        self.listeners: List[Callable[[str, List[int]], Any]] = []
+
+        self.flushes = 0
+        self.flushed_deltas = 0
+        self.flush_errors = 0
+        self.reconcile_runs = 0
+        self.reconcile_fixes = 0
+        self.reconcile_conflicts = 0
+        self.listener_errors = 0
+        self.last_flush_ms = 0.0
+
+    # ───── 델타 기록 ─────
+    def _shard(self, key: Key) -> Dict[Key, int]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def add(self, target: str, id: int, delta: int):
+        key = (target, id)
+        self._shard(key)[key] += delta
+        if self._journal is not None:
+            self._journal.write(f"{target}\t{id}\t{delta}\n")
+
+    def pending(self, target: str, id: int) -> int:
+        key = (target, id)
+        return self._shard(key).get(key, 0)
+
+    # ───── 저널 ─────
+    def _replay_journal(self):
+        """이전 프로세스가 flush 하지 못한 델타를 복구하고 저널을 압축해서 다시 연다"""
+        flushing = self.journal_path + ".flushing"
+        merged: Dict[Key, int] = defaultdict(int)
+        for path in (flushing, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue  # 크래시로 잘린 마지막 줄
+                    merged[(parts[0], int(parts[1]))] += int(parts[2])
+
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for (target, id), delta in merged.items():
+                if delta:
+                    f.write(f"{target}\t{id}\t{delta}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_path)
+        if os.path.exists(flushing):
+            os.remove(flushing)
+
+        for key, delta in merged.items():
+            if delta:
+                self._shard(key)[key] += delta
+        if merged:
+            logger.info(f"like_counter_replay\tkeys={len(merged)}")
+        self._journal = JournalWriter(self.journal_path)
+
+    def _rotate_journal(self) -> Optional[str]:
+        if self._journal is None:
+            return None
+        flushing = self.journal_path + ".flushing"
+        self._journal.rotate(flushing)
+        return flushing
+
+    async def _notify(self, target: str, ids: List[int]):
+        # 리스너 예외가 flush / 재계산을 중단시키지 않도록 리스너별로 격리
+        for listener in self.listeners:
+            try:
+                res = listener(target, ids)
+                if inspect.isawaitable(res):
+                    await res
+            except Exception as e:
+                self.listener_errors += 1
+                logger.error(f"like_counter_listener_failed\ttarget={target}\tkeys={len(ids)}\terror={e!r}")
+
+    # ───── flush ─────
+    async def flush(self):
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self):
+        start = time.perf_counter()
+        # 저널 교체와 샤드 교체 사이에 await 가 없어야 저널과 메모리 델타가 어긋나지 않는다
+        flushing = self._rotate_journal()
+        shards, self._shards = self._shards, [defaultdict(int) for _ in self._shards]
+        try:
+            for shard in shards:
+                if not shard:
+                    continue
+                by_target: Dict[str, Dict[int, int]] = defaultdict(dict)
+                for (target, id), delta in list(shard.items()):
+                    if delta:
+                        by_target[target][id] = delta
+                    else:
+                        del shard[(target, id)]
+                for target, deltas in by_target.items():
+                    try:
+                        await self.targets[target].collection.bulk_write(
+                            [UpdateOne({"id": id}, {"$inc": {"like_count": d}}) for id, d in deltas.items()],
+                            ordered=False,
+                        )
+                    except PyMongoError as e:
+                        self.flush_errors += 1
+                        logger.error(f"like_counter_flush_failed\ttarget={target}\tkeys={len(deltas)}\terror={e}")
+                        continue
+                    # 기록된 델타만 샤드에서 뺀다
+                    for id in deltas:
+                        del shard[(target, id)]
+                    self.flushed_deltas += len(deltas)
+                    await self._notify(target, list(deltas))
+        finally:
+            # 실패했거나 예외로 기록하지 못한 델타는 다시 합치고 새 저널에도 남긴다
+            for shard in shards:
+                for (target, id), delta in shard.items():
+                    self.add(target, id, delta)
+            if flushing is not None:
+                self._journal.remove(flushing)
+                await self._journal.sync()
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    # ───── 재계산(드리프트 보정) ─────
+    async def _count_likes(self, target: CounterTarget, ids: Optional[List[int]] = None) -> Dict[int, int]:
+        pipeline = [{"$group": {"_id": "$id", "n": {"$sum": 1}}}]
+        if ids is not None:
+            pipeline.insert(0, {"$match": {"id": {"$in": ids}}})
+        return {row["_id"]: row["n"] async for row in target.likes_collection.aggregate(pipeline)}
+
+    async def _read_counts(self, target: CounterTarget, ids: List[int]) -> Dict[int, int]:
+        cursor = target.collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "like_count": 1})
+        return {doc["id"]: doc.get("like_count", 0) async for doc in cursor}
+
+    async def reconcile(self, names: Optional[Iterable[str]] = None) -> int:
+        """
+        likes 컬렉션 기준으로 like_count 를 다시 맞춘다
+        - 1차: 값이 다른 문서를 후보로 모으고, reconcile_settle 초 뒤 후보만 다시 읽는다
+          (그 사이 다른 워커/파드의 미 flush 델타가 반영되므로, 좋아요 수나 like_count 가 바뀐 후보는 건너뛴다)
+        - 쓰기는 관측한 like_count 일 때만 $set (compare-and-set). 동시에 들어온 $inc 를 덮어쓰지 않는다
+        - buffered 모드 전용. direct 모드는 매 요청 $inc 라 드리프트가 없다
+        """
+        await self.flush()
+        candidates: Dict[str, Dict[int, Tuple[int, int]]] = {}
+        for name in names or self.targets:
+            target = self.targets[name]
+            actual = await self._count_likes(target)
+            found: Dict[int, Tuple[int, int]] = {}
+            async for doc in target.collection.find({"like_count": {"$ne": 0}}, {"_id": 0, "id": 1, "like_count": 1}):
+                observed, n = doc.get("like_count", 0), actual.pop(doc["id"], 0)
+                if observed != n:
+                    found[doc["id"]] = (observed, n)
+            # 남은 id 는 like_count 가 0 인데 좋아요가 있는 문서 (상품이 없으면 아래 재확인에서 빠진다)
+            for id, n in actual.items():
+                found[id] = (0, n)
+            if found:
+                candidates[name] = found
+
+        if candidates and self.reconcile_settle > 0:
+            await asyncio.sleep(self.reconcile_settle)
+
+        fixes = 0
+        for name, found in candidates.items():
+            target = self.targets[name]
+            ids = list(found)
+            actual = await self._count_likes(target, ids)
+            current = await self._read_counts(target, ids)
+            ops, fixed_ids = [], []
+            for id, (observed, n) in found.items():
+                if id not in current or self.pending(name, id):
+                    continue
+                if current[id] != observed or actual.get(id, 0) != n:
+                    self.reconcile_conflicts += 1
+                    continue
+                # 필드가 없는 문서는 0 으로 읽었으므로 null 도 같은 값으로 본다
+                expect = observed if observed else {"$in": [0, None]}
+                ops.append(UpdateOne({"id": id, "like_count": expect}, {"$set": {"like_count": n}}))
+                fixed_ids.append(id)
+            if not ops:
+                continue
+            result = await target.collection.bulk_write(ops, ordered=False)
+            self.reconcile_conflicts += len(ops) - result.modified_count
+            fixes += result.modified_count
+            await self._notify(name, fixed_ids)
+        self.reconcile_runs += 1
+        self.reconcile_fixes += fixes
+        if fixes:
+            logger.info(f"like_counter_reconcile\tfixes={fixes}")
+        return fixes
+
+    async def reconcile_once(self) -> bool:
+        """주기마다 클러스터 전체에서 잠금을 잡은 한 워커만 재계산. 실행했으면 True"""
+        db = next(iter(self.targets.values())).collection.database
+        # 다음 주기 전에 잠금이 풀리도록 주기보다 조금 짧게
+        return await run_once(db, "like_reconcile", self.reconcile_interval * 0.9, self.reconcile)
+
+    # ───── 백그라운드 태스크 ─────
+    async def _every(self, interval: float, job):
+        while True:
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await job()
+            except Exception as e:
+                # 어떤 예외든 다음 주기에 다시 시도 (태스크가 죽으면 델타가 쌓이기만 한다)
+                logger.error(f"like_counter_job_failed\tjob={job.__name__}\terror={e!r}")
+
+    def start(self, buffered: bool):
+        self._closing.clear()
+        if not buffered:
+            return
+        if self.journal_path:
+            self._replay_journal()
+        self._tasks.append(asyncio.create_task(self._every(self.flush_interval, self.flush)))
+        if self.reconcile_interval > 0:
+            self._tasks.append(asyncio.create_task(self._every(self.reconcile_interval, self.reconcile_once)))
+
+    async def stop(self):
+        self._closing.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+            self._tasks = []
+        await self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal: Optional[JournalWriter] = None
+
+    def stats(self) -> dict:
+        return {
+            "pending_keys": sum(len(s) for s in self._shards),
+            "flushes": self.flushes,
+            "flushed_deltas": self.flushed_deltas,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "reconcile_runs": self.reconcile_runs,
+            "reconcile_fixes": self.reconcile_fixes,
+            "reconcile_conflicts": self.reconcile_conflicts,
+            "listener_errors": self.listener_errors,
+            "journal_errors": self._journal.errors if self._journal is not None else 0,
+        }
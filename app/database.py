@@ -1,8 +1,11 @@
 import os
 from pathlib import Path
-# from redis.asyncio import Redis
+from redis.asyncio import Redis
 from dotenv import load_dotenv, find_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from .metrics import MongoCommandMetrics, MongoPoolMetrics
 
 load_dotenv(find_dotenv(usecwd=True))
 
@@ -25,7 +28,55 @@ MONGO_URI = (
 #     f"?authSource=admin&directConnection=true"
 # )
 
-client = AsyncIOMotorClient(MONGO_URI)
+# ───── 커넥션 풀 / 타임아웃 / 압축 ─────
+# 비워 두면 pymongo 기본값. MONGO_COMPRESSORS 는 "zstd,snappy" 처럼 선호 순서대로
+# (pymongo[zstd] / pymongo[snappy] 추가 의존성이 없으면 pymongo 가 경고 후 해당 압축만 무시)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = os.getenv('MONGO_MAX_IDLE_TIME_MS')
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+
+# 읽기 위주 엔드포인트(목록/bulk/좋아요 목록)의 read preference. primary 로 두면 라우팅 끔
+# maxStalenessSeconds 는 서버 제약상 90 이상이어야 하고, -1 이면 제한 없음
+MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'secondaryPreferred')
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv('MONGO_MAX_STALENESS_SECONDS', '90'))
+
+_READ_PREFERENCES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+
+def client_options() -> dict:
+    options = {
+        'maxPoolSize': MONGO_MAX_POOL_SIZE,
+        'minPoolSize': MONGO_MIN_POOL_SIZE,
+        'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    if MONGO_MAX_IDLE_TIME_MS:
+        options['maxIdleTimeMS'] = int(MONGO_MAX_IDLE_TIME_MS)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options['waitQueueTimeoutMS'] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options['compressors'] = MONGO_COMPRESSORS
+    return options
+
+
+def read_preference():
+    if MONGO_READ_PREFERENCE == 'primary':
+        return Primary()
+    if MONGO_READ_PREFERENCE not in _READ_PREFERENCES:
+        raise ValueError(f"MONGO_READ_PREFERENCE must be primary or one of {list(_READ_PREFERENCES)}")
+    return _READ_PREFERENCES[MONGO_READ_PREFERENCE](max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+
+# 컬렉션/명령 단위 지연과 풀 대기 시간을 /metrics 로 노출
+client = AsyncIOMotorClient(
+    MONGO_URI, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()], **client_options())
 
 db = client[os.getenv('MONGO_DB')]
 
@@ -33,5 +84,16 @@ product_collection = db['product']
 brand_collection = db['brand']
 likes_coll = db['likes']
 brand_likes_coll = db['brand_likes']
-# redis_url = f"redis://{os.getenv('REDIS_URL')}"
-# redis = Redis.from_url(redis_url, decode_responses=True)
+
+# 읽기 전용 핸들 (쓰기/카운터는 항상 위의 primary 핸들 사용)
+# 브랜드는 brand_cache 가 like_count 무효화 직후 다시 채우므로 primary 에서 읽는다
+read_product_collection = product_collection.with_options(read_preference=read_preference())
+read_likes_coll = likes_coll.with_options(read_preference=read_preference())
+read_brand_likes_coll = brand_likes_coll.with_options(read_preference=read_preference())
+
+# REDIS_URL 이 없으면 None (응답 캐시는 인메모리 백엔드로 동작)
+redis = None
+if os.getenv('REDIS_URL'):
+    redis_url = f"redis://{os.getenv('REDIS_URL')}"
+    redis = Redis.from_url(redis_url, decode_responses=True)
+
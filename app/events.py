@@ -0,0 +1,226 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger("product")
+
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "1.0"))
+EVENT_FLUSH_SIZE = int(os.getenv("EVENT_FLUSH_SIZE", "500"))
+EVENT_BUFFER_MAX = int(os.getenv("EVENT_BUFFER_MAX", "20000"))
+# 버퍼가 가득 찼을 때 요청이 기다리는 최대 시간(초). 넘기면 이벤트를 버리고 카운트
+EVENT_ENQUEUE_TIMEOUT = float(os.getenv("EVENT_ENQUEUE_TIMEOUT", "0.05"))
+# 기록에 실패한 배치를 다시 시도하는 최대 횟수 (flush 주기마다 한 번). 넘기면 버리고 카운트
+EVENT_FLUSH_RETRIES = int(os.getenv("EVENT_FLUSH_RETRIES", "10"))
+# 종료 시 실패한 배치를 다시 시도하는 횟수 (EVENT_FLUSH_INTERVAL 간격). 그래도 남은 이벤트는 버리고 카운트
+EVENT_SHUTDOWN_RETRIES = int(os.getenv("EVENT_SHUTDOWN_RETRIES", "3"))
+# 원본 이벤트의 Date 시각 (TTL 인덱스/시간 버킷 기준). sink.time_field 는 기존 호환용 ISO 문자열
+EVENT_TIME_FIELD = "event_at"
+
+
+class EventSink(NamedTuple):
+    collection: AsyncIOMotorCollection
+    counter_field: str
+    time_field: str
+
+
+class _FailedBatch(NamedTuple):
+    batch: List[Tuple[str, dict]]
+    done: Set[str]  # 이미 성공한 단계 (재시도 때 건너뜀)
+    attempts: int
+
+
+def _only_duplicates(e: BulkWriteError) -> bool:
+    errors = e.details.get("writeErrors") or []
+    return bool(errors) and all(err.get("code") == 11000 for err in errors) \
+        and not e.details.get("writeConcernErrors")
+
+
+class EventBuffer:
+    """
+    조회/구매 이벤트 write-behind 버퍼
+    - 요청은 큐에 넣고 바로 반환, 백그라운드 태스크가 주기적으로(또는 flush_size 도달 시) 기록
+    - 한 번의 flush = 이벤트 종류별 insert_many + 상품별 $inc 를 합친 bulk_write 한 번
+    - 큐는 크기 제한, 가득 차면 enqueue_timeout 만큼 대기(backpressure) 후 버림
+    - 기록에 실패한 배치는 다음 주기에 먼저 다시 시도 (최대 EVENT_FLUSH_RETRIES 번, 그동안 새 배치는 큐에서 대기)
+      insert_many 가 문서에 _id 를 채우므로 재시도 시 이미 들어간 원본 이벤트는 중복 키로 걸러진다
+      ($inc 가 일부만 적용된 채 실패하면 그 상품은 다시 더해질 수 있다 — 유실 대신 at-least-once)
+    - 기록에 성공한 배치는 listeners 에 (kind, doc) 목록으로 전달 (랭킹 갱신 등)
+    """
+
+    def __init__(self, product_coll: AsyncIOMotorCollection, sinks: Dict[str, EventSink],
+                 flush_interval: float = EVENT_FLUSH_INTERVAL, flush_size: int = EVENT_FLUSH_SIZE,
+                 max_size: int = EVENT_BUFFER_MAX, enqueue_timeout: float = EVENT_ENQUEUE_TIMEOUT,
+                 max_retries: int = EVENT_FLUSH_RETRIES):
+        self.product_coll = product_coll
+        self.sinks = sinks
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self._failed: Optional[_FailedBatch] = None
+        self._queue: "asyncio.Queue[Tuple[str, dict]]" = asyncio.Queue(maxsize=max_size)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.listeners: List[Callable[[List[Tuple[str, dict]]], Any]] = []
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_events = 0
+        self.flush_errors = 0
+        self.retried_events = 0
+        self.failed_events = 0
+        self.listener_errors = 0
+        self.last_flush_ms = 0.0
+
+    async def record(self, kind: str, product_id: int, user_id: str):
+        sink = self.sinks[kind]
+        now = datetime.utcnow()
+        doc = {
+            "user_id": user_id,
+            "product_id": product_id,
+            sink.time_field: now.isoformat() + "Z",
+            EVENT_TIME_FIELD: now,
+        }
+        item = (kind, doc)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return
+        self.enqueued += 1
+        if self._queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """종료 시 남은 이벤트를 모두 flush (실패하면 EVENT_SHUTDOWN_RETRIES 번까지 다시 시도)"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._drain()
+        for _ in range(EVENT_SHUTDOWN_RETRIES):
+            if self._failed is None:
+                break
+            await asyncio.sleep(self.flush_interval)
+            await self._drain()
+
+        lost = (len(self._failed.batch) if self._failed is not None else 0) + self._queue.qsize()
+        if lost:
+            self._failed = None
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self.failed_events += lost
+            logger.error(f"event_buffer_shutdown_discarded\tevents={lost}")
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._drain()
+            except Exception as e:
+                # 예상 못 한 예외로 루프가 끝나면 큐가 차서 이벤트가 버려지기만 한다
+                logger.error(f"event_flush_loop_failed\terror={e!r}")
+
+    async def _drain(self):
+        if self._failed is not None:
+            failed, self._failed = self._failed, None
+            self.retried_events += len(failed.batch)
+            if not await self._flush(failed.batch, failed.done, failed.attempts):
+                return
+        while not self._queue.empty():
+            n = min(self.flush_size, self._queue.qsize())
+            batch = [self._queue.get_nowait() for _ in range(n)]
+            if not await self._flush(batch):
+                # 장애 중에는 새 배치를 쓰지 않고 다음 주기에 실패한 배치부터 다시
+                return
+
+    async def _flush(self, batch: List[Tuple[str, dict]], done: Optional[Set[str]] = None,
+                     attempts: int = 0) -> bool:
+        start = time.perf_counter()
+        done = set(done or ())
+        docs_by_kind: Dict[str, List[dict]] = defaultdict(list)
+        incs: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for kind, doc in batch:
+            docs_by_kind[kind].append(doc)
+            incs[doc["product_id"]][self.sinks[kind].counter_field] += 1
+
+        try:
+            for kind, docs in docs_by_kind.items():
+                step = f"insert:{kind}"
+                if step in done:
+                    continue
+                try:
+                    await self.sinks[kind].collection.insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    # 재시도에서 이전에 들어간 문서만 중복이면 성공으로 본다
+                    if not _only_duplicates(e):
+                        raise
+                done.add(step)
+            if "inc" not in done:
+                await self.product_coll.bulk_write(
+                    [UpdateOne({"id": pid}, {"$inc": dict(fields)}) for pid, fields in incs.items()],
+                    ordered=False,
+                )
+                done.add("inc")
+        except PyMongoError as e:
+            self.flush_errors += 1
+            if attempts < self.max_retries:
+                self._failed = _FailedBatch(batch, done, attempts + 1)
+                logger.error(f"event_flush_failed\tevents={len(batch)}\tattempt={attempts + 1}\terror={e}")
+            else:
+                self.failed_events += len(batch)
+                logger.error(f"event_flush_gave_up\tevents={len(batch)}\tattempts={attempts + 1}\terror={e}")
+            return False
+        finally:
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+        self.flushes += 1
+        self.flushed_events += len(batch)
+        for listener in self.listeners:
+            try:
+                res = listener(batch)
+                if inspect.isawaitable(res):
+                    await res
+            except Exception as e:
+                self.listener_errors += 1
+                logger.error(f"event_listener_failed\tevents={len(batch)}\terror={e!r}")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "flush_errors": self.flush_errors,
+            "retried_events": self.retried_events,
+            "failed_events": self.failed_events,
+            "listener_errors": self.listener_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
@@ -0,0 +1,47 @@
+"""
+필터 사이드바용 facet 카운트
+
+현재 필터로 $match 한 번(카테고리/성별/브랜드 복합 인덱스 사용) 후 $facet 으로
+필드별 개수와 전체 개수를 한 번의 aggregation 으로 계산한다.
+"""
+import os
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+FACET_FIELDS = ("major_category", "gender", "sub_category", "brand_id")
+# 필드별 상위 몇 개 값까지 돌려줄지 (brand_id 처럼 값이 많은 필드 대비)
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "100"))
+FACET_CACHE_TTL = int(os.getenv("FACET_CACHE_TTL", "60"))
+
+
+def facet_pipeline(query: Dict[str, Any], limit: int = FACET_LIMIT) -> List[dict]:
+    stages = {
+        field: [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            # 동점은 값 순으로 고정 (캐시된 응답과 새로 계산한 응답의 순서가 같도록)
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        for field in FACET_FIELDS
+    }
+    stages["total"] = [{"$count": "n"}]
+    return [
+        {"$match": query},
+        {"$project": {"_id": 0, **{field: 1 for field in FACET_FIELDS}}},
+        {"$facet": stages},
+    ]
+
+
+async def facet_counts(coll: AsyncIOMotorCollection, query: Dict[str, Any], limit: int = FACET_LIMIT) -> dict:
+    docs = await coll.aggregate(facet_pipeline(query, limit)).to_list(length=1)
+    result = docs[0] if docs else {}
+    total = result.get("total") or [{"n": 0}]
+    return {
+        "total": total[0]["n"],
+        "facets": {
+            field: [{"value": d["_id"], "count": d["count"]} for d in result.get(field, [])]
+            for field in FACET_FIELDS
+        },
+    }
@@ -0,0 +1,64 @@
+"""
+HTTP 조건부 요청(ETag) + 라우트별 Cache-Control
+
+- ETag: 응답 JSON 텍스트의 해시 (weak, 압축 여부와 무관하게 같은 값)
+  상세/목록 본문에 카운터(like/view/purchase)와 updated_at 이 모두 들어 있으므로 어느 쪽이 바뀌어도 달라진다
+- If-None-Match 가 맞으면 본문 없이 304
+- Last-Modified / If-Modified-Since 는 쓰지 않는다. 카운터 변화와 목록의 삭제/순서 변경은 updated_at 에
+  드러나지 않아, If-Modified-Since 만 보내는 클라이언트에 바뀐 본문 대신 304 를 주게 된다
+- 캐시 적중 시 응답 캐시의 JSON 텍스트를 그대로 보내므로 파싱/재직렬화가 없다
+"""
+import hashlib
+import os
+
+from fastapi import Request, Response
+
+from .cache import LIST_CACHE_TTL, PRODUCT_CACHE_TTL
+from .facets import FACET_CACHE_TTL
+from .rollups import TRENDING_CACHE_TTL
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+
+# 라우트 -> Cache-Control. HTTP_CACHE_CONTROL_<ROUTE> 로 덮어쓰고, 빈 값이면 헤더를 붙이지 않는다
+_CACHE_CONTROL_DEFAULTS = {
+    "product": f"public, max-age={PRODUCT_CACHE_TTL}",
+    "list": f"public, max-age={LIST_CACHE_TTL}",
+    "facets": f"public, max-age={FACET_CACHE_TTL}",
+    "trending": f"public, max-age={TRENDING_CACHE_TTL}",
+}
+CACHE_CONTROL = {
+    route: os.getenv(f"HTTP_CACHE_CONTROL_{route.upper()}", default)
+    for route, default in _CACHE_CONTROL_DEFAULTS.items()
+}
+
+
+def make_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 약한 비교 (W/ 접두어 무시, * 는 항상 일치)"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def conditional_response(request: Request, body: str, route: str) -> Response:
+    """JSON 텍스트 -> 200 (ETag/Cache-Control) 또는 304"""
+    raw = body.encode()
+    if not HTTP_CACHE_ENABLED:
+        return Response(raw, media_type="application/json")
+
+    etag = make_etag(raw)
+    headers = {"ETag": etag}
+    cache_control = CACHE_CONTROL.get(route)
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(raw, media_type="application/json", headers=headers)
@@ -0,0 +1,217 @@
+"""
+Mongo 인덱스 선언 + 쿼리 플랜 점검
+
+- INDEX_SPECS: 서비스가 필요로 하는 모든 인덱스 (app/main.py 쿼리 형태 기준)
+- QUERY_SHAPES: main.py 가 실제로 보내는 쿼리 형태. explain() 결과에 COLLSCAN 이 있거나,
+  정렬을 선언한 형태가 메모리 정렬(SORT 단계)로 풀리면 실패
+- index_setup_fingerprint: 선언 해시. 기동 시 잠금 이름에 붙여, 선언이 바뀐 배포는 이전 잠금(TTL)과 상관없이 적용
+- CI/수동 점검: python -m app.indexes  (인덱스 생성 후 점검, 실패한 형태가 있으면 exit 1)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+from .changes import CHANGE_STREAM_TOKEN_RETENTION_DAYS, TOKEN_COLLECTION
+from .events import EVENT_TIME_FIELD
+from .rankings import SORT_MODES
+from .rollups import DAILY_COLLECTION, EVENT_RETENTION_DAYS, HOURLY_COLLECTION, ROLLUP_DAILY_RETENTION_DAYS, \
+    ROLLUP_HOURLY_RETENTION_DAYS
+from .search import NGRAM_FIELD, SEARCH_INDEX_NAME
+
+logger = logging.getLogger("product")
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, Any]]
+    options: Dict[str, Any]
+
+
+class QueryShape(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, Any]]] = None
+
+
+INDEX_SPECS: List[IndexSpec] = [
+    # product
+    IndexSpec("product", [("id", 1)], {"unique": True}),
+    IndexSpec("product", [("major_category", 1), ("gender", 1), ("brand_id", 1), ("id", 1)],
+              {"name": "idx_category_gender_brand_id"}),
+    IndexSpec("product", [("gender", 1), ("brand_id", 1), ("id", 1)], {"name": "idx_gender_brand_id"}),
+    IndexSpec("product", [("brand_id", 1), ("id", 1)], {"name": "idx_brand_id"}),
+    # 커서 페이지({필터..., id > x} id 순): 동등 조건 바로 뒤에 id 가 와야 범위 스캔으로 정렬 없이 읽는다
+    IndexSpec("product", [("major_category", 1), ("id", 1)], {"name": "idx_category_id"}),
+    IndexSpec("product", [("gender", 1), ("id", 1)], {"name": "idx_gender_id"}),
+    IndexSpec("product", [("major_category", 1), ("gender", 1), ("id", 1)], {"name": "idx_category_gender_id"}),
+    IndexSpec("product", [("major_category", 1), ("brand_id", 1), ("id", 1)], {"name": "idx_category_brand_id"}),
+    # 정렬 모드 (정렬 필드, id): 랭킹 밖 구간/랭킹 없는 범위도 메모리 정렬 없이 인덱스 순서로 읽는다
+    *[
+        IndexSpec("product", [(field, direction), ("id", 1)],
+                  {"name": f"idx_sort_{field}_{'desc' if direction < 0 else 'asc'}"})
+        for field, direction in dict.fromkeys(SORT_MODES.values())
+    ],
+    IndexSpec("product", [(NGRAM_FIELD, "text")],
+              {"name": SEARCH_INDEX_NAME, "default_language": "none", "language_override": "search_language"}),
+    # brand
+    IndexSpec("brand", [("id", 1)], {"unique": True}),
+    # likes / brand_likes: (id, user_id) 유일 + 사용자별 조회
+    IndexSpec("likes", [("id", 1), ("user_id", 1)], {"unique": True, "name": "uniq_like_id_user"}),
+    IndexSpec("likes", [("user_id", 1), ("created_at", -1), ("id", 1)], {"name": "idx_like_user_created"}),
+    IndexSpec("brand_likes", [("id", 1), ("user_id", 1)], {"unique": True, "name": "uniq_brand_like_id_user"}),
+    IndexSpec("brand_likes", [("user_id", 1), ("created_at", -1), ("id", 1)],
+              {"name": "idx_brand_like_user_created"}),
+    # 원본 조회/구매 이벤트: 보관 기간 뒤 TTL 삭제
+    IndexSpec("product_views", [(EVENT_TIME_FIELD, 1)],
+              {"name": "ttl_view_event_at", "expireAfterSeconds": EVENT_RETENTION_DAYS * 86400}),
+    IndexSpec("product_purchases", [(EVENT_TIME_FIELD, 1)],
+              {"name": "ttl_purchase_event_at", "expireAfterSeconds": EVENT_RETENTION_DAYS * 86400}),
+    # 시간 버킷: (bucket, product_id) 유일 (upsert + 기간 조회) + 보관 기간 TTL
+    IndexSpec(HOURLY_COLLECTION, [("bucket", 1), ("product_id", 1)], {"unique": True, "name": "uniq_bucket_product"}),
+    IndexSpec(HOURLY_COLLECTION, [("bucket", 1)],
+              {"name": "ttl_bucket", "expireAfterSeconds": ROLLUP_HOURLY_RETENTION_DAYS * 86400}),
+    IndexSpec(DAILY_COLLECTION, [("bucket", 1), ("product_id", 1)], {"unique": True, "name": "uniq_bucket_product"}),
+    IndexSpec(DAILY_COLLECTION, [("bucket", 1)],
+              {"name": "ttl_bucket", "expireAfterSeconds": ROLLUP_DAILY_RETENTION_DAYS * 86400}),
+    # change stream resume token: 사라진 호스트/슬롯의 문서 정리
+    IndexSpec(TOKEN_COLLECTION, [("updated_at", 1)],
+              {"name": "ttl_token_updated_at", "expireAfterSeconds": CHANGE_STREAM_TOKEN_RETENTION_DAYS * 86400}),
+]
+
+# 기존 배포에 있던 단일 필드 인덱스 중 복합 인덱스로 대체된 것 (쓰기 비용만 늘리므로 제거)
+LEGACY_INDEXES: Dict[str, List[str]] = {
+    "product": ["idx_major_category", "idx_gender"],
+}
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("get_product", "product", {"id": 1}),
+    QueryShape("list_by_id_cursor", "product", {"id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_category", "product", {"major_category": "x"}),
+    QueryShape("list_category_gender", "product", {"major_category": "x", "gender": "M"}),
+    QueryShape("list_category_gender_brand", "product", {"major_category": "x", "gender": "M", "brand_id": 1}),
+    QueryShape("list_category_brand", "product", {"major_category": "x", "brand_id": 1}),
+    QueryShape("list_gender", "product", {"gender": "M"}),
+    QueryShape("list_gender_brand", "product", {"gender": "M", "brand_id": 1}),
+    QueryShape("list_brand", "product", {"brand_id": 1}),
+    QueryShape("list_category_cursor", "product", {"major_category": "x", "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_gender_cursor", "product", {"gender": "M", "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_brand_cursor", "product", {"brand_id": 1, "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_category_gender_cursor", "product",
+               {"major_category": "x", "gender": "M", "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_category_brand_cursor", "product",
+               {"major_category": "x", "brand_id": 1, "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_gender_brand_cursor", "product", {"gender": "M", "brand_id": 1, "id": {"$gt": 0}}, [("id", 1)]),
+    QueryShape("list_category_gender_brand_cursor", "product",
+               {"major_category": "x", "gender": "M", "brand_id": 1, "id": {"$gt": 0}}, [("id", 1)]),
+    *[
+        QueryShape(f"sort_{name}", "product", {}, [(mode.field, mode.direction), ("id", 1)])
+        for name, mode in SORT_MODES.items()
+    ],
+    *[
+        # 정렬 커서: (값 < v) 또는 (값 = v, id > i). 두 범위가 같은 인덱스 순서라 SORT_MERGE 로 합쳐진다
+        QueryShape(f"sort_{name}_cursor", "product", {"$or": [
+            {mode.field: {"$lt" if mode.direction < 0 else "$gt": 0}}, {mode.field: 0, "id": {"$gt": 0}},
+        ]}, [(mode.field, mode.direction), ("id", 1)])
+        for name, mode in SORT_MODES.items()
+    ],
+    QueryShape("list_name_search", "product", {"$text": {"$search": "ab"}, NGRAM_FIELD: {"$all": ["ab"]}}),
+    QueryShape("export_all", "product", {}, [("id", 1)]),
+    QueryShape("export_category", "product", {"major_category": "x"}, [("id", 1)]),
+    QueryShape("bulk_products", "product", {"id": {"$in": [1, 2, 3]}}),
+    QueryShape("brand_by_ids", "brand", {"id": {"$in": [1, 2, 3]}}),
+    QueryShape("like_exists", "likes", {"id": 1, "user_id": "u"}),
+    QueryShape("user_likes", "likes", {"user_id": "u"}),
+    QueryShape("user_likes_page", "likes", {"user_id": "u"}, [("created_at", -1), ("id", 1)]),
+    QueryShape("brand_like_exists", "brand_likes", {"id": 1, "user_id": "u"}),
+    QueryShape("user_brand_likes", "brand_likes", {"user_id": "u"}),
+    QueryShape("user_brand_likes_page", "brand_likes", {"user_id": "u"}, [("created_at", -1), ("id", 1)]),
+    QueryShape("rollup_upsert_hourly", HOURLY_COLLECTION, {"bucket": datetime(2024, 1, 1), "product_id": 1}),
+    QueryShape("trending_hourly", HOURLY_COLLECTION, {"bucket": {"$gte": datetime(2024, 1, 1)}}),
+    QueryShape("trending_daily", DAILY_COLLECTION, {"bucket": {"$gte": datetime(2024, 1, 1)}}),
+]
+
+
+def index_setup_fingerprint(specs: List[IndexSpec] = INDEX_SPECS, legacy: Dict[str, List[str]] = LEGACY_INDEXES,
+                            shapes: List[QueryShape] = QUERY_SHAPES) -> str:
+    raw = json.dumps([specs, legacy, shapes], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    for spec in INDEX_SPECS:
+        try:
+            await db[spec.collection].create_index(spec.keys, **spec.options)
+        except OperationFailure as e:
+            if e.code == 85 and "expireAfterSeconds" in spec.options:
+                # 보관 기간만 바뀐 TTL 인덱스는 다시 만들지 않고 collMod 로 변경
+                await db.command("collMod", spec.collection, index={
+                    "keyPattern": dict(spec.keys), "expireAfterSeconds": spec.options["expireAfterSeconds"]})
+                continue
+            # 기존 데이터 중복 등으로 unique 인덱스 생성이 실패해도 서비스는 기동한다
+            logger.error(f"index_create_failed\tcollection={spec.collection}\tkeys={spec.keys}\terror={e}")
+
+    for coll_name, names in LEGACY_INDEXES.items():
+        existing = await db[coll_name].index_information()
+        for name in names:
+            if name in existing:
+                await db[coll_name].drop_index(name)
+
+
+def _find_stage(plan: Any, stages: Set[str]) -> Optional[str]:
+    if isinstance(plan, dict):
+        if plan.get("stage") in stages:
+            return plan["stage"]
+        values = plan.values()
+    elif isinstance(plan, list):
+        values = plan
+    else:
+        return None
+    for v in values:
+        found = _find_stage(v, stages)
+        if found:
+            return found
+    return None
+
+
+async def check_query_plans(db: AsyncIOMotorDatabase) -> List[str]:
+    """
+    실패한 쿼리 형태를 "이름:단계" 로 돌려준다
+    - COLLSCAN: 모든 형태
+    - SORT(메모리 정렬, 결과 전체를 읽어야 첫 건이 나옴): 정렬을 선언한 형태만. SORT_MERGE 는 스트리밍이라 허용
+    """
+    failures = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        stages = {"COLLSCAN"}
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+            stages.add("SORT")
+        explain = await cursor.explain()
+        stage = _find_stage(explain.get("queryPlanner", {}).get("winningPlan", {}), stages)
+        if stage:
+            failures.append(f"{shape.name}:{stage}")
+    return failures
+
+
+async def _main() -> int:
+    from .database import db
+
+    await ensure_indexes(db)
+    failures = await check_query_plans(db)
+    for failure in failures:
+        name, stage = failure.rsplit(":", 1)
+        print(f"{stage}\t{name}")
+    print(f"checked={len(QUERY_SHAPES)}\tfailed={len(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,178 @@
+"""
+상품 일괄 등록/갱신 (카탈로그 동기화용)
+
+- 입력은 JSON 배열 또는 NDJSON 스트림. 항목마다 ProductBase 로 검증하고 실패는 항목 단위 에러로 모은다
+- 검증을 통과한 항목은 batch_size 단위로 모아 unordered bulk_write(UpdateOne upsert) 한 번으로 기록
+- 배치 쓰기는 세마포어로 동시 실행 수를 제한하고, 세마포어가 찰 때까지만 입력을 앞서 읽는다
+- 배치가 기록될 때마다 on_batch(ids) 로 캐시 무효화 (배치당 한 번)
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .rankings import missing_sort_fields
+from .schemas import ProductBase
+from .search import NGRAM_FIELD, name_ngrams
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+# 응답에 담을 항목 에러 최대 수 (나머지는 개수만)
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "1000"))
+INGEST_MODE_PATTERN = "^(upsert|insert)$"
+
+_INVALID = object()
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """바이트 조각 스트림 -> (줄 번호, 객체). 빈 줄은 건너뛰고, 파싱 실패는 _INVALID"""
+    index = 0
+    buf = b""
+
+    def parse(line: bytes):
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            return _INVALID
+
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, parse(line)
+                index += 1
+    if buf.strip():
+        yield index, parse(buf)
+
+
+def _operation(product: ProductBase, mode: str, now: str) -> UpdateOne:
+    doc = product.model_dump(exclude_unset=True)
+    if doc.get("name"):
+        doc[NGRAM_FIELD] = name_ngrams(doc["name"])
+    missing = missing_sort_fields(doc)
+    if mode == "insert":
+        # create_product 와 같은 의미: 없을 때만 넣고 있으면 그대로 둔다
+        doc.update({"created_at": now, "updated_at": now, **missing})
+        return UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True)
+    # null 로 온 정렬 필드는 0 으로, 빠진 필드는 새 상품일 때만 0 (기존 카운터는 덮어쓰지 않는다)
+    doc.update({f: 0 for f in missing if f in doc})
+    update = {"$set": {"updated_at": now, **doc}}
+    on_insert = {f: 0 for f in missing if f not in doc}
+    if "created_at" not in doc:
+        on_insert["created_at"] = now
+    if on_insert:
+        update["$setOnInsert"] = on_insert
+    return UpdateOne({"id": doc["id"]}, update, upsert=True)
+
+
+class BulkIngestor:
+    def __init__(self, coll: AsyncIOMotorCollection, mode: str = "upsert", batch_size: int = INGEST_BATCH_SIZE,
+                 concurrency: int = INGEST_CONCURRENCY,
+                 on_batch: Optional[Callable[[List[int]], Awaitable[Any]]] = None):
+        self.coll = coll
+        self.mode = mode
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self._sem = asyncio.Semaphore(concurrency)
+        self._pending: List[Tuple[int, int, UpdateOne]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._now = datetime.utcnow().isoformat() + "Z"
+        self._start = time.perf_counter()
+
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.matched = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.batches: List[Dict[str, Any]] = []
+
+    def _error(self, index: int, id: Optional[int], message: str):
+        self.failed += 1
+        if len(self.errors) < INGEST_MAX_ERRORS:
+            self.errors.append({"index": index, "id": id, "error": message})
+
+    async def add(self, index: int, item: Any):
+        self.received += 1
+        if item is _INVALID:
+            self._error(index, None, "invalid json")
+            return
+        try:
+            product = ProductBase.model_validate(item)
+        except ValidationError as e:
+            id = item.get("id") if isinstance(item, dict) else None
+            self._error(index, id if isinstance(id, int) else None,
+                        "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            return
+        self._pending.append((index, product.id, _operation(product, self.mode, self._now)))
+        if len(self._pending) >= self.batch_size:
+            await self._dispatch()
+
+    async def _dispatch(self):
+        batch, self._pending = self._pending, []
+        # 동시 쓰기가 가득 차 있으면 여기서 기다린다 (입력 읽기도 함께 멈춤)
+        await self._sem.acquire()
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: List[Tuple[int, int, UpdateOne]]):
+        start = time.perf_counter()
+        failed_positions = set()
+        try:
+            try:
+                result = await self.coll.bulk_write([op for _, _, op in batch], ordered=False)
+                counts = (result.upserted_count, result.modified_count, result.matched_count)
+            except BulkWriteError as e:
+                details = e.details
+                for err in details.get("writeErrors", []):
+                    index, id, _ = batch[err["index"]]
+                    failed_positions.add(err["index"])
+                    self._error(index, id, err.get("errmsg", "write error"))
+                counts = (details.get("nUpserted", 0), details.get("nModified", 0), details.get("nMatched", 0))
+            except PyMongoError as e:
+                for index, id, _ in batch:
+                    self._error(index, id, str(e))
+                failed_positions = set(range(len(batch)))
+                counts = (0, 0, 0)
+
+            self.inserted += counts[0]
+            self.updated += counts[1]
+            self.matched += counts[2]
+            written = [id for pos, (_, id, _) in enumerate(batch) if pos not in failed_positions]
+            if written and self.on_batch is not None:
+                await self.on_batch(written)
+        finally:
+            self._sem.release()
+            self.batches.append({
+                "first_index": batch[0][0],
+                "items": len(batch),
+                "failed": len(failed_positions),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+    async def finish(self) -> Dict[str, Any]:
+        if self._pending:
+            await self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        return {
+            "mode": self.mode,
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "matched": self.matched,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["index"]),
+            "errors_truncated": self.failed > len(self.errors),
+            "batches": sorted(self.batches, key=lambda b: b["first_index"]),
+            "elapsed_ms": round((time.perf_counter() - self._start) * 1000, 2),
+        }
@@ -0,0 +1,216 @@
+"""
+사용자별 좋아요 ID 집합 캐시 (좋아요 여부 일괄 확인용)
+
+- 인-프로세스 LRU: (종류, user_id) -> int 집합. TTL 이 지나면 다시 읽는다
+- LIKE_SET_REDIS=true 면 Redis set 으로도 미러링해서 다른 파드와 공유
+  (빈 집합도 캐시하려고 센티널 멤버를 함께 넣는다)
+- like/unlike 핸들러가 add/remove 를 호출해 로컬 집합을 바로 갱신하고 Redis 키는 지운다 (버전 키도 올린다)
+- 같은 사용자 동시 미스는 SingleFlight 로 한 번만 Mongo 조회. 조회 중 들어온 변경은 조회 후 반영
+- Mongo 에서 읽은 집합은 읽기 전에 본 버전이 그대로일 때만 Redis 에 올린다 (WATCH). 조회 중 다른 파드에서
+  들어온 좋아요/취소를 옛 스냅샷으로 덮어쓰지 않도록
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from .cache import KEY_PREFIX
+from .singleflight import get_flight
+from .workers import cache_maxsize
+
+logger = logging.getLogger("product")
+
+# 다른 파드의 좋아요 취소는 (pre-image 가 없으면) 이 시간이 지나야 반영된다
+LIKE_SET_TTL = float(os.getenv("LIKE_SET_TTL", "60"))
+LIKE_SET_MAXSIZE = cache_maxsize("like_sets", "LIKE_SET_MAXSIZE", 10000)
+LIKE_SET_REDIS = os.getenv("LIKE_SET_REDIS", "false").lower() == "true"
+LIKE_SET_REDIS_TTL = int(os.getenv("LIKE_SET_REDIS_TTL", "3600"))
+# 한 번에 확인할 수 있는 최대 ID 수
+LIKE_CHECK_MAX_IDS = int(os.getenv("LIKE_CHECK_MAX_IDS", "500"))
+LIKE_CHECK_FORMAT_PATTERN = "^(bool|bitmap)$"
+
+_SENTINEL = "_"
+
+Key = Tuple[str, str]
+
+
+class LikeSetCache:
+    def __init__(self, ttl: float = LIKE_SET_TTL, maxsize: int = LIKE_SET_MAXSIZE, redis: Optional[Redis] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.redis = redis
+        self._entries: "OrderedDict[Key, Tuple[float, Set[int]]]" = OrderedDict()
+        # 조회 중인 키에 들어온 변경 (조회 결과에 덧씌운다)
+        self._loading: Dict[Key, List[Tuple[bool, int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+        self.redis_conflicts = 0
+
+    @staticmethod
+    def redis_key(kind: str, user_id: str) -> str:
+        return f"{KEY_PREFIX}:likes:{kind}:user:{user_id}"
+
+    @classmethod
+    def version_key(cls, kind: str, user_id: str) -> str:
+        return cls.redis_key(kind, user_id) + ":ver"
+
+    async def get(self, kind: str, coll: AsyncIOMotorCollection, user_id: str) -> Set[int]:
+        """캐시에 있는 집합 그대로 (복사하지 않으므로 호출 측은 읽기만)"""
+        key = (kind, user_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return await get_flight("like_sets").do(key, lambda: self._load(key, coll))
+
+    async def contains_many(self, kind: str, coll: AsyncIOMotorCollection, user_id: str,
+                            ids: List[int]) -> List[bool]:
+        liked = await self.get(kind, coll, user_id)
+        return [i in liked for i in ids]
+
+    async def _load(self, key: Key, coll: AsyncIOMotorCollection) -> Set[int]:
+        kind, user_id = key
+        # 집합을 _store 하기 전까지는 변경을 _loading 에 모은다 (그 사이 변경이 빠지지 않도록)
+        self._loading[key] = []
+        try:
+            ids = await self._redis_get(kind, user_id)
+            if ids is None:
+                version = await self._redis_version(kind, user_id)
+                docs = await coll.find({"user_id": user_id}, {"_id": 0, "id": 1}).to_list(length=None)
+                ids = {d["id"] for d in docs}
+                # 조회 중 변경이 있었으면 Redis 에는 올리지 않는다 (다음 조회가 다시 채움)
+                if not self._loading[key]:
+                    await self._redis_put(kind, user_id, ids, version)
+        finally:
+            pending = self._loading.pop(key, [])
+        for liked, id in pending:
+            (ids.add if liked else ids.discard)(id)
+        self._store(key, ids)
+        if pending:
+            await self._redis_delete(kind, user_id)
+        return ids
+
+    def _store(self, key: Key, ids: Set[int]):
+        self._entries[key] = (time.monotonic() + self.ttl, ids)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def apply(self, kind: str, user_id: str, id: int, liked: bool):
+        """로컬 집합만 갱신 (다른 파드의 변경을 change stream 으로 받을 때)"""
+        key = (kind, user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            (entry[1].add if liked else entry[1].discard)(id)
+        if key in self._loading:
+            self._loading[key].append((liked, id))
+
+    async def add(self, kind: str, user_id: str, id: int):
+        self.apply(kind, user_id, id, True)
+        await self._redis_delete(kind, user_id)
+
+    async def remove(self, kind: str, user_id: str, id: int):
+        self.apply(kind, user_id, id, False)
+        await self._redis_delete(kind, user_id)
+
+    def invalidate(self, kind: str, user_id: str):
+        self._entries.pop((kind, user_id), None)
+
+    # ───── Redis 미러 ─────
+    async def _redis_get(self, kind: str, user_id: str) -> Optional[Set[int]]:
+        if self.redis is None:
+            return None
+        try:
+            members = await self.redis.smembers(self.redis_key(kind, user_id))
+        except RedisError as e:
+            self._redis_error("smembers", e)
+            return None
+        if not members:
+            return None
+        self.redis_hits += 1
+        return {int(m) for m in members if m != _SENTINEL}
+
+    async def _redis_version(self, kind: str, user_id: str) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            return await self.redis.get(self.version_key(kind, user_id))
+        except RedisError as e:
+            self._redis_error("get", e)
+            return None
+
+    async def _redis_put(self, kind: str, user_id: str, ids: Iterable[int], version: Optional[str]):
+        """version 은 Mongo 조회 전에 읽은 버전 키 값. 그 사이 add/remove 가 있었으면 올리지 않는다"""
+        if self.redis is None:
+            return
+        key = self.redis_key(kind, user_id)
+        version_key = self.version_key(kind, user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    self.redis_conflicts += 1
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                pipe.sadd(key, _SENTINEL, *ids)
+                pipe.expire(key, LIKE_SET_REDIS_TTL)
+                await pipe.execute()
+        except WatchError:
+            self.redis_conflicts += 1
+        except RedisError as e:
+            self._redis_error("sadd", e)
+
+    async def _redis_delete(self, kind: str, user_id: str):
+        """집합 키를 지우고 버전을 올린다 (진행 중인 다른 조회의 put 을 막는다)"""
+        if self.redis is None:
+            return
+        version_key = self.version_key(kind, user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self.redis_key(kind, user_id))
+                pipe.incr(version_key)
+                pipe.expire(version_key, LIKE_SET_REDIS_TTL)
+                await pipe.execute()
+        except RedisError as e:
+            self._redis_error("delete", e)
+
+    def _redis_error(self, op: str, e: Exception):
+        self.redis_errors += 1
+        logger.warning(f"like_set_redis_error\top={op}\terror={e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "redis": self.redis is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+            "redis_conflicts": self.redis_conflicts,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_like_sets(redis: Optional[Redis]) -> LikeSetCache:
+    return LikeSetCache(redis=redis if LIKE_SET_REDIS else None)
+
+
+def pack_bitmap(flags: List[bool]) -> bytes:
+    """i 번째 플래그 -> (i // 8) 번째 바이트의 (i % 8) 번째 비트 (LSB 부터)"""
+    out = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
@@ -0,0 +1,153 @@
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+from .counters import LikeCounter
+from .pagination import encode_cursor
+
+# 좋아요 목록 페이지 정렬 (limit/cursor 를 줄 때만. 전체 조회는 예전처럼 저장 순서 그대로)
+# 최근 것부터, 같은 시각은 id 순 ((user_id, created_at, id) 인덱스 순서와 같음). created_at 이 없는 예전 기록은 맨 뒤
+LIKED_SORT = [("created_at", -1), ("id", 1)]
+LIKED_CURSOR_SORT = "created_at"
+# created_at 이 없는 기록을 가리키는 커서 값 (그 뒤로는 id 순)
+LIKED_CURSOR_UNDATED = ""
+LIKED_PAGE_DEFAULT = int(os.getenv("LIKED_PAGE_DEFAULT", "50"))
+LIKED_PAGE_MAX = int(os.getenv("LIKED_PAGE_MAX", "1000"))
+
+# replicaSet 환경에서 좋아요 기록 + 카운터를 트랜잭션으로 묶을지 여부
+MONGO_USE_TRANSACTIONS = os.getenv("MONGO_USE_TRANSACTIONS", "false").lower() == "true"
+
+
+def like_timestamp() -> str:
+    """
+    좋아요 created_at. 마이크로초까지 고정 폭이라 문자열 순서 == 시간 순서
+    (isoformat() 은 마이크로초가 0 이면 생략해서 같은 초 안의 순서가 뒤집힌다)
+    """
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class AlreadyLiked(Exception):
+    pass
+
+
+class LikeNotFound(Exception):
+    pass
+
+
+class TargetNotFound(Exception):
+    pass
+
+
+async def liked_page(likes_coll: AsyncIOMotorCollection, user_id: str, limit: int,
+                     after: Optional[Tuple[str, int]] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    사용자 좋아요 기록 한 페이지 (id, created_at) + 다음 커서
+    - after 는 decode_cursor(token, LIKED_CURSOR_SORT) 결과 (마지막 created_at, 마지막 id)
+    - created_at 이 없는 기록은 날짜 있는 기록 뒤에 id 순으로 온다 (커서 값은 LIKED_CURSOR_UNDATED)
+    """
+    query = {"user_id": user_id}
+    if after is not None:
+        created_at, last_id = after
+        if created_at == LIKED_CURSOR_UNDATED:
+            query.update({"created_at": None, "id": {"$gt": last_id}})
+        else:
+            query["$or"] = [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "id": {"$gt": last_id}},
+                            {"created_at": None}]
+    docs = await likes_coll.find(query, {"_id": 0, "id": 1, "created_at": 1}).sort(LIKED_SORT) \
+        .limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["id"], LIKED_CURSOR_SORT,
+                                    docs[-1].get("created_at") or LIKED_CURSOR_UNDATED)
+    return docs, next_cursor
+
+
+async def _run(likes_coll: AsyncIOMotorCollection, op):
+    if not MONGO_USE_TRANSACTIONS:
+        return await op(None)
+    async with await likes_coll.database.client.start_session() as session:
+        # with_transaction 은 TransientTransactionError 재시도까지 처리, 예외 시 abort
+        return await session.with_transaction(op)
+
+
+async def add_like(likes_coll: AsyncIOMotorCollection, target_coll: AsyncIOMotorCollection, id: int, user_id: str):
+    """
+    (id, user_id) unique 인덱스로 중복을 막는다: insert 1회 + $inc 1회
+    - 대상 문서가 없으면 트랜잭션은 abort, 트랜잭션이 없으면 좋아요 기록을 되돌린다
+    """
+    async def op(session):
+        try:
+            await likes_coll.insert_one({
+                "id": id,
+                "user_id": user_id,
+                "created_at": like_timestamp()
+            }, session=session)
+        except DuplicateKeyError:
+            raise AlreadyLiked()
+        res = await target_coll.update_one({"id": id}, {"$inc": {"like_count": 1}}, session=session)
+        if res.matched_count == 0:
+            if session is None:
+                await likes_coll.delete_one({"id": id, "user_id": user_id})
+            raise TargetNotFound()
+
+    await _run(likes_coll, op)
+
+
+async def remove_like(likes_coll: AsyncIOMotorCollection, target_coll: AsyncIOMotorCollection, id: int, user_id: str):
+    """delete 1회 + $inc 1회. 대상 문서가 없으면 삭제한 좋아요 기록을 복구"""
+    async def op(session):
+        deleted = await likes_coll.find_one_and_delete({"id": id, "user_id": user_id}, session=session)
+        if deleted is None:
+            raise LikeNotFound()
+        res = await target_coll.update_one({"id": id}, {"$inc": {"like_count": -1}}, session=session)
+        if res.matched_count == 0:
+            if session is None:
+                deleted.pop("_id", None)
+                await likes_coll.insert_one(deleted)
+            raise TargetNotFound()
+
+    await _run(likes_coll, op)
+
+
+async def _ensure_target(target_coll: AsyncIOMotorCollection, id: int):
+    if await target_coll.find_one({"id": id}, {"_id": 1}) is None:
+        raise TargetNotFound()
+
+
+async def add_like_buffered(likes_coll: AsyncIOMotorCollection, target_coll: AsyncIOMotorCollection,
+                            counter: LikeCounter, target: str, id: int, user_id: str):
+    """buffered 모드: 대상 존재 확인(읽기) + insert 1회, like_count 는 카운터가 모아서 반영"""
+    await _ensure_target(target_coll, id)
+    try:
+        await likes_coll.insert_one({
+            "id": id,
+            "user_id": user_id,
+            "created_at": like_timestamp()
+        })
+    except DuplicateKeyError:
+        raise AlreadyLiked()
+    counter.add(target, id, 1)
+
+
+async def remove_like_buffered(likes_coll: AsyncIOMotorCollection, target_coll: AsyncIOMotorCollection,
+                               counter: LikeCounter, target: str, id: int, user_id: str):
+    await _ensure_target(target_coll, id)
+    res = await likes_coll.delete_one({"id": id, "user_id": user_id})
+    if res.deleted_count == 0:
+        raise LikeNotFound()
+    counter.add(target, id, -1)
+
+
+async def toggle_like(like: bool, likes_coll: AsyncIOMotorCollection, target_coll: AsyncIOMotorCollection,
+                      counter: Optional[LikeCounter], target: str, id: int, user_id: str):
+    """counter 가 있으면(buffered 모드) 카운터 경로, 없으면 즉시 $inc 경로"""
+    if counter is not None:
+        fn = add_like_buffered if like else remove_like_buffered
+        await fn(likes_coll, target_coll, counter, target, id, user_id)
+    else:
+        fn = add_like if like else remove_like
+        await fn(likes_coll, target_coll, id, user_id)
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+# 요청들을 한 번의 $in 으로 모으는 대기 시간(초). 0 이면 같은 이벤트 루프 틱 안에서만 병합
+PRODUCT_LOADER_WINDOW = float(os.getenv("PRODUCT_LOADER_WINDOW", "0.002"))
+# $in 한 번에 넣을 최대 ID 수. 넘으면 청크로 나눠 병렬 조회
+PRODUCT_LOADER_MAX_IN = int(os.getenv("PRODUCT_LOADER_MAX_IN", "500"))
+# 로더 전체에서 동시에 진행하는 $in 조회 수 상한 (큰 요청이 커넥션 풀을 다 잡지 않도록)
+PRODUCT_LOADER_MAX_PARALLEL = int(os.getenv("PRODUCT_LOADER_MAX_PARALLEL", "8"))
+
+
+class _Batch:
+    __slots__ = ("ids", "future", "dispatched")
+
+    def __init__(self, future: asyncio.Future):
+        self.ids: Set[int] = set()
+        self.future = future
+        self.dispatched = False
+
+
+class ProductLoader:
+    """
+    DataLoader 방식의 상품 일괄 조회기
+    - 짧은 시간창 안에 들어온 여러 요청의 ID 를 합쳐(중복 제거) 한 번의 $in 으로 조회
+    - 큰 ID 목록은 max_in 단위 청크로 나눠 병렬 조회 (동시 조회 수는 max_parallel 까지)
+    - 돌려주는 문서는 요청끼리 공유하므로 호출 측에서 수정하지 않는다
+    """
+
+    def __init__(self, coll: AsyncIOMotorCollection, projection: Dict[str, int],
+                 window: float = PRODUCT_LOADER_WINDOW, max_in: int = PRODUCT_LOADER_MAX_IN,
+                 max_parallel: int = PRODUCT_LOADER_MAX_PARALLEL):
+        self.coll = coll
+        self.projection = projection
+        self.window = window
+        self.max_in = max_in
+        self._parallel = asyncio.Semaphore(max(1, max_parallel))
+        self._batch: Optional[_Batch] = None
+
+        self.requested_ids = 0
+        self.fetched_ids = 0
+        self.batches = 0
+        self.queries = 0
+
+    async def load_many(self, ids: Iterable[int]) -> Dict[int, dict]:
+        wanted = list(dict.fromkeys(ids))
+        if not wanted:
+            return {}
+        self.requested_ids += len(wanted)
+
+        if len(wanted) >= self.max_in:
+            # 큰 요청은 시간창을 기다리지 않고 바로 청크 병렬 조회
+            self.batches += 1
+            return await self._fetch(wanted)
+
+        batch = self._batch
+        if batch is None:
+            loop = asyncio.get_running_loop()
+            batch = self._batch = _Batch(loop.create_future())
+            if self.window > 0:
+                loop.call_later(self.window, self._dispatch, batch)
+            else:
+                loop.call_soon(self._dispatch, batch)
+        batch.ids.update(wanted)
+        if len(batch.ids) >= self.max_in:
+            self._dispatch(batch)
+
+        found = await asyncio.shield(batch.future)
+        return {i: found[i] for i in wanted if i in found}
+
+    def _dispatch(self, batch: _Batch):
+        if self._batch is batch:
+            self._batch = None
+        if batch.dispatched:
+            return
+        batch.dispatched = True
+        self.batches += 1
+
+        def done(task: asyncio.Task):
+            if task.cancelled():
+                batch.future.cancel()
+            elif task.exception() is not None:
+                batch.future.set_exception(task.exception())
+            else:
+                batch.future.set_result(task.result())
+
+        asyncio.ensure_future(self._fetch(list(batch.ids))).add_done_callback(done)
+
+    async def _query(self, chunk: List[int]) -> List[dict]:
+        async with self._parallel:
+            return await self.coll.find({"id": {"$in": chunk}}, self.projection).to_list(length=None)
+
+    async def _fetch(self, ids: List[int]) -> Dict[int, dict]:
+        self.fetched_ids += len(ids)
+        chunks = [ids[i:i + self.max_in] for i in range(0, len(ids), self.max_in)]
+        self.queries += len(chunks)
+        results = await asyncio.gather(*(self._query(chunk) for chunk in chunks))
+        return {doc["id"]: doc for docs in results for doc in docs}
+
+    def stats(self) -> dict:
+        return {
+            "requested_ids": self.requested_ids,
+            "fetched_ids": self.fetched_ids,
+            "batches": self.batches,
+            "queries": self.queries,
+            # 요청된 ID 중 병합으로 중복 조회를 피한 비율
+            "dedup_ratio": round(1 - self.fetched_ids / self.requested_ids, 4) if self.requested_ids else 0.0,
+        }
@@ -1,30 +1,71 @@
 # File: product/app/main.py
-from typing import List, Optional
+from typing import List, Optional, Set
 import time
 import os
 import logging
 
 from fastapi import FastAPI, Query, Depends, Path, HTTPException, Header, status, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from datetime import datetime
 from pymongo.errors import ServerSelectionTimeoutError
 import asyncio
-
-# from redis.asyncio import Redis
-
-from .database import product_collection, brand_collection, db, likes_coll, brand_likes_coll # redis
+import base64
+import orjson
+
+from redis.asyncio import Redis
+
+from .database import product_collection, brand_collection, db, likes_coll, brand_likes_coll, redis, \
+    read_product_collection, read_likes_coll, read_brand_likes_coll, MONGO_MAX_POOL_SIZE
+from .brand_cache import brand_cache
+from .pagination import InvalidCursor, encode_cursor, decode_cursor, count_total
+from .search import NGRAM_FIELD, SEARCH_PROJECTION, SEARCH_SORT, name_ngrams, build_search_filter, backfill_ngrams
+from .indexes import ensure_indexes, check_query_plans, index_setup_fingerprint
+from .events import EventBuffer, EventSink
+from .likes import AlreadyLiked, LikeNotFound, TargetNotFound, toggle_like, liked_page, \
+    LIKED_CURSOR_SORT, LIKED_PAGE_DEFAULT, LIKED_PAGE_MAX
+from .counters import LIKE_COUNTER_MODE, CounterTarget, LikeCounter
+from .cache import PRODUCT_CACHE_TTL, LIST_CACHE_TTL, build_response_cache
+from .singleflight import get_flight, flight_stats
+from .serialization import PRODUCT_PROJECTION, BULK_PROJECTION, combined_product, bulk_product
+from .loader import ProductLoader
+from .changes import CHANGE_STREAM_ENABLED, ChangeStreamConsumer, change_id
+from .warmup import warm_up
+from .workers import WEB_CONCURRENCY, run_once_and_wait
+from .http_cache import conditional_response
+from .compression import COMPRESS_ENABLED, CompressionMiddleware
+from .rollups import TRENDING_CACHE_TTL, TRENDING_LIMIT_MAX, TRENDING_METRIC_PATTERN, TRENDING_PERIOD_PATTERN, \
+    RollupWriter, trending
+from .like_sets import LIKE_CHECK_FORMAT_PATTERN, LIKE_CHECK_MAX_IDS, build_like_sets, pack_bitmap
+from .ingest import INGEST_MODE_PATTERN, BulkIngestor, iter_ndjson
+from .facets import FACET_CACHE_TTL, FACET_FIELDS, facet_counts
+from .rankings import (SORT_MODES, SORT_PATTERN, RankingStore, backfill_sort_fields, missing_sort_fields, rank_key,
+                       rank_value)
+from .streaming import STREAM_BATCH_SIZE, STREAM_FORMAT_PATTERN, iter_batches, stream_response
+from . import metrics
 from .schemas import CombinedProduct, ProductBase, PaginatedProducts, BulkProduct, BulkRequest, LikeRequest, \
-    UserLikedProductsResponse, UserLikedBrandsResponse
+    UserLikedProductsResponse, UserLikedBrandsResponse, ProductFacets, LikeMembershipResponse, \
+    TrendingProducts
 
 # Logging setup
-from shared.logging_config import configure_logging
+from shared.logging_config import configure_logging, log_queue_stats
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+# 큰 목록/내보내기 응답 압축 (br 우선, 없으면 gzip)
+if COMPRESS_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 # ───── 로깅 초기화 ─────
-LOG_DIR = os.path.join(os.getcwd(), "logs")
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(os.getcwd(), "logs"))
 os.makedirs(LOG_DIR, exist_ok=True)
-configure_logging(log_file=os.path.join(LOG_DIR, "product_service.log"))
+# 기본은 큐 모드: 요청 처리 중에는 큐에 넣기만 하고 파일 I/O 는 리스너 스레드가 담당
+log_listener = configure_logging(
+    log_file=os.path.join(LOG_DIR, "product_service.log"),
+    queue_mode=os.getenv("LOG_QUEUE_MODE", "true").lower() == "true",
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    overflow=os.getenv("LOG_QUEUE_OVERFLOW", "drop_new"),
+    batch_size=int(os.getenv("LOG_BATCH_SIZE", "64")),
+)
 logger = logging.getLogger("product")
 
 
@@ -41,33 +82,172 @@ async def get_brand_likes_coll() -> AsyncIOMotorCollection:
     return brand_likes_coll
 
 
-# async def get_redis() -> Redis:
-#     return redis
+async def get_redis() -> Optional[Redis]:
+    return redis
 
 
 async def get_likes_db() -> AsyncIOMotorCollection:
     return likes_coll
 
 
+# 읽기 위주 엔드포인트용 (MONGO_READ_PREFERENCE, 기본 secondaryPreferred + maxStaleness)
+# 목록 무효화 직후에는 primary 에서 읽는다 (복제 전 목록이 캐시에 남지 않도록)
+async def get_read_db() -> AsyncIOMotorCollection:
+    if response_cache.read_from_primary():
+        return product_collection
+    return read_product_collection
+
+
+async def get_read_likes_db() -> AsyncIOMotorCollection:
+    return read_likes_coll
+
+
+async def get_read_brand_likes_coll() -> AsyncIOMotorCollection:
+    return read_brand_likes_coll
+
+
+# 상품 ID 일괄 조회는 요청 간에 합쳐서 $in 한 번으로 (bulk / 좋아요 목록 공용, 읽기 핸들 사용)
+product_loader = ProductLoader(read_product_collection, BULK_PROJECTION)
+
+
+async def get_product_loader() -> ProductLoader:
+    return product_loader
+
+
 async def get_user_id(x_user_id: str = Header(..., description="사용자 ID")):
     return x_user_id
 
 
+# 기동 시 쿼리 플랜 점검: off | warn | fail
+INDEX_PLAN_CHECK = os.getenv("MONGO_INDEX_PLAN_CHECK", "off")
+# 인덱스 생성은 이 시간(초) 안에 한 워커(파드 포함)만
+INDEX_LOCK_TTL = float(os.getenv("INDEX_LOCK_TTL", "600"))
+
+# 상품 상세/목록 응답 캐시 (Redis 또는 인메모리. 멀티 워커 인메모리는 change stream 무효화 필요)
+response_cache = build_response_cache(redis, change_stream=CHANGE_STREAM_ENABLED)
+
 # Auxiliary collections for logging
 view_collection = db["product_views"]
 purchase_collection = db["product_purchases"]
 
+# 조회/구매 이벤트는 버퍼에 모았다가 일괄 기록
+event_buffer = EventBuffer(product_collection, {
+    "view": EventSink(view_collection, "view_count", "viewed_at"),
+    "purchase": EventSink(purchase_collection, "purchase_count", "purchased_at"),
+})
+
+# like_count 델타 집계 + 주기적 재계산
+like_counter = LikeCounter({
+    "product": CounterTarget(product_collection, likes_coll),
+    "brand": CounterTarget(brand_collection, brand_likes_coll),
+})
+# buffered 모드일 때만 핸들러가 카운터를 거친다
+active_like_counter = like_counter if LIKE_COUNTER_MODE == "buffered" else None
+
+# 정렬 목록용 상위 N 랭킹 (카운터/이벤트 flush 와 상품 수정 시 증분 반영)
+rankings = RankingStore(product_collection, read_product_collection)
+
+
+async def _on_like_counts_flushed(target: str, ids: List[int]):
+    if target == "brand":
+        for brand_id in ids:
+            brand_cache.invalidate(brand_id)
+    else:
+        rankings.mark_dirty(ids)
+        await response_cache.invalidate_products(ids)
+
+
+like_counter.listeners.append(_on_like_counts_flushed)
+event_buffer.listeners.append(lambda batch: rankings.mark_dirty(doc["product_id"] for _, doc in batch))
+
+# 기록된 이벤트를 시간/일 버킷에 $inc (트렌딩은 버킷만 읽는다)
+rollup_writer = RollupWriter(db)
+event_buffer.listeners.append(rollup_writer)
+
+# 좋아요 여부 일괄 확인용 사용자별 좋아요 집합
+like_sets = build_like_sets(redis)
+
+# 다른 파드/서비스의 쓰기를 change stream 으로 받아 로컬 캐시에 반영
+change_consumer = ChangeStreamConsumer(db)
+COUNTER_FIELDS = {"like_count", "view_count", "purchase_count"}
+
+
+async def _on_product_change(change: dict):
+    product_id = change_id(change)
+    if product_id is None and change["operationType"] == "delete":
+        # pre-image 가 없으면 documentKey._id 로 상세 캐시를 채울 때 남긴 id 를 찾는다
+        product_id = await response_cache.product_id_for(change["documentKey"]["_id"])
+    if product_id is not None:
+        rankings.mark_dirty([product_id])
+        await response_cache.invalidate_product(product_id)
+    # 카운터만 바뀐 update 는 목록 캐시를 유지 (짧은 TTL 로 갱신)
+    fields = (change.get("updateDescription") or {}).get("updatedFields") or {}
+    if change["operationType"] != "update" or not set(fields) <= COUNTER_FIELDS:
+        await response_cache.invalidate_lists()
+
+
+def _on_brand_change(change: dict):
+    # id 를 모르는 삭제 이벤트(pre-image 없음)면 브랜드 캐시 전체 비움
+    brand_cache.invalidate(change_id(change))
+
+
+async def _on_change_stream_reset():
+    brand_cache.invalidate()
+    await response_cache.invalidate_lists()
+    await rankings.rebuild()
+
+
+def _like_set_handler(kind: str):
+    # 삽입은 fullDocument, 삭제는 pre-image 가 있을 때만 user_id 를 안다 (없으면 LIKE_SET_TTL 후 반영)
+    def handle(change: dict):
+        op = change["operationType"]
+        doc = change.get("fullDocument") if op == "insert" else change.get("fullDocumentBeforeChange")
+        if op in ("insert", "delete") and doc and doc.get("user_id") is not None:
+            like_sets.apply(kind, doc["user_id"], doc["id"], op == "insert")
+    return handle
+
+
+change_consumer.subscribe("product", _on_product_change)
+change_consumer.subscribe("brand", _on_brand_change)
+change_consumer.subscribe("likes", _like_set_handler("product"))
+change_consumer.subscribe("brand_likes", _like_set_handler("brand"))
+change_consumer.reset_handlers.append(_on_change_stream_reset)
+
+# 컴포넌트 카운터를 /metrics 에 노출
+metrics.register_collector("brand_cache", brand_cache.stats)
+metrics.register_collector("response_cache", response_cache.stats)
+metrics.register_collector("singleflight", flight_stats)
+metrics.register_collector("product_loader", product_loader.stats)
+metrics.register_collector("event_buffer", event_buffer.stats)
+metrics.register_collector("like_counter", lambda: {"mode": LIKE_COUNTER_MODE, **like_counter.stats()})
+metrics.register_collector("rollups", rollup_writer.stats)
+metrics.register_collector("rankings", rankings.stats)
+metrics.register_collector("change_stream", change_consumer.stats)
+metrics.register_collector("like_sets", like_sets.stats)
+metrics.register_collector("log_queue", log_queue_stats)
+metrics.register_collector("mongo_pool", lambda: {"max_pool_size": MONGO_MAX_POOL_SIZE})
+
 
 # Middleware: 한 요청당 한 줄 로깅
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    if request.url.path == "/health":
+    if request.url.path in ("/health", "/metrics"):
         response = await call_next(request)
         return response
-    
-    start = time.time()
-    response = await call_next(request)
-    elapsed_ms = (time.time() - start) * 1000
+
+    metrics.REQUESTS_IN_FLIGHT.inc(request.method)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec(request.method)
+    elapsed = time.perf_counter() - start
+    elapsed_ms = elapsed * 1000
+
+    # 라우트 템플릿 기준 (/product/{id}) 으로 집계해서 라벨 수가 폭증하지 않게
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    metrics.REQUEST_LATENCY.observe(elapsed, request.method, route_path, str(response.status_code))
 
     # 탭 구분 api_request 로그
     params_info = ""
@@ -90,38 +270,110 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# 기동 시 띄우는 백그라운드 작업 (참조를 잡아 두지 않으면 GC 될 수 있다)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"background_task_failed\ttask={task.get_name()}\terror={task.exception()}")
+
+
+def _start_background(name: str, coro):
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+
+
+async def _index_setup():
+    await ensure_indexes(db)
+
+    # 기존 상품의 n-gram 토큰 / 정렬 필드 채우기는 기동을 막지 않도록 백그라운드로
+    _start_background("backfill_ngrams", backfill_ngrams(product_collection))
+    _start_background("backfill_sort_fields", backfill_sort_fields(product_collection))
+
+    if INDEX_PLAN_CHECK != "off":
+        failures = await check_query_plans(db)
+        if failures:
+            logger.warning(f"index_plan_check\tfailed={','.join(failures)}")
+            if INDEX_PLAN_CHECK == "fail":
+                raise RuntimeError(f"COLLSCAN/메모리 정렬 쿼리 형태 발견: {failures}")
+
+
 @app.on_event("startup")
 async def ensure_mongo_indexes():
+    # 잠금을 잡은 워커만 인덱스 생성/점검, 나머지는 그 워커가 끝낼 때까지 기동(요청 수신)을 미룬다
+    # (첫 배포에서 likes (id, user_id) 유일 인덱스가 생기기 전에 중복 좋아요가 들어오지 않도록)
+    # 선언(인덱스/점검 형태)이 바뀐 배포는 잠금 이름이 달라 이전 배포의 잠금(INDEX_LOCK_TTL)에 막히지 않는다
+    lock_name = f"ensure_indexes:{index_setup_fingerprint()}"
     for _ in range(5):
         try:
-            await product_collection.create_index([("id", 1)], unique=True)
-            await brand_collection.create_index([("id", 1)], unique=True)
-            await product_collection.create_index([("major_category", 1)], name="idx_major_category")
-            await product_collection.create_index([("gender", 1)], name="idx_gender")
-            return
+            leader = await run_once_and_wait(db, lock_name, INDEX_LOCK_TTL, _index_setup)
+            break
         except ServerSelectionTimeoutError:
             await asyncio.sleep(2)
-    raise RuntimeError("MongoDB 연결 실패 - 인덱스 생성 불가")
+    else:
+        raise RuntimeError("MongoDB 연결 실패 - 인덱스 생성 불가")
+    logger.info(f"index_setup\tleader={leader}\tworkers={WEB_CONCURRENCY}\tpid={os.getpid()}")
+
+@app.on_event("startup")
+async def start_event_buffer():
+    event_buffer.start()
+    like_counter.start(buffered=active_like_counter is not None)
+    rankings.start()
+    if CHANGE_STREAM_ENABLED:
+        change_consumer.start()
+    # 인기 상품 상세 캐시 미리 채우기 (WARMUP_PRODUCTS > 0 일 때, 기동은 막지 않음)
+    _start_background("warm_up", warm_up(product_collection, brand_collection, response_cache, rankings,
+                                         PRODUCT_CACHE_TTL))
+
+
+@app.on_event("shutdown")
+async def flush_event_buffer():
+    for task in list(_background_tasks):
+        task.cancel()
+    await event_buffer.stop()
+    await like_counter.stop()
+    await rankings.stop()
+    await change_consumer.stop()
+    if log_listener is not None:
+        log_listener.stop()
+
 
 @app.get("/health", status_code=200)
 async def health_check():
     return {"status": "ok"}
 
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Endpoints
 @app.get("/product", response_model=PaginatedProducts)
 async def list_products(
+        request: Request,
         name: Optional[str] = Query(None, description="상품명 키워드"),
         major_category: Optional[str] = Query(None, description="메이저 카테고리"),
         gender: Optional[str] = Query(None, description="성별 (M/F/U 등)"),
         brand_id: Optional[int] = Query(None, description="브랜드 ID"),
         page: int = Query(1, ge=1, description="페이지 번호"),
         size: int = Query(10, ge=1, le=100, description="페이지 크기"),
-        collection: AsyncIOMotorCollection = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="커서 페이지네이션 토큰 (첫 페이지는 빈 값, 지정 시 page 무시)"),
+        total_mode: str = Query("exact", pattern="^(exact|estimated|none)$", description="total 계산 방식"),
+        sort: Optional[str] = Query(None, pattern=SORT_PATTERN,
+                                    description="정렬 (popular | most_viewed | best_selling | discount | price_asc | price_desc)"),
+        collection: AsyncIOMotorCollection = Depends(get_read_db),
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
 ):
     query = {}
     if name:
-        query["name"] = {"$regex": name, "$options": "i"}
+        search_filter = build_search_filter(name)
+        if search_filter is None:
+            return PaginatedProducts(total=0, items=[])
+        query.update(search_filter)
     if major_category:
         query["major_category"] = major_category
     if gender:
@@ -129,50 +381,210 @@ async def list_products(
     if brand_id is not None:
         query["brand_id"] = brand_id
 
-    total = await collection.count_documents(query)
-    skip = (page - 1) * size
-    products = await collection.find(query).skip(skip).limit(size).to_list(length=size)
+    last = None
+    if cursor is not None:
+        try:
+            last = decode_cursor(cursor, sort)
+        except InvalidCursor:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="잘못된 cursor 입니다.")
+    last_id = last[1] if last else None
+
+    async def load():
+        total = await count_total(collection, query, total_mode)
+
+        next_cursor = None
+        if sort:
+            filters = {"major_category": major_category, "gender": gender, "brand_id": brand_id}
+            products, next_cursor = await sorted_page(
+                collection, query, None if name else filters, sort, page, size, cursor is not None, last)
+        elif cursor is not None:
+            # 커서 모드: id 인덱스 범위 스캔으로 깊은 페이지도 일정한 비용
+            page_query = dict(query)
+            if last_id is not None:
+                page_query["id"] = {"$gt": last_id}
+            products = await collection.find(page_query, PRODUCT_PROJECTION).sort("id", 1) \
+                .limit(size + 1).to_list(length=size + 1)
+            if len(products) > size:
+                products = products[:size]
+                next_cursor = encode_cursor(products[-1]["id"])
+        elif name:
+            # 검색어가 있으면 텍스트 점수 순으로 랭킹
+            skip = (page - 1) * size
+            products = await collection.find(query, {**PRODUCT_PROJECTION, **SEARCH_PROJECTION}) \
+                .sort(SEARCH_SORT).skip(skip).limit(size).to_list(length=size)
+        else:
+            skip = (page - 1) * size
+            products = await collection.find(query, PRODUCT_PROJECTION).skip(skip).limit(size).to_list(length=size)
+
+        brand_map = await brand_cache.get_many(brand_coll, [p.get("brand_id") for p in products])
+
+        # 검증 없이 스키마 기본값 + 문서 필드로 응답 dict 구성
+        items = [combined_product(prod, brand_map.get(prod.get("brand_id"))) for prod in products]
+        return {"total": total, "items": items, "next_cursor": next_cursor}
+
+    key = await response_cache.list_key("list", {
+        "name": name, "major_category": major_category, "gender": gender, "brand_id": brand_id,
+        "page": page if cursor is None else None, "size": size, "cursor": cursor, "total_mode": total_mode,
+        "sort": sort,
+    })
+    body = await response_cache.get_or_load_text(key, LIST_CACHE_TTL, load, flight="list_products")
+    return conditional_response(request, body, "list")
+
+
+# 랭킹 밖(또는 랭킹 없는 범위) page 모드 정렬 목록의 최대 skip. 더 깊은 페이지는 cursor 로
+SORTED_PAGE_MAX_OFFSET = int(os.getenv("SORTED_PAGE_MAX_OFFSET", "5000"))
+
+
+async def sorted_page(collection: AsyncIOMotorCollection, query: dict, filters: Optional[dict], sort: str,
+                      page: int, size: int, cursor_mode: bool, last: Optional[tuple]):
+    """
+    정렬 모드 목록 한 페이지 + 다음 커서
+    - 랭킹으로 답할 수 있으면 해당 페이지 ID 만 조회 (검색어가 있으면 filters=None 으로 랭킹 사용 안 함)
+    - 아니면 (정렬 필드, id) 인덱스 순서로 쿼리. skip 은 SORTED_PAGE_MAX_OFFSET 까지만
+    """
+    mode = SORT_MODES[sort]
+    limit = size + 1 if cursor_mode else size
+    start = 0 if cursor_mode else (page - 1) * size
+    after = rank_key(sort, last[0], last[1]) if last else None
+
+    keys = rankings.page_keys(filters, sort, start, limit, after) if filters is not None else None
+    if keys is not None:
+        # 다음 페이지 여부/커서는 랭킹 키 기준 (삭제됐거나 secondary 에 아직 없는 상품이 빠져도 이어서 읽도록)
+        page_keys = keys[:size]
+        docs = await collection.find({"id": {"$in": [k[1] for k in page_keys]}}, PRODUCT_PROJECTION) \
+            .to_list(length=None)
+        by_id = {d["id"]: d for d in docs}
+        products = [by_id[k[1]] for k in page_keys if k[1] in by_id]
+        if len(products) < len(page_keys):
+            rankings.mark_dirty(k[1] for k in page_keys if k[1] not in by_id)
+        has_more = len(keys) > size
+        last_key = (rank_value(sort, page_keys[-1]), page_keys[-1][1]) if page_keys else None
+    else:
+        if not cursor_mode and start > SORTED_PAGE_MAX_OFFSET:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST,
+                                detail=f"정렬 목록은 {SORTED_PAGE_MAX_OFFSET}번째 이후를 page 로 조회할 수 없습니다. cursor 를 사용하세요.")
+        page_query = dict(query)
+        if last:
+            op = "$lt" if mode.direction < 0 else "$gt"
+            page_query["$or"] = [{mode.field: {op: last[0]}}, {mode.field: last[0], "id": {"$gt": last[1]}}]
+        find = collection.find(page_query, PRODUCT_PROJECTION).sort([(mode.field, mode.direction), ("id", 1)])
+        if not cursor_mode:
+            find = find.skip(start)
+        products = await find.limit(limit).to_list(length=limit)
+        has_more = len(products) > size
+        products = products[:size]
+        last_key = (products[-1].get(mode.field) or 0, products[-1]["id"]) if products else None
+
+    next_cursor = None
+    if cursor_mode and has_more:
+        next_cursor = encode_cursor(last_key[1], sort, last_key[0])
+    return products, next_cursor
+
+
+@app.get("/product/facets", response_model=ProductFacets, summary="필터별 facet 카운트")
+async def product_facets(
+        request: Request,
+        name: Optional[str] = Query(None, description="상품명 키워드"),
+        major_category: Optional[str] = Query(None, description="메이저 카테고리"),
+        gender: Optional[str] = Query(None, description="성별 (M/F/U 등)"),
+        brand_id: Optional[int] = Query(None, description="브랜드 ID"),
+        collection: AsyncIOMotorCollection = Depends(get_read_db),
+):
+    # 현재 필터 기준 major_category / gender / sub_category / brand_id 별 개수를 aggregation 한 번으로
+    query = {}
+    if name:
+        search_filter = build_search_filter(name)
+        if search_filter is None:
+            return {"total": 0, "facets": {field: [] for field in FACET_FIELDS}}
+        query.update(search_filter)
+    if major_category:
+        query["major_category"] = major_category
+    if gender:
+        query["gender"] = gender
+    if brand_id is not None:
+        query["brand_id"] = brand_id
 
-    brands = await brand_coll.find().to_list(length=None)
-    brand_map = {b["id"]: b for b in brands}
+    # 목록 캐시와 같은 세대 키: 상품 생성/수정/삭제 시 함께 무효화
+    key = await response_cache.list_key("facets", {
+        "name": name, "major_category": major_category, "gender": gender, "brand_id": brand_id,
+    })
+    body = await response_cache.get_or_load_text(
+        key, FACET_CACHE_TTL, lambda: facet_counts(collection, query), flight="product_facets")
+    return conditional_response(request, body, "facets")
+
+
+@app.get("/product/trending", response_model=TrendingProducts, summary="기간별 조회/구매 상위 상품")
+async def trending_products(
+        request: Request,
+        period: str = Query("24h", pattern=TRENDING_PERIOD_PATTERN, description="1h | 6h | 24h | 7d | 30d (직전 N 시간/일 버킷 + 현재 버킷)"),
+        metric: str = Query("views", pattern=TRENDING_METRIC_PATTERN, description="views | purchases"),
+        limit: int = Query(20, ge=1, le=TRENDING_LIMIT_MAX),
+        loader: ProductLoader = Depends(get_product_loader),
+):
+    # 원본 이벤트가 아니라 기간 안의 시간/일 버킷만 집계 (현재 진행 중인 버킷 포함)
+    async def load():
+        ranked = await trending(db, period, metric, limit)
+        found = await loader.load_many([r["product_id"] for r in ranked])
+        items = [{"id": r["product_id"], "name": found[r["product_id"]].get("name"),
+                  "img_url": found[r["product_id"]].get("img_url"), "count": r["count"]}
+                 for r in ranked if r["product_id"] in found]
+        return {"period": period, "metric": metric, "items": items}
+
+    key = await response_cache.list_key("trending", {"period": period, "metric": metric, "limit": limit})
+    body = await response_cache.get_or_load_text(key, TRENDING_CACHE_TTL, load, flight="trending")
+    return conditional_response(request, body, "trending")
+
+
+@app.get("/product/export", summary="전체 상품 카탈로그 스트리밍 내보내기")
+async def export_products(
+        format: str = Query("ndjson", pattern=STREAM_FORMAT_PATTERN, description="ndjson | json"),
+        major_category: Optional[str] = Query(None, description="메이저 카테고리"),
+        gender: Optional[str] = Query(None, description="성별 (M/F/U 등)"),
+        brand_id: Optional[int] = Query(None, description="브랜드 ID"),
+        collection: AsyncIOMotorCollection = Depends(get_read_db),
+        brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
+):
+    # 색인 작업용: id 순으로 배치 단위 조회 후 바로 전송 (메모리는 배치 하나 분량)
+    query = {}
+    if major_category:
+        query["major_category"] = major_category
+    if gender:
+        query["gender"] = gender
+    if brand_id is not None:
+        query["brand_id"] = brand_id
 
-    combined_list: List[CombinedProduct] = []
-    for prod in products:
-        data = prod.copy()
-        if brand := brand_map.get(prod["brand_id"]):
-            data.update({
-                "brand_kor": brand["brand_kor"],
-                "brand_eng": brand["brand_eng"],
-                "brand_like_count": brand["like_count"],
-            })
-        combined_list.append(CombinedProduct(**data))
+    async def batches():
+        cursor = collection.find(query, PRODUCT_PROJECTION).sort("id", 1)
+        async for products in iter_batches(cursor):
+            brand_map = await brand_cache.get_many(brand_coll, [p.get("brand_id") for p in products])
+            yield [combined_product(p, brand_map.get(p.get("brand_id"))) for p in products]
 
-    return PaginatedProducts(total=total, items=combined_list)
+    return stream_response(batches(), format)
 
 
 @app.get("/product/{id}", response_model=CombinedProduct)
 async def get_product(
+        request: Request,
         id: int = Path(..., description="조회할 상품의 ID"),
         collection: AsyncIOMotorCollection = Depends(get_db),
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
 ):
-    prod = await collection.find_one({"id": id})
-    if not prod:
+    async def load():
+        prod = await collection.find_one({"id": id}, {**PRODUCT_PROJECTION, "_id": 1})
+        if not prod:
+            return None
+        # 삭제 change 이벤트(documentKey._id 만 있음)에서 이 상세 캐시를 찾을 수 있도록
+        await response_cache.remember_product_oid(prod.pop("_id"), id, PRODUCT_CACHE_TTL)
+
+        brand_info = await brand_cache.get(brand_coll, prod.get("brand_id"))
+        return combined_product(prod, brand_info)
+
+    body = await response_cache.get_or_load_text(response_cache.product_key(id), PRODUCT_CACHE_TTL, load,
+                                                 flight="get_product")
+    if body is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Product not found")
-
-    brand_info = await brand_coll.find_one({"id": prod["brand_id"]})
-    combined = {**prod}
-    if brand_info:
-        combined.update({
-            "brand_kor": brand_info["brand_kor"],
-            "brand_eng": brand_info["brand_eng"],
-            "brand_like_count": brand_info["like_count"],
-        })
-    try:
-        return CombinedProduct(**combined)
-    except Exception as e:
-        print(f"Error parsing CombinedProduct: {e}")
-        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="데이터 변환 오류")
+    # 캐시된 JSON 텍스트 그대로 (If-None-Match / If-Modified-Since 가 맞으면 304)
+    return conditional_response(request, body, "product")
 
 
 @app.post("/product", response_model=ProductBase, status_code=status.HTTP_201_CREATED)
@@ -182,11 +594,45 @@ async def create_product(
 ):
     now = datetime.utcnow().isoformat() + "Z"
     doc = product.dict(exclude_unset=True)
-    doc.update({"created_at": now, "updated_at": now})
+    doc.update({"created_at": now, "updated_at": now, **missing_sort_fields(doc)})
+    if doc.get("name"):
+        doc[NGRAM_FIELD] = name_ngrams(doc["name"])
     await collection.update_one({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True)
+    rankings.mark_dirty([doc["id"]])
+    await response_cache.invalidate_lists()
     return ProductBase(**doc)
 
 
+@app.post("/product/ingest", summary="상품 일괄 등록/갱신 (JSON 배열 또는 NDJSON)")
+async def ingest_products(
+        request: Request,
+        mode: str = Query("upsert", pattern=INGEST_MODE_PATTERN,
+                          description="upsert: 있으면 갱신 / insert: 없을 때만 등록 (POST /product 와 같음)"),
+        collection: AsyncIOMotorCollection = Depends(get_db),
+):
+    async def on_batch(ids: List[int]):
+        # 배치당 한 번: 상세 키 일괄 삭제 + 목록 세대 증가
+        rankings.mark_dirty(ids)
+        await response_cache.invalidate_products(ids)
+        await response_cache.invalidate_lists()
+
+    ingestor = BulkIngestor(collection, mode, on_batch=on_batch)
+    if "ndjson" in request.headers.get("content-type", ""):
+        # NDJSON 은 본문을 다 받기 전에 줄 단위로 검증/기록을 시작한다
+        async for index, item in iter_ndjson(request.stream()):
+            await ingestor.add(index, item)
+    else:
+        try:
+            items = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="JSON 배열 또는 NDJSON 이어야 합니다.")
+        if not isinstance(items, list):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="JSON 배열 또는 NDJSON 이어야 합니다.")
+        for index, item in enumerate(items):
+            await ingestor.add(index, item)
+    return ORJSONResponse(await ingestor.finish())
+
+
 @app.post(
     "/product/{id}/like",
     status_code=status.HTTP_201_CREATED,
@@ -199,28 +645,18 @@ async def like_product(
         # redis: Redis = Depends(get_redis),
         product_collection: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    # 1) 이미 좋아요 했는지 확인
-    exists = await like_coll.find_one({
-        "id": id,
-        "user_id": body.user_id
-    })
-    if exists:
+    # 1~2) 좋아요 기록 + like_count 증가 (중복은 unique 인덱스가 막는다)
+    try:
+        await toggle_like(True, like_coll, product_collection, active_like_counter, "product", id, body.user_id)
+    except AlreadyLiked:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="이미 좋아요한 상태입니다.")
-
-    # 2) MongoDB에 기록
-    await likes_coll.insert_one({
-        "id": id,
-        "user_id": body.user_id,
-        "created_at": datetime.utcnow().isoformat() + "Z"
-    })
-    update_result = await product_collection.update_one(
-        {"id": id},
-        {"$inc": {"like_count": 1}}
-    )
-    if update_result.matched_count == 0:
+    except TargetNotFound:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "상품을 찾을 수 없습니다.")
-    # 3) Redis set에 추가
-    # await redis.sadd(f"likes:{id}", body.user_id)
+    if active_like_counter is None:
+        rankings.mark_dirty([id])
+        await response_cache.invalidate_product(id)
+    # 3) 사용자 좋아요 집합 갱신
+    await like_sets.add("product", body.user_id, id)
 
     return {"message": "좋아요 처리되었습니다."}
 
@@ -237,27 +673,77 @@ async def unlike_product(
         # redis: Redis = Depends(get_redis),
         product_collection: AsyncIOMotorCollection = Depends(get_db)
 ):
-    delete_result = await likes_coll.delete_one({"id": id, "user_id": user_id})
-    if delete_result.deleted_count == 0:
+    try:
+        await toggle_like(False, likes_coll, product_collection, active_like_counter, "product", id, user_id)
+    except LikeNotFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="좋아요 내역이 없습니다."
         )
-    update_result = await product_collection.update_one(
-        {"id": id},
-        {"$inc": {"like_count": -1}}
-    )
-    if update_result.matched_count == 0:
-        # 삭제는 됐지만, 상품 자체가 없으면 복구용으로 1 되돌리기
-        await product_collection.update_one({"id": id}, {"$inc": {"like_count": -1}})
+    except TargetNotFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="상품을 찾을 수 없습니다."
         )
-    # await redis.srem(f"likes:{id}", user_id)
+    if active_like_counter is None:
+        rankings.mark_dirty([id])
+        await response_cache.invalidate_product(id)
+    await like_sets.remove("product", user_id, id)
     return {"message": "좋아요가 취소되었습니다."}
 
 
+def parse_check_ids(ids: str) -> List[int]:
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="ids 는 쉼표로 구분한 정수여야 합니다.")
+    if len(parsed) > LIKE_CHECK_MAX_IDS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"ids 는 최대 {LIKE_CHECK_MAX_IDS}개까지 가능합니다.")
+    return parsed
+
+
+async def like_membership(kind: str, likes_coll: AsyncIOMotorCollection, user_id: str, ids: str, format: str):
+    parsed = parse_check_ids(ids)
+    liked = await like_sets.contains_many(kind, likes_coll, user_id, parsed)
+    if format == "bitmap":
+        return ORJSONResponse({"user_id": user_id, "ids": parsed, "liked": None,
+                               "bitmap": base64.b64encode(pack_bitmap(liked)).decode()})
+    return ORJSONResponse({"user_id": user_id, "ids": parsed, "liked": liked, "bitmap": None})
+
+
+@app.get(
+    "/product/like/check/{user_id}",
+    response_model=LikeMembershipResponse,
+    summary="사용자가 주어진 상품들을 좋아요했는지 일괄 확인"
+)
+async def check_liked_products(
+        user_id: str,
+        ids: str = Query(..., description="확인할 상품 ID (쉼표 구분)"),
+        format: str = Query("bool", pattern=LIKE_CHECK_FORMAT_PATTERN, description="bool | bitmap"),
+        likes_coll: AsyncIOMotorCollection = Depends(get_likes_db),
+):
+    # 자기 쓰기 직후 확인하는 경우가 많아 primary 기준 (집합 캐시가 대부분을 흡수)
+    return await like_membership("product", likes_coll, user_id, ids, format)
+
+
+async def liked_ids(likes_coll: AsyncIOMotorCollection, user_id: str, limit: Optional[int],
+                    cursor: Optional[str]):
+    """
+    좋아요한 대상 ID + 다음 커서
+    - limit/cursor 가 없으면(ids_only 전체 조회) id 만 projection 해서 전부, 기존 전체 조회와 같은 저장 순서
+    - 있으면 최근 좋아요 순 페이지
+    """
+    if limit is None and cursor is None:
+        docs = await likes_coll.find({"user_id": user_id}, {"_id": 0, "id": 1}).to_list(length=None)
+        return [d["id"] for d in docs], None
+    try:
+        after = decode_cursor(cursor, LIKED_CURSOR_SORT) if cursor else None
+    except InvalidCursor:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="잘못된 cursor 입니다.")
+    docs, next_cursor = await liked_page(likes_coll, user_id, limit or LIKED_PAGE_DEFAULT, after)
+    return [d["id"] for d in docs], next_cursor
+
+
 @app.get(
     "/product/like/count/{user_id}",
     response_model=UserLikedProductsResponse,
@@ -265,24 +751,49 @@ async def unlike_product(
 )
 async def get_user_liked_products(
         user_id: str,
-        likes_coll: AsyncIOMotorDatabase = Depends(get_likes_db),
-        product_collection: AsyncIOMotorCollection = Depends(get_db)
+        stream: Optional[str] = Query(None, pattern=STREAM_FORMAT_PATTERN,
+                                      description="지정 시 like_products 항목만 스트리밍 (ndjson | json)"),
+        limit: Optional[int] = Query(None, ge=1, le=LIKED_PAGE_MAX,
+                                     description="페이지 크기 (limit 또는 cursor 를 주면 최근 좋아요 순 페이지 조회)"),
+        cursor: Optional[str] = Query(None, description="다음 페이지 토큰 (첫 페이지는 빈 값)"),
+        ids_only: bool = Query(False, description="상품 조인 없이 like_product_ids 만 반환"),
+        likes_coll: AsyncIOMotorDatabase = Depends(get_read_likes_db),
+        loader: ProductLoader = Depends(get_product_loader),
 ):
-    like_docs = await likes_coll.find({"user_id": user_id}).to_list()
+    if stream:
+        async def batches():
+            cursor = likes_coll.find({"user_id": user_id}, {"_id": 0, "id": 1})
+            async for likes in iter_batches(cursor):
+                ids = [doc["id"] for doc in likes]
+                found = await loader.load_many(ids)
+                yield [{"id": i, "name": found[i].get("name"), "img_url": found[i].get("img_url")}
+                       for i in ids if i in found]
+
+        return stream_response(batches(), stream)
+
+    if limit is not None or cursor is not None or ids_only:
+        ids, next_cursor = await liked_ids(likes_coll, user_id, limit, cursor)
+        if ids_only:
+            return ORJSONResponse({"user_id": user_id, "like_products": [], "like_product_ids": ids,
+                                   "next_cursor": next_cursor})
+        # 상품 조인은 이 페이지 ID 만
+        found = await loader.load_many(ids)
+        items = [{"id": i, "name": found[i].get("name"), "img_url": found[i].get("img_url")}
+                 for i in ids if i in found]
+        return ORJSONResponse({"user_id": user_id, "like_products": items, "like_product_ids": None,
+                               "next_cursor": next_cursor})
+
+    like_docs = await likes_coll.find({"user_id": user_id}, {"_id": 0, "id": 1}).to_list()
     if not like_docs:
         raise HTTPException(status_code=200, detail="좋아요 내역이 없습니다.")
 
     # 2) ID 리스트 추출 (중복 제거를 원하면 set(...) 사용)
     ids = [doc["id"] for doc in like_docs]
 
-    # 3) products 컬렉션에서 id, name, img_url 필드만 Projection 하여 조회
-    prod_docs = await product_collection.find(
-        {"id": {"$in": ids}},
-        {"id": 1, "name": 1, "img_url": 1}
-    ).to_list(length=None)
+    # 3) 다른 요청과 합쳐진 $in 조회 (bulk 와 같은 projection, 필요한 필드만 응답 모델이 고른다)
+    prod_map = await loader.load_many(ids)
 
-    # 4) 원래 users liked 순으로 정렬하려면:
-    prod_map = {p["id"]: p for p in prod_docs}
+    # 4) 원래 users liked 순으로 정렬
     ordered = [prod_map[i] for i in ids if i in prod_map]
 
     return UserLikedProductsResponse(user_id=user_id, like_products=ordered)
@@ -302,9 +813,16 @@ async def update_product(
         return ProductBase(**existing)
 
     update_data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+    # 정렬 필드를 null 로 지우지 않는다 (빠진 필드는 그대로 둔다)
+    update_data.update({f: 0 for f in missing_sort_fields(update_data) if f in update_data})
+    if "name" in update_data:
+        update_data[NGRAM_FIELD] = name_ngrams(update_data["name"])
     result = await collection.update_one({"id": id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Product not found")
+    rankings.mark_dirty([id])
+    await response_cache.invalidate_product(id)
+    await response_cache.invalidate_lists()
     updated_doc = await collection.find_one({"id": id})
     return ProductBase(**updated_doc)
 
@@ -317,6 +835,9 @@ async def delete_product(
     result = await collection.delete_one({"id": id})
     if result.deleted_count == 0:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Product not found")
+    rankings.mark_dirty([id])
+    await response_cache.invalidate_product(id)
+    await response_cache.invalidate_lists()
 
 
 @app.post("/product/{id}/view", status_code=status.HTTP_204_NO_CONTENT)
@@ -324,13 +845,7 @@ async def view_product(
         id: int,
         user_id: str = Depends(get_user_id),
 ):
-    now = datetime.utcnow().isoformat() + "Z"
-    await view_collection.insert_one({
-        "user_id": user_id,
-        "product_id": id,
-        "viewed_at": now
-    })
-    await product_collection.update_one({"id": id}, {"$inc": {"view_count": 1}})
+    await event_buffer.record("view", id, user_id)
 
 
 @app.post("/product/{id}/purchase", status_code=status.HTTP_204_NO_CONTENT)
@@ -338,46 +853,41 @@ async def purchase_product(
         id: int,
         user_id: str = Depends(get_user_id),
 ):
-    now = datetime.utcnow().isoformat() + "Z"
-    await purchase_collection.insert_one({
-        "user_id": user_id,
-        "product_id": id,
-        "purchased_at": now
-    })
-    await product_collection.update_one({"id": id}, {"$inc": {"purchase_count": 1}})
+    await event_buffer.record("purchase", id, user_id)
 
 
 @app.post("/product/bulk", response_model=List[BulkProduct])
 async def bulk_products(
         req: BulkRequest,
-        prod_coll: AsyncIOMotorCollection = Depends(get_db),
+        stream: Optional[str] = Query(None, pattern=STREAM_FORMAT_PATTERN, description="스트리밍 응답 형식 (ndjson | json)"),
+        loader: ProductLoader = Depends(get_product_loader),
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
 ):
-    # 1) 상품 일괄 조회
-    products = await prod_coll.find({"id": {"$in": req.product_ids}}).to_list(length=None)
-
-    # 2) 관련 브랜드 일괄 조회
-    brand_ids = [p["brand_id"] for p in products if p.get("brand_id") is not None]
-    brands = await brand_coll.find({"id": {"$in": brand_ids}}).to_list(length=None)
-    brand_map = {b["id"]: b for b in brands}
-
-    # 3) BulkProduct 객체 생성 (brand_kor, brand_eng, brand_like_count 포함)
-    result: List[BulkProduct] = []
-    for p in products:
-        b = brand_map.get(p["brand_id"], {})
-        combined = {
-            **p,
-            "brand_kor": b.get("brand_kor"),
-            "brand_eng": b.get("brand_eng"),
-        }
-        try:
-            result.append(BulkProduct(**combined))
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"데이터 직렬화 오류: {e}"
-            )
-    return result
+    if stream:
+        async def batches():
+            ids = list(dict.fromkeys(req.product_ids))
+            for i in range(0, len(ids), STREAM_BATCH_SIZE):
+                chunk = ids[i:i + STREAM_BATCH_SIZE]
+                found = await loader.load_many(chunk)
+                products = [found[pid] for pid in chunk if pid in found]
+                brand_map = await brand_cache.get_many(brand_coll, [p.get("brand_id") for p in products])
+                yield [bulk_product(p, brand_map.get(p.get("brand_id"))) for p in products]
+
+        return stream_response(batches(), stream)
+
+    async def load():
+        # 1) 상품 일괄 조회 (동시 요청과 ID 병합, 큰 목록은 청크 병렬 조회) - 요청한 ID 순서
+        found = await loader.load_many(req.product_ids)
+        products = [found[i] for i in dict.fromkeys(req.product_ids) if i in found]
+
+        # 2) 관련 브랜드 일괄 조회 (캐시 미스만 Mongo 조회)
+        brand_map = await brand_cache.get_many(brand_coll, [p.get("brand_id") for p in products])
+
+        # 3) BulkProduct 형태 dict 생성 (brand_kor, brand_eng 포함)
+        return [bulk_product(p, brand_map.get(p.get("brand_id"))) for p in products]
+
+    # 같은 ID 목록으로 동시에 들어온 요청은 한 번만 조회
+    return ORJSONResponse(await get_flight("bulk_products").do(tuple(req.product_ids), load))
 
 
 # brand 좋아요
@@ -393,27 +903,17 @@ async def like_brand(
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
         # redis: Redis = Depends(get_redis),
 ):
-    # 이미 좋아요했는지
-    if await brand_likes_coll.find_one({"id": id, "user_id": body.user_id}):
+    # 1~2) 좋아요 기록 + brands 컬렉션 like_count 증가
+    try:
+        await toggle_like(True, brand_likes_coll, brand_coll, active_like_counter, "brand", id, body.user_id)
+    except AlreadyLiked:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "이미 좋아요한 상태입니다.")
-
-    # 1) 좋아요 기록
-    await brand_likes_coll.insert_one({
-        "id": id,
-        "user_id": body.user_id,
-        "created_at": datetime.utcnow().isoformat() + "Z"
-    })
-
-    # 2) brands 컬렉션 like_count 증가
-    res = await brand_coll.update_one(
-        {"id": id},
-        {"$inc": {"like_count": 1}}
-    )
-    if res.matched_count == 0:
+    except TargetNotFound:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "브랜드를 찾을 수 없습니다.")
+    brand_cache.invalidate(id)
 
-    # 3) Redis에도 추가
-    # await redis.sadd(f"brand:{id}:like_count", body.user_id)
+    # 3) 사용자 좋아요 집합 갱신
+    await like_sets.add("brand", body.user_id, id)
 
     return {"message": "브랜드 좋아요 처리되었습니다."}
 
@@ -432,31 +932,35 @@ async def unlike_brand(
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
         # redis: Redis = Depends(get_redis),
 ):
-    # 1) 좋아요 기록 삭제
-    result = await brand_likes_coll.delete_one({"id": id, "user_id": user_id})
-    if result.deleted_count == 0:
+    # 1~2) 좋아요 기록 삭제 + like_count 감소 (브랜드가 없으면 기록 복구)
+    try:
+        await toggle_like(False, brand_likes_coll, brand_coll, active_like_counter, "brand", id, user_id)
+    except LikeNotFound:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "좋아요 내역이 없습니다.")
-
-    # 2) like_count 감소
-    res = await brand_coll.update_one(
-        {"id": id},
-        {"$inc": {"like_count": -1}}
-    )
-    if res.matched_count == 0:
-        # 삭제는 됐지만 브랜드가 없으면 복구
-        await brand_likes_coll.insert_one({
-            "id": id,
-            "user_id": user_id,
-            "created_at": datetime.utcnow().isoformat() + "Z"
-        })
+    except TargetNotFound:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "브랜드를 찾을 수 없습니다.")
+    brand_cache.invalidate(id)
 
-    # 3) Redis에서도 제거
-    # await redis.srem(f"brand:{id}:like_count", user_id)
+    # 3) 사용자 좋아요 집합 갱신
+    await like_sets.remove("brand", user_id, id)
 
     return {"message": "브랜드 좋아요가 취소되었습니다."}
 
 
+@app.get(
+    "/brand/like/check/{user_id}",
+    response_model=LikeMembershipResponse,
+    summary="사용자가 주어진 브랜드들을 좋아요했는지 일괄 확인"
+)
+async def check_liked_brands(
+        user_id: str,
+        ids: str = Query(..., description="확인할 브랜드 ID (쉼표 구분)"),
+        format: str = Query("bool", pattern=LIKE_CHECK_FORMAT_PATTERN, description="bool | bitmap"),
+        brand_likes_coll: AsyncIOMotorCollection = Depends(get_brand_likes_coll),
+):
+    return await like_membership("brand", brand_likes_coll, user_id, ids, format)
+
+
 # ─── 사용자가 좋아요한 브랜드 리스트 조회 ────────────────────────
 
 @app.get(
@@ -466,11 +970,37 @@ async def unlike_brand(
 )
 async def get_user_liked_brands(
         user_id: str,
-        brand_likes_coll: AsyncIOMotorCollection = Depends(get_brand_likes_coll),
+        stream: Optional[str] = Query(None, pattern=STREAM_FORMAT_PATTERN,
+                                      description="지정 시 like_brands 항목만 스트리밍 (ndjson | json)"),
+        limit: Optional[int] = Query(None, ge=1, le=LIKED_PAGE_MAX,
+                                     description="페이지 크기 (limit 또는 cursor 를 주면 최근 좋아요 순 페이지 조회)"),
+        cursor: Optional[str] = Query(None, description="다음 페이지 토큰 (첫 페이지는 빈 값)"),
+        ids_only: bool = Query(False, description="브랜드 조인 없이 like_brand_ids 만 반환"),
+        brand_likes_coll: AsyncIOMotorCollection = Depends(get_read_brand_likes_coll),
         brand_coll: AsyncIOMotorCollection = Depends(get_brand_db),
 ):
+    if stream:
+        async def batches():
+            cursor = brand_likes_coll.find({"user_id": user_id}, {"_id": 0, "id": 1})
+            async for likes in iter_batches(cursor):
+                ids = [doc["id"] for doc in likes]
+                found = await brand_cache.get_many(brand_coll, ids)
+                yield [found[i] for i in ids if i in found]
+
+        return stream_response(batches(), stream)
+
+    if limit is not None or cursor is not None or ids_only:
+        ids, next_cursor = await liked_ids(brand_likes_coll, user_id, limit, cursor)
+        if ids_only:
+            return ORJSONResponse({"user_id": user_id, "like_brands": [], "like_brand_ids": ids,
+                                   "next_cursor": next_cursor})
+        # 브랜드 조인은 이 페이지 ID 만 (브랜드 캐시 경유)
+        found = await brand_cache.get_many(brand_coll, ids)
+        return ORJSONResponse({"user_id": user_id, "like_brands": [found[i] for i in ids if i in found],
+                               "like_brand_ids": None, "next_cursor": next_cursor})
+
     # 1) 사용자의 좋아요 기록 조회
-    docs = await brand_likes_coll.find({"user_id": user_id}).to_list(length=None)
+    docs = await brand_likes_coll.find({"user_id": user_id}, {"_id": 0, "id": 1}).to_list(length=None)
     if not docs:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "좋아요 내역이 없습니다.")
 
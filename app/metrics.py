@@ -0,0 +1,224 @@
+"""
+Prometheus 텍스트 포맷 지표 (외부 의존성 없이 필요한 만큼만 구현)
+
+- http_request_duration_seconds: 라우트 템플릿(/product/{id}) 단위 지연 히스토그램
+- http_requests_in_flight: 처리 중 요청 수
+- mongodb_command_duration_seconds: 컬렉션/명령 단위 Mongo 지연 (pymongo CommandListener)
+- mongodb_pool_*: 커넥션 풀 체크아웃 대기 시간/사용 중 커넥션 수 (pymongo ConnectionPoolListener)
+- 캐시/배치 등 컴포넌트 stats() 는 register_collector 로 등록하면 gauge 로 노출
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._data: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *labels: str):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(labels)
+            if data is None:
+                data = self._data[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if idx < len(self.buckets):
+                data[0][idx] += 1
+            data[1] += value
+            data[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._data.items()]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, inf)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being processed", ("method",))
+MONGO_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome"))
+
+POOL_WAIT = Histogram(
+    "mongodb_pool_wait_seconds", "Time spent waiting to check out a pooled connection", ("address", "outcome"))
+POOL_CHECKED_OUT = Gauge("mongodb_pool_checked_out", "Connections currently checked out of the pool", ("address",))
+POOL_CONNECTIONS = Gauge("mongodb_pool_connections", "Open connections in the pool", ("address",))
+
+_METRICS = [REQUEST_LATENCY, REQUESTS_IN_FLIGHT, MONGO_LATENCY, POOL_WAIT, POOL_CHECKED_OUT, POOL_CONNECTIONS]
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metric(metric):
+    _METRICS.append(metric)
+    return metric
+
+
+def register_collector(name: str, fn: Callable[[], dict]):
+    """
+    fn() 이 돌려주는 dict 를 gauge 로 노출 (None 등 그 외 값은 생략)
+    - 숫자/bool 값: product_{name}_{key}
+    - 한 단계 중첩 dict {key: {sub: 숫자}}: product_{name}_{sub}{name="{key}"}
+      (예: flight_stats 의 {"get_product": {"calls": 3}} -> product_singleflight_calls{name="get_product"})
+    - 문자열 값(모드/백엔드 이름 등): product_{name}_{key}{value="{값}"} 1
+    """
+    _collectors[name] = fn
+
+
+def _render_collectors() -> List[str]:
+    # 같은 metric 의 series 는 TYPE 줄 아래에 연속으로 있어야 하므로 이름별로 모아서 출력
+    series: Dict[str, List[str]] = {}
+    for name, fn in _collectors.items():
+        for key, value in fn().items():
+            if isinstance(value, dict):
+                for sub, sub_value in value.items():
+                    if isinstance(sub_value, (int, float)):
+                        metric = f"product_{name}_{sub}"
+                        series.setdefault(metric, []).append(f'{metric}{{name="{key}"}} {float(sub_value)}')
+            elif isinstance(value, (int, float)):
+                metric = f"product_{name}_{key}"
+                series.setdefault(metric, []).append(f"{metric} {float(value)}")
+            elif isinstance(value, str):
+                metric = f"product_{name}_{key}"
+                series.setdefault(metric, []).append(f'{metric}{{value="{value}"}} 1.0')
+    lines = []
+    for metric, samples in series.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(samples)
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.extend(_render_collectors())
+    return "\n".join(lines) + "\n"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """명령 시작 이벤트에서 컬렉션 이름을 기억했다가 성공/실패 시 duration 을 기록"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, int], str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple[int, int]:
+        return event.request_id, event.operation_id
+
+    def started(self, event):
+        # getMore 는 커서 id 가 첫 값이고 컬렉션은 별도 필드
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        coll = event.command.get(key)
+        self._collections[self._key(event)] = coll if isinstance(coll, str) else ""
+
+    def _finish(self, event, outcome: str):
+        coll = self._collections.pop(self._key(event), "")
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, coll, event.command_name, outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "failure")
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    체크아웃 대기 시간(성공/timeout/기타 실패)과 사용 중 커넥션 수를 기록
+    - 대기 시간이 늘거나 checked_out 이 maxPoolSize 에 붙어 있으면 풀 포화
+    """
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        POOL_WAIT.observe(event.duration or 0.0, address, "success")
+        POOL_CHECKED_OUT.inc(address)
+
+    def connection_check_out_failed(self, event):
+        outcome = "timeout" if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT else "failure"
+        POOL_WAIT.observe(event.duration or 0.0, self._address(event), outcome)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.dec(self._address(event))
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc(self._address(event))
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.dec(self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
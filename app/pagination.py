@@ -0,0 +1,105 @@
+import base64
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+COUNT_CACHE_MAXSIZE = int(os.getenv("COUNT_CACHE_MAXSIZE", "1024"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: int, sort: Optional[str] = None, value: Any = None) -> str:
+    """
+    마지막 상품 id 를 불투명 토큰으로 인코딩 (base64url, 패딩 제거)
+    - 정렬 모드가 있으면 모드 이름과 마지막 정렬 값도 함께 담는다
+    """
+    payload = {"id": last_id}
+    if sort is not None:
+        payload.update({"s": sort, "v": value})
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+    # bool 은 int 의 하위 타입이라 따로 거른다
+    if not isinstance(payload, dict) or not isinstance(payload.get("id"), int) or isinstance(payload["id"], bool):
+        raise InvalidCursor("cursor id must be int")
+    return payload
+
+
+def decode_cursor(token: str, sort: Optional[str] = None) -> Optional[Tuple[Any, int]]:
+    """
+    빈 토큰은 첫 페이지(None), 아니면 (마지막 정렬 값, 마지막 id). 형식이 잘못되면 InvalidCursor
+    - 정렬 없는 커서의 정렬 값은 None. 다른 정렬 모드에서 발급한 커서는 거부
+    """
+    if not token:
+        return None
+    payload = _decode(token)
+    if payload.get("s") != sort:
+        raise InvalidCursor("cursor was issued for a different sort")
+    value = payload.get("v")
+    if sort is not None and (not isinstance(value, (int, float, str)) or isinstance(value, bool)):
+        raise InvalidCursor("cursor sort value must be a number or string")
+    return value, payload["id"]
+
+
+class CountCache:
+    """필터별 count_documents 결과를 짧게 캐시 (TTL + 크기 제한)"""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _key(query: dict) -> str:
+        return json.dumps(query, sort_keys=True, default=str, ensure_ascii=False)
+
+    async def count(self, coll: AsyncIOMotorCollection, query: dict) -> int:
+        key = self._key(query)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        total = await coll.count_documents(query)
+        self._entries[key] = (now + self.ttl, total)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return total
+
+    def clear(self):
+        self._entries.clear()
+
+
+count_cache = CountCache(COUNT_CACHE_TTL, COUNT_CACHE_MAXSIZE)
+
+
+async def count_total(coll: AsyncIOMotorCollection, query: dict, mode: str) -> Optional[int]:
+    """
+    total 계산 방식
+    - exact: 매번 count_documents
+    - estimated: 필터가 없으면 컬렉션 메타데이터(estimated_document_count), 있으면 필터별 캐시 카운트
+    - none: 계산하지 않음
+    """
+    if mode == "none":
+        return None
+    if mode == "estimated":
+        if not query:
+            return await coll.estimated_document_count()
+        return await count_cache.count(coll, query)
+    return await coll.count_documents(query)
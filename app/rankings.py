@@ -0,0 +1,389 @@
+"""
+정렬 모드별 상위 N 상품 랭킹 (인-프로세스 materialized view)
+
+- 범위(scope): 전체 / major_category / gender / brand_id / major_category+gender
+- 범위 x 정렬 모드마다 (정렬키, id) 오름차순 리스트를 상위 RANKING_SIZE 개만 유지
+- 첫 구성은 워커마다 상품 컬렉션을 한 번 스캔. 이후 주기 재계산(드리프트 보정)은 run_once 잠금으로
+  클러스터 전체에서 RANKING_REBUILD_STAGGER 초에 한 워커만 시작한다 (스캔 부하가 워커 x 파드 수에 비례하지 않게)
+  워커마다 실제 재계산 주기는 max(RANKING_REBUILD_INTERVAL, 워커 수 x 간격) 이므로, 간격은
+  RANKING_REBUILD_INTERVAL x RANKING_REBUILD_STAGGER_MAX_FRACTION 으로 제한한다 (그 역수만큼의 워커까지 주기 유지)
+- 메모리: 리스트 항목 수 합계를 RANKING_MAX_ENTRIES(기본은 CACHE_MEMORY_BUDGET_MB 에서 계산)로 제한,
+  범위 필드 값(_attrs)은 리스트에 들어 있는 상품만 보관
+- 카운터 flush / 상품 수정으로 바뀐 상품은 mark_dirty 로 모았다가 $in 한 번으로 다시 읽어 증분 반영
+- 목록 요청은 리스트 slice 후 해당 페이지 ID 만 조회 (O(page))
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import PyMongoError
+
+from .workers import cache_maxsize, run_once
+
+logger = logging.getLogger("product")
+
+RANKING_SIZE = int(os.getenv("RANKING_SIZE", "500"))
+RANKING_REBUILD_INTERVAL = float(os.getenv("RANKING_REBUILD_INTERVAL", "600"))
+RANKING_UPDATE_INTERVAL = float(os.getenv("RANKING_UPDATE_INTERVAL", "2.0"))
+# 주기 재계산을 시작하는 최소 간격 (클러스터 전체, 초)
+RANKING_REBUILD_STAGGER = float(os.getenv("RANKING_REBUILD_STAGGER", "30"))
+# 위 간격의 상한 (RANKING_REBUILD_INTERVAL 대비 비율)
+RANKING_REBUILD_STAGGER_MAX_FRACTION = float(os.getenv("RANKING_REBUILD_STAGGER_MAX_FRACTION", "0.05"))
+# 모든 리스트 항목 수 합계 상한. 0 이면 제한 없음 (리스트마다 RANKING_SIZE)
+RANKING_MAX_ENTRIES = cache_maxsize("rankings", "RANKING_MAX_ENTRIES", 0)
+
+
+class SortMode(NamedTuple):
+    field: str
+    direction: int
+
+
+SORT_MODES: Dict[str, SortMode] = {
+    "popular": SortMode("like_count", -1),
+    "most_viewed": SortMode("view_count", -1),
+    "best_selling": SortMode("purchase_count", -1),
+    "discount": SortMode("discount", -1),
+    "price_asc": SortMode("discounted_price", 1),
+    "price_desc": SortMode("discounted_price", -1),
+}
+SORT_PATTERN = "^(" + "|".join(SORT_MODES) + ")$"
+
+# 랭킹을 유지하는 필터 조합 (이외의 조합은 쿼리 시점 정렬)
+SCOPE_FIELDS: List[Tuple[str, ...]] = [
+    (), ("major_category",), ("gender",), ("brand_id",), ("major_category", "gender"),
+]
+_SCOPE_FIELD_SETS = {frozenset(f): f for f in SCOPE_FIELDS}
+
+# 정렬 필드는 없으면 0 으로 저장한다. DB 정렬에서 null/누락은 0 과 다른 자리에 오고 커서의 범위 조건에도
+# 걸리지 않으므로, 랭킹(누락 = 0)과 DB 폴백의 순서가 같으려면 값이 항상 있어야 한다
+SORT_FIELDS = tuple(dict.fromkeys(mode.field for mode in SORT_MODES.values()))
+
+RANKING_PROJECTION = {
+    "_id": 0, "id": 1, "major_category": 1, "gender": 1, "brand_id": 1,
+    **{mode.field: 1 for mode in SORT_MODES.values()},
+}
+
+ScopeKey = Tuple[Tuple[str, object], ...]
+RankKey = Tuple[float, int]
+
+
+def sort_value(doc: dict, sort: str):
+    value = doc.get(SORT_MODES[sort].field)
+    return value if value is not None else 0
+
+
+def missing_sort_fields(doc: dict) -> Dict[str, int]:
+    """doc 에 없거나 None 인 정렬 필드 -> 0"""
+    return {f: 0 for f in SORT_FIELDS if doc.get(f) is None}
+
+
+async def backfill_sort_fields(coll: AsyncIOMotorCollection) -> int:
+    """정렬 필드가 없거나 null 인 기존 상품(외부 동기화 포함)에 0 을 채운다"""
+    updated = 0
+    for field in SORT_FIELDS:
+        result = await coll.update_many({field: None}, {"$set": {field: 0}})
+        updated += result.modified_count
+    if updated:
+        logger.info(f"sort_field_backfill\tupdated={updated}")
+    return updated
+
+
+def rank_key(sort: str, value, product_id: int) -> RankKey:
+    """오름차순 비교용 키. 내림차순 모드는 값을 뒤집고, 동점은 id 오름차순"""
+    return (-value if SORT_MODES[sort].direction < 0 else value, product_id)
+
+
+def rank_value(sort: str, key: RankKey):
+    """rank_key 의 역변환 (커서에 담을 정렬 값)"""
+    return -key[0] if SORT_MODES[sort].direction < 0 else key[0]
+
+
+def scope_key(filters: Dict[str, object]) -> Optional[ScopeKey]:
+    """필터 dict -> 랭킹 범위 키. 유지하지 않는 조합이면 None"""
+    fields = _SCOPE_FIELD_SETS.get(frozenset(k for k, v in filters.items() if v is not None))
+    if fields is None:
+        return None
+    return tuple((f, filters[f]) for f in fields)
+
+
+_ATTR_FIELDS = ("major_category", "gender", "brand_id")
+
+
+def _doc_attrs(doc: dict) -> tuple:
+    return tuple(doc.get(f) for f in _ATTR_FIELDS)
+
+
+def _scopes(attrs: tuple) -> List[ScopeKey]:
+    values = dict(zip(_ATTR_FIELDS, attrs))
+    return [tuple((f, values[f]) for f in fields) for fields in SCOPE_FIELDS]
+
+
+class Ranking:
+    """
+    한 범위/정렬 모드의 상위 리스트
+    - truncated=True 면 리스트 밖에 상품이 더 있고, 그 상품들의 키는 모두 마지막 키보다 크다
+      (그래서 리스트 길이를 넘는 구간은 DB 에서 읽어야 한다)
+    """
+
+    __slots__ = ("limit", "keys", "by_id", "truncated")
+
+    def __init__(self, limit: int, keys: List[RankKey], truncated: bool):
+        self.limit = limit
+        self.keys = keys
+        self.by_id = {k[1]: k for k in keys}
+        self.truncated = truncated
+
+    def remove(self, product_id: int):
+        key = self.by_id.pop(product_id, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def offer(self, key: RankKey) -> Optional[int]:
+        """리스트 끝에서 밀려난 상품 id (없으면 None)"""
+        if self.truncated and (not self.keys or key > self.keys[-1]):
+            return None
+        insort(self.keys, key)
+        self.by_id[key[1]] = key
+        if len(self.keys) > self.limit:
+            dropped = self.keys.pop()
+            del self.by_id[dropped[1]]
+            self.truncated = True
+            return dropped[1]
+        return None
+
+    def page(self, start: int, size: int) -> Optional[List[RankKey]]:
+        """[start, start+size) 구간. 리스트만으로 답할 수 없으면 None"""
+        if self.truncated and start + size > len(self.keys):
+            return None
+        return self.keys[start:start + size]
+
+    def page_after(self, key: RankKey, size: int) -> Optional[List[RankKey]]:
+        return self.page(bisect_right(self.keys, key), size)
+
+
+class _TopN:
+    """재계산용 크기 제한 힙 (가장 나쁜 키가 루트)"""
+
+    __slots__ = ("limit", "heap", "seen")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.heap: List[Tuple[float, int]] = []
+        self.seen = 0
+
+    def push(self, key: RankKey) -> bool:
+        """힙에 들어갔으면 True"""
+        self.seen += 1
+        item = (-key[0], -key[1])
+        if len(self.heap) < self.limit:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+        else:
+            return False
+        return True
+
+    def ranking(self, limit: Optional[int] = None) -> Ranking:
+        """limit 을 주면 상위 limit 개로 더 줄인다 (메모리 예산)"""
+        limit = self.limit if limit is None else min(limit, self.limit)
+        keys = sorted((-a, -b) for a, b in self.heap)[:limit]
+        return Ranking(limit, keys, truncated=self.seen > len(keys))
+
+
+class RankingStore:
+    def __init__(self, coll: AsyncIOMotorCollection, scan_coll: Optional[AsyncIOMotorCollection] = None,
+                 size: int = RANKING_SIZE, rebuild_interval: float = RANKING_REBUILD_INTERVAL,
+                 update_interval: float = RANKING_UPDATE_INTERVAL, max_entries: int = RANKING_MAX_ENTRIES,
+                 rebuild_stagger: float = RANKING_REBUILD_STAGGER):
+        # 증분 반영은 방금 쓴 값을 읽어야 하므로 primary, 전체 스캔은 scan_coll(읽기 핸들)
+        self.coll = coll
+        self.scan_coll = scan_coll if scan_coll is not None else coll
+        self.size = size
+        self.rebuild_interval = rebuild_interval
+        self.update_interval = update_interval
+        self.max_entries = max_entries
+        self.rebuild_stagger = min(rebuild_stagger, rebuild_interval * RANKING_REBUILD_STAGGER_MAX_FRACTION)
+        self._rankings: Dict[Tuple[ScopeKey, str], Ranking] = {}
+        # 리스트에 들어 있는 상품의 범위 필드 값 (카테고리/브랜드가 바뀌면 이전 범위에서 빼기 위해)
+        # 어느 리스트에도 없는 상품은 뺄 곳이 없으므로 보관하지 않는다
+        self._attrs: Dict[int, tuple] = {}
+        self._dirty: Set[int] = set()
+        self._task = None
+        self.ready = False
+
+        self.rebuilds = 0
+        self.last_rebuild_ms = 0.0
+        self.updates = 0
+        self.updated_products = 0
+        self.served = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    # ───── 조회 ─────
+    def get(self, filters: Dict[str, object], sort: str) -> Optional[Ranking]:
+        if not self.ready:
+            return None
+        scope = scope_key(filters)
+        if scope is None:
+            return None
+        ranking = self._rankings.get((scope, sort))
+        if ranking is None:
+            # 재계산 이후로도 상품이 한 번도 없던 범위는 빈 결과 (요청 값으로 항목을 만들지 않는다)
+            return Ranking(self.size, [], truncated=False)
+        return ranking
+
+    def page_keys(self, filters: Dict[str, object], sort: str, start: int = 0, size: int = 10,
+                  after: Optional[RankKey] = None) -> Optional[List[RankKey]]:
+        """랭킹만으로 페이지를 만들 수 있으면 (정렬키, id) 목록, 아니면 None (호출 측이 쿼리로 정렬)"""
+        ranking = self.get(filters, sort)
+        keys = None
+        if ranking is not None:
+            keys = ranking.page(start, size) if after is None else ranking.page_after(after, size)
+        if keys is None:
+            self.fallbacks += 1
+            return None
+        self.served += 1
+        return keys
+
+    # ───── 갱신 ─────
+    def mark_dirty(self, ids: Iterable[int]):
+        self._dirty.update(ids)
+
+    def _apply(self, product_id: int, doc: Optional[dict]):
+        old = self._attrs.pop(product_id, None)
+        old_scopes = _scopes(old) if old is not None else []
+        new_attrs = _doc_attrs(doc) if doc is not None else None
+        new_scopes = _scopes(new_attrs) if new_attrs is not None else []
+        dropped: Set[int] = set()
+        for scope in old_scopes:
+            for sort in SORT_MODES:
+                ranking = self._rankings.get((scope, sort))
+                if ranking is not None:
+                    ranking.remove(product_id)
+        for scope in new_scopes:
+            for sort in SORT_MODES:
+                ranking = self._rankings.get((scope, sort))
+                if ranking is None:
+                    # 처음 보는 범위(새 카테고리/브랜드 등)
+                    ranking = self._rankings[(scope, sort)] = Ranking(self.size, [], truncated=False)
+                ranking.remove(product_id)
+                dropped_id = ranking.offer(rank_key(sort, sort_value(doc, sort), product_id))
+                if dropped_id is not None:
+                    dropped.add(dropped_id)
+                if product_id in ranking.by_id:
+                    self._attrs[product_id] = new_attrs
+        # 밀려나서 어느 리스트에도 남지 않은 상품은 범위 필드 값도 버린다
+        for dropped_id in dropped - {product_id}:
+            attrs = self._attrs.get(dropped_id)
+            if attrs is not None and not self._listed(dropped_id, attrs):
+                del self._attrs[dropped_id]
+
+    def _listed(self, product_id: int, attrs: tuple) -> bool:
+        for scope in _scopes(attrs):
+            for sort in SORT_MODES:
+                ranking = self._rankings.get((scope, sort))
+                if ranking is not None and product_id in ranking.by_id:
+                    return True
+        return False
+
+    async def apply_dirty(self):
+        if not self._dirty or not self.ready:
+            return
+        ids, self._dirty = list(self._dirty), set()
+        try:
+            docs = await self.coll.find({"id": {"$in": ids}}, RANKING_PROJECTION).to_list(length=None)
+        except PyMongoError as e:
+            self.errors += 1
+            self._dirty.update(ids)
+            logger.error(f"ranking_update_failed\tproducts={len(ids)}\terror={e}")
+            return
+        found = {d["id"]: d for d in docs}
+        for product_id in ids:
+            self._apply(product_id, found.get(product_id))
+        self.updates += 1
+        self.updated_products += len(ids)
+
+    async def rebuild(self):
+        start = time.perf_counter()
+        heaps: Dict[Tuple[ScopeKey, str], _TopN] = {}
+        attrs: Dict[int, tuple] = {}
+        async for doc in self.scan_coll.find({}, RANKING_PROJECTION).batch_size(1000):
+            doc_attrs = _doc_attrs(doc)
+            kept = False
+            for scope in _scopes(doc_attrs):
+                for sort in SORT_MODES:
+                    top = heaps.get((scope, sort))
+                    if top is None:
+                        top = heaps[(scope, sort)] = _TopN(self.size)
+                    kept = top.push(rank_key(sort, sort_value(doc, sort), doc["id"])) or kept
+            if kept:
+                attrs[doc["id"]] = doc_attrs
+        # 리스트 수를 스캔 후에야 알므로 예산은 여기서 리스트당 크기로 나눈다
+        limit = max(1, self.max_entries // len(heaps)) if self.max_entries and heaps else None
+        rankings = {k: top.ranking(limit) for k, top in heaps.items()}
+        listed = {key[1] for ranking in rankings.values() for key in ranking.keys}
+        # 스캔 중 들어온 변경은 _dirty 에 남아 있다가 교체 후 다시 반영된다
+        self._rankings = rankings
+        self._attrs = {id: a for id, a in attrs.items() if id in listed}
+        self.ready = True
+        self.rebuilds += 1
+        self.last_rebuild_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"ranking_rebuilt\tlists={len(self._rankings)}\telapsed_ms={self.last_rebuild_ms:.0f}")
+
+    # ───── 백그라운드 태스크 ─────
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _rebuild_staggered(self) -> bool:
+        """첫 구성은 바로, 이후는 클러스터 전체에서 rebuild_stagger 초에 한 워커만. 재계산했으면 True"""
+        if not self.ready:
+            await self.rebuild()
+            return True
+        return await run_once(self.coll.database, "ranking_rebuild", self.rebuild_stagger, self.rebuild)
+
+    async def _run(self):
+        next_rebuild = 0.0
+        while True:
+            if time.monotonic() >= next_rebuild:
+                try:
+                    rebuilt = await self._rebuild_staggered()
+                except PyMongoError as e:
+                    self.errors += 1
+                    logger.error(f"ranking_rebuild_failed\terror={e}")
+                    rebuilt = self.ready
+                # 잠금을 못 잡았으면 다음 갱신 주기에 다시 시도
+                if rebuilt:
+                    next_rebuild = time.monotonic() + self.rebuild_interval
+            await self.apply_dirty()
+            await asyncio.sleep(self.update_interval)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "lists": len(self._rankings),
+            "entries": sum(len(r.keys) for r in self._rankings.values()),
+            "tracked_products": len(self._attrs),
+            "dirty": len(self._dirty),
+            "rebuilds": self.rebuilds,
+            "last_rebuild_ms": round(self.last_rebuild_ms, 2),
+            "updates": self.updates,
+            "updated_products": self.updated_products,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "errors": self.errors,
+        }
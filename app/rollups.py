@@ -0,0 +1,197 @@
+"""
+조회/구매 이벤트 시간 버킷 집계 (트렌딩/기간별 통계용)
+
+- 이벤트 버퍼 flush 가 성공하면 배치를 (상품, 시간 버킷) 별로 합쳐 $inc upsert 한다
+  (시간/일 단위 컬렉션마다 bulk_write 한 번)
+- 버킷 문서: {product_id, bucket(구간 시작 시각, UTC), views, purchases}
+- 원본 이벤트는 event_at(Date) TTL 인덱스로 EVENT_RETENTION_DAYS 뒤 삭제, 버킷도 단위별 보관 기간 TTL
+- 트렌딩은 기간 안의 버킷만 $group 하므로 비용이 이벤트 수가 아니라 (상품 x 버킷) 수에 비례
+- 기존(event_at 없는) 원본 이벤트: python -m app.rollups backfill
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from .events import EVENT_TIME_FIELD
+
+logger = logging.getLogger("product")
+
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "30"))
+ROLLUP_HOURLY_RETENTION_DAYS = int(os.getenv("ROLLUP_HOURLY_RETENTION_DAYS", "14"))
+ROLLUP_DAILY_RETENTION_DAYS = int(os.getenv("ROLLUP_DAILY_RETENTION_DAYS", "400"))
+TRENDING_CACHE_TTL = int(os.getenv("TRENDING_CACHE_TTL", "60"))
+TRENDING_LIMIT_MAX = int(os.getenv("TRENDING_LIMIT_MAX", "100"))
+
+HOURLY_COLLECTION = "product_stats_hourly"
+DAILY_COLLECTION = "product_stats_daily"
+
+# 이벤트 종류 -> 버킷 카운터 필드
+ROLLUP_FIELDS = {"view": "views", "purchase": "purchases"}
+TRENDING_METRIC_PATTERN = "^(" + "|".join(ROLLUP_FIELDS.values()) + ")$"
+
+
+class Granularity(NamedTuple):
+    collection: str
+    step: timedelta
+
+
+HOURLY = Granularity(HOURLY_COLLECTION, timedelta(hours=1))
+DAILY = Granularity(DAILY_COLLECTION, timedelta(days=1))
+
+# 트렌딩 기간 -> (버킷 단위, 완료된 버킷 수). 직전 N 개 버킷 + 현재 진행 중인 버킷을 합친다
+# (경계 직후에도 최소 N 단위 분량이 되도록. 실제 구간 길이는 N ~ N+1 단위)
+TRENDING_PERIODS: Dict[str, Tuple[Granularity, int]] = {
+    "1h": (HOURLY, 1),
+    "6h": (HOURLY, 6),
+    "24h": (HOURLY, 24),
+    "7d": (DAILY, 7),
+    "30d": (DAILY, 30),
+}
+TRENDING_PERIOD_PATTERN = "^(" + "|".join(TRENDING_PERIODS) + ")$"
+
+
+def bucket_start(ts: datetime, granularity: Granularity) -> datetime:
+    if granularity.step >= timedelta(days=1):
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class RollupWriter:
+    """EventBuffer listener. 실패해도 이벤트 flush 루프는 멈추지 않는다 (카운트만)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, granularities=(HOURLY, DAILY)):
+        self.db = db
+        self.granularities = list(granularities)
+        self.batches = 0
+        self.upserts = 0
+        self.errors = 0
+        self.last_write_ms = 0.0
+
+    def operations(self, batch: List[Tuple[str, dict]], granularity: Granularity) -> List[UpdateOne]:
+        incs: Dict[Tuple[int, datetime], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for kind, doc in batch:
+            field = ROLLUP_FIELDS.get(kind)
+            if field is None or doc.get(EVENT_TIME_FIELD) is None:
+                continue
+            incs[(doc["product_id"], bucket_start(doc[EVENT_TIME_FIELD], granularity))][field] += 1
+        return [
+            UpdateOne({"bucket": bucket, "product_id": pid}, {"$inc": dict(fields)}, upsert=True)
+            for (pid, bucket), fields in incs.items()
+        ]
+
+    async def apply(self, batch: List[Tuple[str, dict]]):
+        """버킷 $inc. 실패는 그대로 올린다 (백필은 여기서 멈춰야 이벤트를 처리됨으로 표시하지 않는다)"""
+        for granularity in self.granularities:
+            ops = self.operations(batch, granularity)
+            if ops:
+                await self.db[granularity.collection].bulk_write(ops, ordered=False)
+                self.upserts += len(ops)
+
+    async def write(self, batch: List[Tuple[str, dict]]):
+        start = time.perf_counter()
+        try:
+            await self.apply(batch)
+        except PyMongoError as e:
+            # 원본 이벤트는 이미 기록됨. 버킷만 덜 세어진다
+            self.errors += 1
+            logger.error(f"rollup_write_failed\tevents={len(batch)}\terror={e}")
+            return
+        finally:
+            self.last_write_ms = (time.perf_counter() - start) * 1000
+        self.batches += 1
+
+    __call__ = write
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "upserts": self.upserts,
+            "errors": self.errors,
+            "last_write_ms": round(self.last_write_ms, 2),
+        }
+
+
+def trending_pipeline(since: datetime, metric: str, limit: int) -> List[dict]:
+    return [
+        {"$match": {"bucket": {"$gte": since}}},
+        {"$group": {"_id": "$product_id", "count": {"$sum": f"${metric}"}}},
+        {"$match": {"count": {"$gt": 0}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+    ]
+
+
+async def trending(db: AsyncIOMotorDatabase, period: str, metric: str, limit: int,
+                   now: Optional[datetime] = None) -> List[dict]:
+    granularity, buckets = TRENDING_PERIODS[period]
+    since = bucket_start(now or datetime.utcnow(), granularity) - granularity.step * buckets
+    docs = await db[granularity.collection].aggregate(trending_pipeline(since, metric, limit)) \
+        .to_list(length=limit)
+    return [{"product_id": d["_id"], "count": d["count"]} for d in docs]
+
+
+# ───── 기존 원본 이벤트 백필 ─────
+async def backfill(db: AsyncIOMotorDatabase, sinks: Dict[str, Tuple[str, str]], batch_size: int = 1000) -> int:
+    """
+    event_at 이 없는 원본 이벤트를 버킷에 더한 뒤 event_at 을 채운다 (TTL 적용 + 과거 트렌딩 복원)
+    - event_at 은 배치의 버킷 쓰기가 성공한 뒤에만 채운다. 버킷 쓰기가 실패하면 예외로 멈추고,
+      그 배치는 event_at 이 없으므로 다시 실행하면 다시 집계한다
+    - 이미 event_at 이 있는 문서는 건너뛰므로 완료된 배치는 다시 실행해도 중복 집계하지 않는다
+      (단위별 bulk_write 도중 실패한 배치는 먼저 성공한 단위에 한 번 더 더해질 수 있다)
+    - sinks: 이벤트 종류 -> (컬렉션 이름, ISO 시각 필드)
+    """
+    writer = RollupWriter(db)
+    total = 0
+    for kind, (coll_name, time_field) in sinks.items():
+        coll: AsyncIOMotorCollection = db[coll_name]
+        last_id = None
+        while True:
+            # _id 범위로 이어 읽어 이미 처리한 구간을 다시 스캔하지 않는다
+            query = {EVENT_TIME_FIELD: {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            docs = await coll.find(query, {"_id": 1, "product_id": 1, time_field: 1}).sort("_id", 1) \
+                .limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            last_id = docs[-1]["_id"]
+            sets, batch = [], []
+            for doc in docs:
+                try:
+                    ts = datetime.fromisoformat(doc[time_field].rstrip("Z"))
+                except (KeyError, TypeError, ValueError):
+                    # 시각을 알 수 없으면 지금으로 (보관 기간 뒤 삭제만 되도록)
+                    ts = datetime.utcnow()
+                else:
+                    batch.append((kind, {"product_id": doc["product_id"], EVENT_TIME_FIELD: ts}))
+                sets.append(UpdateOne({"_id": doc["_id"]}, {"$set": {EVENT_TIME_FIELD: ts}}))
+            await writer.apply(batch)
+            await coll.bulk_write(sets, ordered=False)
+            total += len(docs)
+            logger.info(f"rollup_backfill\tkind={kind}\tdocs={total}")
+    return total
+
+
+async def _main(argv: List[str]) -> int:
+    if argv[:1] != ["backfill"]:
+        print("usage: python -m app.rollups backfill")
+        return 2
+    from .database import db
+
+    total = await backfill(db, {"view": ("product_views", "viewed_at"),
+                                "purchase": ("product_purchases", "purchased_at")})
+    print(f"backfilled={total}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
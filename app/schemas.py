@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
 from pydantic import BaseModel
 
 
@@ -12,7 +12,10 @@ class Brand(BaseModel):
 
 class UserLikedBrandsResponse(BaseModel):
     user_id: str
-    like_brands: List[Brand]
+    like_brands: List[Brand] = []
+    # ids_only=true 일 때만 채움 (like_brands 는 비움)
+    like_brand_ids: Optional[List[int]] = None
+    next_cursor: Optional[str] = None
 
     
 class ProductBase(BaseModel):
@@ -42,8 +45,9 @@ class CombinedProduct(ProductBase, Brand):
 
 
 class PaginatedProducts(BaseModel):
-    total: int
+    total: Optional[int] = None
     items: List[CombinedProduct]
+    next_cursor: Optional[str] = None
 
 
 class BulkProduct(BaseModel):
@@ -66,10 +70,43 @@ class LikeProduct(BaseModel):
 
 class UserLikedProductsResponse(BaseModel):
     user_id: str
-    like_products: List[LikeProduct]
+    like_products: List[LikeProduct] = []
+    # ids_only=true 일 때만 채움 (like_products 는 비움)
+    like_product_ids: Optional[List[int]] = None
+    next_cursor: Optional[str] = None
+
 class BulkRequest(BaseModel):
     product_ids: List[int]
 
 
 class LikeRequest(BaseModel):
     user_id: str
+
+
+class LikeMembershipResponse(BaseModel):
+    user_id: str
+    ids: List[int]
+    # format=bool: ids 와 같은 순서의 좋아요 여부
+    liked: Optional[List[bool]] = None
+    # format=bitmap: i 번째 id 가 (i // 8) 번째 바이트의 (i % 8) 번째 비트 (LSB 부터), base64
+    bitmap: Optional[str] = None
+
+
+class FacetValue(BaseModel):
+    value: Union[str, int]
+    count: int
+
+
+class ProductFacets(BaseModel):
+    total: int
+    facets: Dict[str, List[FacetValue]]
+
+
+class TrendingProduct(LikeProduct):
+    count: int
+
+
+class TrendingProducts(BaseModel):
+    period: str
+    metric: str
+    items: List[TrendingProduct]
@@ -0,0 +1,80 @@
+import logging
+import unicodedata
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+logger = logging.getLogger("product")
+
+# 상품명 n-gram 필드 (text 인덱스 대상)
+NGRAM_FIELD = "name_ngrams"
+SEARCH_INDEX_NAME = "idx_name_ngrams_text"
+
+# 텍스트 점수 내림차순, 동점이면 id 순
+SEARCH_SORT = [("score", {"$meta": "textScore"}), ("id", 1)]
+SEARCH_PROJECTION = {"score": {"$meta": "textScore"}}
+
+
+def normalize(text: str) -> str:
+    """NFKC 정규화 + 소문자 + 공백/기호 제거 ("반팔 티셔츠" == "반팔티셔츠")"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def _bigrams(text: str) -> List[str]:
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def name_ngrams(name: Optional[str]) -> List[str]:
+    """
+    저장용 토큰: 글자 단위 unigram + bigram
+    - 한국어는 형태소 분석 없이도 부분 일치 검색이 되도록 음절 n-gram 사용
+    """
+    if not name:
+        return []
+    text = normalize(name)
+    return sorted(set(text) | set(_bigrams(text)))
+
+
+def search_terms(keyword: str) -> List[str]:
+    text = normalize(keyword)
+    if len(text) < 2:
+        return [text] if text else []
+    return sorted(set(_bigrams(text)))
+
+
+def build_search_filter(keyword: str) -> Optional[dict]:
+    """
+    $text 로 후보를 인덱스에서 찾고(점수 랭킹), $all 로 모든 n-gram 포함 문서만 남긴다
+    """
+    terms = search_terms(keyword)
+    if not terms:
+        return None
+    return {
+        "$text": {"$search": " ".join(terms)},
+        NGRAM_FIELD: {"$all": terms},
+    }
+
+
+async def backfill_ngrams(coll: AsyncIOMotorCollection, batch_size: int = 500) -> int:
+    """name_ngrams 가 없는 기존 상품(외부 동기화 포함)에 토큰을 채운다"""
+    cursor = coll.find(
+        {"name": {"$type": "string"}, NGRAM_FIELD: {"$exists": False}},
+        {"id": 1, "name": 1},
+    ).batch_size(batch_size)
+
+    updated = 0
+    ops = []
+    async for doc in cursor:
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {NGRAM_FIELD: name_ngrams(doc["name"])}}))
+        if len(ops) >= batch_size:
+            await coll.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await coll.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    if updated:
+        logger.info(f"search_backfill\tupdated={updated}")
+    return updated
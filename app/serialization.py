@@ -0,0 +1,59 @@
+"""
+상품 응답 빠른 직렬화 경로
+
+Mongo 문서는 스키마 필드만 projection 해서 가져오고, Pydantic 검증 없이
+모델 기본값 dict 위에 덮어써서 응답 dict 를 만든다. 핸들러는 이 dict 를
+ORJSONResponse 로 바로 돌려주므로 response_model 재검증도 일어나지 않는다.
+(response_model 은 OpenAPI 문서용으로만 남는다)
+"""
+from typing import Any, Dict, Iterable, Optional, Type
+
+from pydantic import BaseModel
+
+from .schemas import BulkProduct, CombinedProduct
+
+BRAND_FIELDS = ("brand_kor", "brand_eng", "brand_like_count")
+
+
+def model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    return {name: field.default for name, field in model.model_fields.items()}
+
+
+def projection_for(model: Type[BaseModel], extra: Iterable[str] = ()) -> Dict[str, int]:
+    fields = [f for f in model.model_fields if f not in BRAND_FIELDS]
+    return {"_id": 0, **{f: 1 for f in fields}, **{f: 1 for f in extra}}
+
+
+COMBINED_DEFAULTS = model_defaults(CombinedProduct)
+BULK_DEFAULTS = model_defaults(BulkProduct)
+
+# 상품 컬렉션에서 가져올 필드 (브랜드 필드는 조인으로 채움)
+PRODUCT_PROJECTION = projection_for(CombinedProduct)
+BULK_PROJECTION = projection_for(BulkProduct)
+
+
+def _build(defaults: Dict[str, Any], doc: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(defaults)
+    for key in defaults:
+        if key in doc:
+            out[key] = doc[key]
+    return out
+
+
+def combined_product(prod: Dict[str, Any], brand: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """CombinedProduct 형태 dict (브랜드 정보 병합)"""
+    out = _build(COMBINED_DEFAULTS, prod)
+    if brand:
+        out["brand_kor"] = brand.get("brand_kor")
+        out["brand_eng"] = brand.get("brand_eng")
+        out["brand_like_count"] = brand.get("like_count")
+    return out
+
+
+def bulk_product(prod: Dict[str, Any], brand: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """BulkProduct 형태 dict"""
+    out = _build(BULK_DEFAULTS, prod)
+    brand = brand or {}
+    out["brand_kor"] = brand.get("brand_kor")
+    out["brand_eng"] = brand.get("brand_eng")
+    return out
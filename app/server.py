@@ -0,0 +1,33 @@
+"""
+서비스 기동: python -m app.server
+
+- WEB_CONCURRENCY 개 uvicorn 워커 프로세스 (기본 1). 죽은 워커는 uvicorn 이 다시 띄운다
+- 워커마다 캐시/백그라운드 태스크를 따로 가진다. 캐시 크기는 CACHE_MEMORY_BUDGET_MB 를 워커 수로 나눠 계산
+- uvloop / httptools 가 설치돼 있으면 사용 (UVICORN_LOOP / UVICORN_HTTP = auto)
+"""
+import os
+
+import uvicorn
+
+from .workers import WEB_CONCURRENCY
+
+
+def main():
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8001")),
+        workers=WEB_CONCURRENCY,
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        log_level=os.getenv("UVICORN_LOG_LEVEL", "info"),
+        access_log=os.getenv("UVICORN_ACCESS_LOG", "true").lower() == "true",
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+        # 종료 시 처리 중 요청을 기다리는 최대 시간. 이후 shutdown 훅(이벤트 버퍼 flush 등) 실행
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "20")),
+        timeout_keep_alive=int(os.getenv("UVICORN_KEEP_ALIVE", "5")),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출은 첫 호출의 결과(또는 예외)를 함께 받는다
+    - 실제 작업은 별도 태스크로 돌려서, 먼저 온 요청이 취소돼도 기다리던 요청은 영향이 없다
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "inflight": len(self._inflight),
+            # 전체 호출 중 다른 요청의 결과를 공유한 비율
+            "coalescing_ratio": round(self.shared / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+# 이름별 SingleFlight 레지스트리 (지표 노출용)
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_flight(name: str) -> SingleFlight:
+    if name not in _flights:
+        _flights[name] = SingleFlight(name)
+    return _flights[name]
+
+
+def flight_stats() -> Dict[str, dict]:
+    return {name: flight.stats() for name, flight in _flights.items()}
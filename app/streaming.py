@@ -0,0 +1,52 @@
+"""
+대용량 응답 스트리밍 (NDJSON / chunked JSON 배열)
+
+Motor 커서를 batch_size 단위로 읽어 바로 내보내므로, 결과 크기와 상관없이
+메모리에는 배치 하나 분량만 올라간다.
+"""
+import os
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+STREAM_FORMAT_PATTERN = "^(ndjson|json)$"
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+async def iter_batches(cursor, size: int = STREAM_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    batch = []
+    async for doc in cursor.batch_size(size):
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _encode(batches: AsyncIterator[List[Dict[str, Any]]], fmt: str) -> AsyncIterator[bytes]:
+    if fmt == "ndjson":
+        async for batch in batches:
+            yield b"".join(orjson.dumps(item) + b"\n" for item in batch)
+        return
+
+    # json: 배열을 조각으로 나눠 보낸다
+    first = True
+    yield b"["
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = b",".join(orjson.dumps(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+
+def stream_response(batches: AsyncIterator[List[Dict[str, Any]]], fmt: str) -> StreamingResponse:
+    return StreamingResponse(_encode(batches, fmt), media_type=MEDIA_TYPES[fmt])
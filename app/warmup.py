@@ -0,0 +1,60 @@
+"""
+기동 직후 인기 상품 상세 캐시 미리 채우기
+
+새 파드가 첫 트래픽을 전부 Mongo 로 보내지 않도록, 랭킹(인기/조회수) 상위 상품의 상세 응답과
+브랜드 캐시를 채운다. WARMUP_PRODUCTS=0 이면 하지 않음.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .brand_cache import brand_cache
+from .cache import ResponseCache
+from .rankings import RankingStore
+from .serialization import PRODUCT_PROJECTION, combined_product
+
+logger = logging.getLogger("product")
+
+WARMUP_PRODUCTS = int(os.getenv("WARMUP_PRODUCTS", "0"))
+# 랭킹 첫 재계산을 기다리는 최대 시간(초). 넘기면 조회수 순 쿼리로 대신 고른다
+WARMUP_WAIT = float(os.getenv("WARMUP_WAIT", "30"))
+WARMUP_SORTS = ("popular", "most_viewed")
+
+
+async def hot_product_ids(collection: AsyncIOMotorCollection, rankings: RankingStore, limit: int) -> List[int]:
+    deadline = time.monotonic() + WARMUP_WAIT
+    while not rankings.ready and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+    if not rankings.ready:
+        docs = await collection.find({}, {"_id": 0, "id": 1}).sort("view_count", -1).limit(limit) \
+            .to_list(length=limit)
+        return [d["id"] for d in docs]
+
+    ids = {}
+    for sort in WARMUP_SORTS:
+        for key in rankings.get({}, sort).keys[:limit]:
+            ids[key[1]] = None
+    return list(ids)[:limit]
+
+
+async def warm_up(collection: AsyncIOMotorCollection, brand_coll: AsyncIOMotorCollection, cache: ResponseCache,
+                  rankings: RankingStore, ttl: int, limit: int = WARMUP_PRODUCTS):
+    if limit <= 0 or not cache.enabled:
+        return
+    start = time.perf_counter()
+    ids = await hot_product_ids(collection, rankings, limit)
+    warmed = 0
+    for i in range(0, len(ids), 500):
+        products = await collection.find({"id": {"$in": ids[i:i + 500]}}, {**PRODUCT_PROJECTION, "_id": 1}) \
+            .to_list(length=None)
+        brand_map = await brand_cache.get_many(brand_coll, [p.get("brand_id") for p in products])
+        for prod in products:
+            await cache.remember_product_oid(prod.pop("_id"), prod["id"], ttl)
+            await cache.put(cache.product_key(prod["id"]), combined_product(prod, brand_map.get(prod.get("brand_id"))),
+                            ttl)
+        warmed += len(products)
+    logger.info(f"cache_warmup\tproducts={warmed}\telapsed_ms={(time.perf_counter() - start) * 1000:.0f}")
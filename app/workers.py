@@ -0,0 +1,138 @@
+"""
+멀티 워커(프로세스) 모드 지원
+
+- WEB_CONCURRENCY: 파드당 워커 수 (app.server 가 uvicorn workers 로 사용). 캐시는 워커마다 따로 가진다
+  (인메모리 응답 캐시는 change stream 으로 서로의 쓰기를 무효화. 지연 상한은 app/cache.py RESPONSE_CACHE 참고)
+- run_once: Mongo 잠금 문서로 클러스터 전체에서 한 워커만 작업 실행 (인덱스 생성 등)
+- run_once_and_wait: run_once + 잠금을 못 잡은 워커는 잡은 워커의 작업이 끝날 때까지 대기 (기동 시 인덱스 생성)
+- cache_maxsize: CACHE_MEMORY_BUDGET_MB(파드 전체)를 워커 수로 나눈 뒤 캐시별 비율로 항목 수 계산
+- worker_slot: 파일 잠금으로 0..N-1 슬롯을 잡는다. 재기동한 워커가 죽은 워커의 슬롯(저널 파일, change stream 토큰)을 이어받는다
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import socket
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger("product")
+
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+WORKER_SLOT_DIR = os.getenv("WORKER_SLOT_DIR", os.path.join(tempfile.gettempdir(), "product-workers"))
+
+# 파드 전체 인-프로세스 캐시 메모리 예산(MB). 0 이면 캐시별 *_MAXSIZE 기본값
+CACHE_MEMORY_BUDGET_MB = float(os.getenv("CACHE_MEMORY_BUDGET_MB", "0"))
+# 캐시 -> (예산 비율, 항목당 대략 바이트)
+CACHE_BUDGET_SHARES = {
+    "response": (0.5, 4096),
+    "like_sets": (0.25, 2048),
+    "rankings": (0.15, 256),
+    "brand": (0.1, 512),
+}
+
+LEADER_LOCK_COLLECTION = "leader_locks"
+
+_slot: Optional[int] = None
+_slot_fd: Optional[int] = None
+
+
+def cache_maxsize(name: str, env: str, default: int) -> int:
+    """env 가 지정돼 있으면 그 값, 아니면 메모리 예산에서 계산 (예산이 없으면 default)"""
+    value = os.getenv(env)
+    if value:
+        return int(value)
+    if CACHE_MEMORY_BUDGET_MB <= 0:
+        return default
+    share, entry_bytes = CACHE_BUDGET_SHARES[name]
+    per_worker = CACHE_MEMORY_BUDGET_MB * 1024 * 1024 / WEB_CONCURRENCY
+    return max(1, int(per_worker * share / entry_bytes))
+
+
+def worker_slot() -> Optional[int]:
+    """이 워커의 슬롯 번호. 단일 워커면 0, 빈 슬롯이 없으면 None"""
+    global _slot, _slot_fd
+    if WEB_CONCURRENCY == 1:
+        return 0
+    if _slot is not None:
+        return _slot
+    os.makedirs(WORKER_SLOT_DIR, exist_ok=True)
+    for i in range(WEB_CONCURRENCY):
+        fd = os.open(os.path.join(WORKER_SLOT_DIR, f"worker-{i}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            # 프로세스가 죽으면 OS 가 잠금을 풀어 준다
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        _slot, _slot_fd = i, fd
+        return i
+    return None
+
+
+def slot_path(path: str) -> str:
+    """워커별 파일 경로 / 저장 키 (단일 워커면 그대로)"""
+    if WEB_CONCURRENCY == 1:
+        return path
+    slot = worker_slot()
+    if slot is None:
+        # 이전 워커가 아직 종료 중인 경우. 이 파일은 다음 재기동 때 이어받지 못한다
+        logger.warning(f"worker_slot_unavailable\tpid={os.getpid()}")
+        return f"{path}.pid{os.getpid()}"
+    return f"{path}.{slot}"
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def run_once(db: AsyncIOMotorDatabase, name: str, ttl: float,
+                   job: Callable[[], Awaitable[Any]]) -> bool:
+    """
+    잠금을 잡은 워커만 job 실행 후 True. 이미 다른 워커가 잡고 있으면 바로 False
+    - 성공해도 잠금은 ttl 동안 유지 (동시에 뜬 다른 워커/파드가 반복하지 않도록)
+    - job 이 실패하면 잠금을 풀고 예외를 그대로 올린다 (재기동한 워커가 다시 시도)
+    """
+    coll = db[LEADER_LOCK_COLLECTION]
+    owner = _owner()
+    now = datetime.utcnow()
+    try:
+        # 만료된 잠금은 갱신, 없으면 생성. 유효한 잠금이 있으면 upsert 가 _id 중복으로 실패
+        await coll.find_one_and_update(
+            {"_id": name, "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False
+    try:
+        await job()
+    except BaseException:
+        await coll.delete_one({"_id": name, "owner": owner})
+        raise
+    await coll.update_one({"_id": name, "owner": owner}, {"$set": {"done_at": datetime.utcnow()}})
+    return True
+
+
+async def run_once_and_wait(db: AsyncIOMotorDatabase, name: str, ttl: float, job: Callable[[], Awaitable[Any]],
+                            poll: float = 1.0) -> bool:
+    """
+    run_once 와 같지만, 잠금을 못 잡으면 잡은 워커의 job 이 끝날(done_at) 때까지 기다린다
+    - 잡은 워커가 실패해 잠금을 풀었거나 ttl 이 지나 잠금이 만료되면 다시 잡기를 시도
+    - 직접 실행했으면 True, 다른 워커의 완료를 기다렸으면 False
+    """
+    coll = db[LEADER_LOCK_COLLECTION]
+    while True:
+        if await run_once(db, name, ttl, job):
+            return True
+        lock = await coll.find_one({"_id": name}, {"done_at": 1})
+        if lock is not None and lock.get("done_at") is not None:
+            return False
+        if lock is not None:
+            await asyncio.sleep(poll)
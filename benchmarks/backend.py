@@ -0,0 +1,53 @@
+"""
+벤치마크용 Mongo 백엔드 선택
+
+- mongo: app.database 설정(MONGO_* 환경변수) 그대로 사용
+- mock : mongomock-motor 인-프로세스 스탠드인. app.main 을 import 하기 전에 install_mock_backend() 호출
+- 둘 다 앱 로그(LOG_DIR)는 작업 디렉터리가 아니라 임시 디렉터리에 쓴다 (LOG_DIR 을 지정하면 그대로)
+"""
+import os
+import tempfile
+
+
+def use_temp_log_dir():
+    os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="product-logs-"))
+
+
+def install_mock_backend(db_name: str = "bench"):
+    use_temp_log_dir()
+    os.environ.setdefault("MONGO_DB", db_name)
+    # mongomock 은 change stream 미지원
+    os.environ.setdefault("CHANGE_STREAM_ENABLED", "false")
+    from mongomock_motor import AsyncMongoMockClient
+    import mongomock.collection
+
+    # mongomock 의 bulk 빌더는 최신 pymongo 가 넘기는 sort 인자를 모른다
+    original = mongomock.collection.BulkOperationBuilder.add_update
+
+    def add_update(self, *args, sort=None, **kwargs):
+        return original(self, *args, **kwargs)
+
+    mongomock.collection.BulkOperationBuilder.add_update = add_update
+
+    import app.database as database
+
+    client = AsyncMongoMockClient()
+    db = client[db_name]
+    database.client = client
+    database.db = db
+    database.product_collection = db["product"]
+    database.brand_collection = db["brand"]
+    database.likes_coll = db["likes"]
+    database.brand_likes_coll = db["brand_likes"]
+    # 레플리카셋이 없으므로 읽기 핸들도 같은 컬렉션 (mongomock-motor 의 with_options 는 sync 컬렉션을 돌려줌)
+    database.read_product_collection = database.product_collection
+    database.read_likes_coll = database.likes_coll
+    database.read_brand_likes_coll = database.brand_likes_coll
+    return db
+
+
+def mongo_backend():
+    use_temp_log_dir()
+    import app.database as database
+
+    return database.db
@@ -0,0 +1,248 @@
+"""
+엔드포인트 부하 벤치마크
+
+httpx.AsyncClient 를 ASGI 로 앱에 직접 붙여 app/main.py 의 엔드포인트를 동시 요청으로 구동하고,
+엔드포인트별 처리량과 p50/p95/p99 를 JSON 으로 출력한다. 커밋 해시와 설정이 함께 기록되므로
+커밋 간 결과를 비교할 수 있다.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run --backend mock --products 5000 --brands 200 --likes 20000 \
+        --concurrency 32 --requests 2000 --output bench.json
+
+--backend mongo 는 MONGO_* 환경변수로 지정한 실제 Mongo 를 시드 후 사용한다. 대상 컬렉션에 데이터가 있으면
+--drop 을 줘야 지우고 시드한다 (mock 은 항상 새로 만든다).
+실행 중 앱 로그(콘솔 핸들러)는 stderr 로 보내므로 --output 없이도 stdout 은 결과 JSON 만 담는다.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+
+class Scenario(NamedTuple):
+    name: str
+    # (client, rng) -> 응답 코루틴
+    call: Callable
+    # mongomock 이 지원하지 않는 쿼리($text 등)는 mock 백엔드에서 건너뜀
+    needs_real_mongo: bool = False
+
+
+def build_scenarios(cfg) -> List[Scenario]:
+    p, b, u = cfg.products, cfg.brands, cfg.users
+
+    def pid(rng):
+        return rng.randint(1, p)
+
+    def uid(rng):
+        return f"user{rng.randint(1, u)}"
+
+    async def like_cycle(c, rng):
+        id_, user = pid(rng), f"bench{rng.randint(1, 10**9)}"
+        r = await c.post(f"/product/{id_}/like", json={"user_id": user})
+        await c.delete(f"/product/{id_}/like/{user}")
+        return r
+
+    async def brand_like_cycle(c, rng):
+        id_, user = rng.randint(1, b), f"bench{rng.randint(1, 10**9)}"
+        r = await c.post(f"/brand/{id_}/like", json={"user_id": user})
+        await c.delete(f"/brand/{id_}/like/{user}")
+        return r
+
+    etags: Dict[int, str] = {}
+
+    async def conditional_get(c, rng):
+        # 이전에 받은 ETag 로 재검증 (변경이 없으면 304)
+        id_ = pid(rng)
+        r = await c.get(f"/product/{id_}", headers={"if-none-match": etags[id_]} if id_ in etags else None)
+        if r.status_code == 200:
+            etags[id_] = r.headers.get("etag")
+        return r
+
+    async def upsert_cycle(c, rng):
+        id_ = p + rng.randint(1, 10**6)
+        r = await c.post("/product", json={"id": id_, "name": "벤치 상품", "brand_id": 1})
+        await c.put(f"/product/{id_}", json={"id": id_, "name": "벤치 상품 수정"})
+        await c.delete(f"/product/{id_}")
+        return r
+
+    return [
+        Scenario("get_product", lambda c, rng: c.get(f"/product/{pid(rng)}")),
+        Scenario("get_product_conditional", conditional_get),
+        Scenario("list_products", lambda c, rng: c.get("/product", params={"page": rng.randint(1, 5), "size": 20})),
+        Scenario("list_products_filtered", lambda c, rng: c.get("/product", params={
+            "major_category": rng.choice(["top", "bottom", "outer"]), "gender": rng.choice(["M", "F"]), "size": 20})),
+        Scenario("list_products_cursor", lambda c, rng: c.get("/product", params={
+            "cursor": "", "size": 50, "total_mode": "none"})),
+        Scenario("list_products_sorted", lambda c, rng: c.get("/product", params={
+            "sort": rng.choice(["popular", "most_viewed", "best_selling", "discount", "price_asc", "price_desc"]),
+            "major_category": rng.choice([None, "top", "bottom"]), "page": rng.randint(1, 5), "size": 20})),
+        Scenario("product_facets", lambda c, rng: c.get("/product/facets", params={
+            "major_category": rng.choice([None, "top", "bottom", "outer"]), "gender": rng.choice([None, "M", "F"])})),
+        Scenario("trending_products", lambda c, rng: c.get("/product/trending", params={
+            "period": rng.choice(["1h", "24h", "7d"]), "metric": rng.choice(["views", "purchases"])})),
+        Scenario("list_products_search", lambda c, rng: c.get("/product", params={"name": rng.choice(["반팔", "청바지"])}),
+                 needs_real_mongo=True),
+        Scenario("bulk_products", lambda c, rng: c.post("/product/bulk", json={
+            "product_ids": [pid(rng) for _ in range(50)]})),
+        Scenario("liked_products", lambda c, rng: c.get(f"/product/like/count/{uid(rng)}")),
+        Scenario("liked_products_page", lambda c, rng: c.get(f"/product/like/count/{uid(rng)}",
+                                                            params={"limit": 20, "cursor": ""})),
+        Scenario("liked_product_ids", lambda c, rng: c.get(f"/product/like/count/{uid(rng)}",
+                                                          params={"ids_only": "true"})),
+        Scenario("check_liked_products", lambda c, rng: c.get(f"/product/like/check/{uid(rng)}", params={
+            "ids": ",".join(str(pid(rng)) for _ in range(50))})),
+        Scenario("liked_brands", lambda c, rng: c.get(f"/brand/like/count/{uid(rng)}")),
+        Scenario("view_product", lambda c, rng: c.post(f"/product/{pid(rng)}/view", headers={"x-user-id": uid(rng)})),
+        Scenario("purchase_product", lambda c, rng: c.post(f"/product/{pid(rng)}/purchase",
+                                                           headers={"x-user-id": uid(rng)})),
+        Scenario("like_unlike_product", like_cycle),
+        Scenario("like_unlike_brand", brand_like_cycle),
+        Scenario("create_update_delete_product", upsert_cycle),
+        Scenario("ingest_products", lambda c, rng: c.post("/product/ingest", json=[
+            {"id": pid(rng), "price": float(rng.randrange(10_000, 300_000, 100))} for _ in range(100)])),
+        Scenario("export_products", lambda c, rng: c.get("/product/export", params={"brand_id": rng.randint(1, b)})),
+        Scenario("health", lambda c, rng: c.get("/health")),
+        Scenario("metrics", lambda c, rng: c.get("/metrics")),
+    ]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+
+class Measurement(NamedTuple):
+    latencies: List[float]
+    errors: int
+    client_errors: int
+    wall: float
+
+
+async def measure(client, scenario: Scenario, concurrency: int, total: int, seed: int) -> Measurement:
+    latencies: List[float] = []
+    errors = client_errors = 0
+    remaining = total
+
+    async def worker(n: int):
+        nonlocal remaining, errors, client_errors
+        rng = random.Random(seed * 1000 + n)
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            resp = await scenario.call(client, rng)
+            latencies.append(time.perf_counter() - start)
+            # 5xx 는 오류, 4xx(없는 좋아요 등)는 시나리오 상 나올 수 있어 따로 센다
+            if resp.status_code >= 500:
+                errors += 1
+            elif resp.status_code >= 400:
+                client_errors += 1
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return Measurement(latencies, errors, client_errors, time.perf_counter() - wall)
+
+
+def summarize(m: Measurement) -> Dict[str, float]:
+    latencies = sorted(m.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": m.errors,
+        "client_errors": m.client_errors,
+        "rps": round(len(latencies) / m.wall, 1) if m.wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def drive(client, scenario: Scenario, concurrency: int, total: int, seed: int) -> Dict[str, float]:
+    return summarize(await measure(client, scenario, concurrency, total, seed))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(cfg) -> dict:
+    from .backend import install_mock_backend, mongo_backend
+
+    db = install_mock_backend() if cfg.backend == "mock" else mongo_backend()
+
+    import httpx
+    from app.main import app
+    from .seed import seed_catalog
+
+    seeded = await seed_catalog(db, cfg.products, cfg.brands, cfg.likes, cfg.users, seed=cfg.seed,
+                                drop=cfg.drop or cfg.backend == "mock")
+    for handler in app.router.on_startup:
+        await handler()
+
+    results = {}
+    # 처리되지 않은 예외도 500 으로 받아 errors 에 집계
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in build_scenarios(cfg):
+            if cfg.only and scenario.name not in cfg.only:
+                continue
+            if scenario.needs_real_mongo and cfg.backend == "mock":
+                continue
+            # 워밍업 후 측정
+            await drive(client, scenario, cfg.concurrency, min(cfg.warmup, cfg.requests), cfg.seed)
+            results[scenario.name] = await drive(client, scenario, cfg.concurrency, cfg.requests, cfg.seed)
+
+    for handler in app.router.on_shutdown:
+        await handler()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "backend": cfg.backend,
+        "config": {"concurrency": cfg.concurrency, "requests": cfg.requests, "warmup": cfg.warmup,
+                   "seed": cfg.seed, **seeded},
+        "endpoints": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="product service endpoint benchmark")
+    parser.add_argument("--backend", choices=["mock", "mongo"], default="mock")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--brands", type=int, default=100)
+    parser.add_argument("--likes", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="엔드포인트별 측정 요청 수")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="측정할 시나리오 이름")
+    parser.add_argument("--drop", action="store_true", help="--backend mongo 에서 기존 데이터를 지우고 시드")
+    parser.add_argument("--output", help="결과 JSON 파일 (기본: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    cfg = parse_args(argv)
+    # app.main import 시 configure_logging 이 그 시점의 sys.stdout 에 콘솔 핸들러를 붙인다
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(cfg))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if cfg.output:
+        with open(cfg.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+멀티 워커 처리량 확장성 벤치마크
+
+워커 수(WEB_CONCURRENCY)를 바꿔 가며 python -m app.server 를 실제 프로세스로 띄우고, 여러 클라이언트
+프로세스에서 HTTP 로 app/main.py 의 엔드포인트를 구동해 워커 수별 처리량과 1 워커 대비 배율을 출력한다.
+워커가 서로 다른 프로세스라 mongomock 은 쓸 수 없고, MONGO_* 환경변수의 실제 Mongo 를 시드 후 사용한다.
+대상 컬렉션에 데이터가 있으면 --drop 을 줘야 지우고 시드한다.
+
+    python -m benchmarks.scaling --workers 1 2 4 --clients 4 --concurrency 32 --requests 4000 \\
+        --drop --output scaling.json
+
+클라이언트 프로세스 수(--clients)는 부하 생성기가 먼저 포화되지 않도록 서버 워커 수와 비슷하게 둔다.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from .run import Measurement, build_scenarios, git_commit, measure, summarize
+
+# 기본 시나리오: 읽기 위주 (쓰기 시나리오는 워커 수마다 데이터가 달라져 비교가 어렵다)
+DEFAULT_SCENARIOS = [
+    "get_product", "list_products", "list_products_filtered", "list_products_sorted", "product_facets",
+    "bulk_products", "liked_product_ids", "check_liked_products", "trending_products", "view_product", "health",
+]
+
+
+def _client(cfg, index: int, base_url: str, names: List[str], barrier, results):
+    """클라이언트 프로세스: 시나리오마다 다른 클라이언트와 동시에 시작해 측정 결과를 큐로 보낸다"""
+    import httpx
+
+    async def run():
+        scenarios = {s.name: s for s in build_scenarios(cfg)}
+        limits = httpx.Limits(max_connections=cfg.concurrency, max_keepalive_connections=cfg.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for name in names:
+                scenario = scenarios[name]
+                seed = cfg.seed + index
+                await measure(client, scenario, cfg.concurrency, min(cfg.warmup, cfg.requests), seed)
+                barrier.wait()
+                m = await measure(client, scenario, cfg.concurrency, cfg.requests // cfg.clients, seed)
+                results.put((name, tuple(m)))
+
+    asyncio.run(run())
+
+
+def _wait_healthy(base_url: str, proc: subprocess.Popen, timeout: float):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"서버가 기동 중 종료됨 (exit={proc.returncode})")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("서버 기동 시간 초과")
+
+
+def _stop(proc: subprocess.Popen):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_workers(cfg, workers: int, names: List[str]) -> Dict[str, dict]:
+    base_url = f"http://127.0.0.1:{cfg.port}"
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(cfg.port), "HOST": "127.0.0.1",
+           "UVICORN_ACCESS_LOG": "false"}
+    log = open(cfg.server_log, "a") if cfg.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen([sys.executable, "-m", "app.server"], env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        _wait_healthy(base_url, proc, cfg.startup_timeout)
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(cfg.clients)
+        results = ctx.Queue()
+        clients = [ctx.Process(target=_client, args=(cfg, i, base_url, names, barrier, results))
+                   for i in range(cfg.clients)]
+        for c in clients:
+            c.start()
+
+        merged: Dict[str, List[Measurement]] = {name: [] for name in names}
+        pending = cfg.clients * len(names)
+        while pending:
+            try:
+                name, m = results.get(timeout=5)
+            except queue.Empty:
+                if not any(c.is_alive() for c in clients):
+                    raise RuntimeError("클라이언트 프로세스가 결과 없이 종료됨")
+                continue
+            merged[name].append(Measurement(*m))
+            pending -= 1
+        for c in clients:
+            c.join()
+    finally:
+        _stop(proc)
+        if log is not subprocess.DEVNULL:
+            log.close()
+
+    out = {}
+    for name, parts in merged.items():
+        # 클라이언트들이 동시에 시작하므로 가장 늦게 끝난 클라이언트의 경과 시간이 전체 시간
+        out[name] = summarize(Measurement(
+            latencies=[x for m in parts for x in m.latencies],
+            errors=sum(m.errors for m in parts),
+            client_errors=sum(m.client_errors for m in parts),
+            wall=max(m.wall for m in parts),
+        ))
+    return out
+
+
+def run(cfg) -> dict:
+    from .backend import mongo_backend
+    from .seed import seed_catalog
+
+    seeded = asyncio.run(seed_catalog(mongo_backend(), cfg.products, cfg.brands, cfg.likes, cfg.users,
+                                      seed=cfg.seed, drop=cfg.drop))
+    names = cfg.only or DEFAULT_SCENARIOS
+
+    by_workers = {}
+    for workers in cfg.workers:
+        by_workers[str(workers)] = run_workers(cfg, workers, names)
+
+    base = by_workers[str(cfg.workers[0])]
+    speedup = {
+        name: {w: round(r[name]["rps"] / base[name]["rps"], 2) if base[name]["rps"] else None
+               for w, r in by_workers.items()}
+        for name in names
+    }
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "backend": "mongo",
+        "config": {"workers": cfg.workers, "clients": cfg.clients, "concurrency": cfg.concurrency,
+                   "requests": cfg.requests, "warmup": cfg.warmup, "seed": cfg.seed, **seeded},
+        "endpoints": by_workers,
+        "speedup": speedup,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="product service multi-worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="부하 생성 프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=32, help="클라이언트 프로세스당 동시 요청 수")
+    parser.add_argument("--requests", type=int, default=4000, help="엔드포인트별 측정 요청 수 (클라이언트 합계)")
+    parser.add_argument("--warmup", type=int, default=200, help="클라이언트별 워밍업 요청 수")
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--likes", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=18001)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--server-log", help="서버 stdout/stderr 를 덧붙일 파일")
+    parser.add_argument("--only", nargs="*", help="측정할 시나리오 이름")
+    parser.add_argument("--drop", action="store_true", help="기존 데이터를 지우고 시드")
+    parser.add_argument("--output", help="결과 JSON 파일 (기본: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    cfg = parse_args(argv)
+    result = run(cfg)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if cfg.output:
+        with open(cfg.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
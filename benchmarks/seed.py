@@ -0,0 +1,96 @@
+"""
+벤치마크용 카탈로그 시드 (N 상품, M 브랜드, K 좋아요). 같은 seed 면 같은 데이터
+
+시드 전에 대상 컬렉션을 비운다. 이미 데이터가 있으면 drop=True(--drop) 일 때만 지우고, 아니면 SeedRefused
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.search import NGRAM_FIELD, name_ngrams
+
+CATEGORIES = ["top", "bottom", "outer", "shoes", "bag", "acc"]
+GENDERS = ["M", "F", "U"]
+WORDS = ["반팔", "긴팔", "티셔츠", "셔츠", "청바지", "슬랙스", "자켓", "코트", "스니커즈", "백팩", "오버핏", "린넨"]
+
+
+SEEDED_COLLECTIONS = ("product", "brand", "likes", "brand_likes", "product_views", "product_purchases")
+
+
+class SeedRefused(RuntimeError):
+    pass
+
+
+async def seed_catalog(db: AsyncIOMotorDatabase, products: int, brands: int, likes: int, users: int,
+                       seed: int = 42, batch: int = 1000, drop: bool = False) -> Dict[str, int]:
+    rng = random.Random(seed)
+    if not drop:
+        for name in SEEDED_COLLECTIONS:
+            if await db[name].find_one({}, {"_id": 1}) is not None:
+                raise SeedRefused(f"{db.name}.{name} 에 데이터가 있습니다. 지우고 시드하려면 --drop")
+    for name in SEEDED_COLLECTIONS:
+        await db[name].delete_many({})
+
+    await db["brand"].insert_many([
+        {"id": b, "brand_kor": f"브랜드{b}", "brand_eng": f"brand{b}", "like_count": 0}
+        for b in range(1, brands + 1)
+    ])
+
+    docs = []
+    for i in range(1, products + 1):
+        name = " ".join(rng.sample(WORDS, 3)) + f" {i}"
+        price = rng.randrange(10_000, 300_000, 100)
+        discount = rng.choice([0, 0, 10, 20, 30, 50])
+        docs.append({
+            "id": i, "name": name, NGRAM_FIELD: name_ngrams(name),
+            "price": float(price), "discount": float(discount),
+            "discounted_price": float(price * (100 - discount) // 100),
+            "major_category": rng.choice(CATEGORIES), "gender": rng.choice(GENDERS),
+            "sub_category": "sub", "category_code": "000", "img_url": f"https://img.example.com/{i}.jpg",
+            "brand_id": rng.randint(1, brands), "like_count": 0, "view_count": rng.randint(0, 10_000),
+            "purchase_count": rng.randint(0, 1_000), "rank": i,
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+        })
+        if len(docs) >= batch:
+            await db["product"].insert_many(docs)
+            docs = []
+    if docs:
+        await db["product"].insert_many(docs)
+
+    pairs = set()
+    while len(pairs) < min(likes, products * users):
+        pairs.add((rng.randint(1, products), f"user{rng.randint(1, users)}"))
+    like_docs = [{"id": pid, "user_id": uid, "created_at": _liked_at(rng)} for pid, uid in sorted(pairs)]
+    for i in range(0, len(like_docs), batch):
+        await db["likes"].insert_many(like_docs[i:i + batch])
+
+    await _set_like_counts(db["product"], pairs)
+
+    # 브랜드 좋아요는 상품 좋아요의 1/4
+    brand_pairs = set()
+    while len(brand_pairs) < min(likes // 4, brands * users):
+        brand_pairs.add((rng.randint(1, brands), f"user{rng.randint(1, users)}"))
+    brand_like_docs = [{"id": bid, "user_id": uid, "created_at": _liked_at(rng)} for bid, uid in sorted(brand_pairs)]
+    for i in range(0, len(brand_like_docs), batch):
+        await db["brand_likes"].insert_many(brand_like_docs[i:i + batch])
+    await _set_like_counts(db["brand"], brand_pairs)
+
+    return {"products": products, "brands": brands, "likes": len(like_docs),
+            "brand_likes": len(brand_like_docs), "users": users}
+
+
+def _liked_at(rng: random.Random) -> str:
+    # 2024년 중 임의 시각 (좋아요 목록 created_at 정렬용, app.likes.like_timestamp 와 같은 고정 폭)
+    return (datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(366 * 86400))).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+async def _set_like_counts(coll, pairs):
+    counts: Dict[int, int] = {}
+    for target_id, _ in pairs:
+        counts[target_id] = counts.get(target_id, 0) + 1
+    if counts:
+        await coll.bulk_write(
+            [UpdateOne({"id": tid}, {"$set": {"like_count": n}}) for tid, n in counts.items()], ordered=False)
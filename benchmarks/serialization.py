@@ -0,0 +1,83 @@
+"""
+상품 목록 직렬화 비용 비교 (아이템 1개당 µs)
+
+- before: 문서 복사 + CombinedProduct(**data) + response_model 재검증 + json.dumps
+- after : projection 된 문서 + combined_product() dict + orjson.dumps
+
+실행: python -m benchmarks.serialization [--items 100] [--rounds 200]
+"""
+import argparse
+import json
+import time
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas import CombinedProduct, PaginatedProducts
+from app.serialization import PRODUCT_PROJECTION, combined_product
+
+
+def make_docs(n: int):
+    docs = []
+    for i in range(n):
+        docs.append({
+            "_id": f"{i:024x}", "id": i, "name": f"반팔 티셔츠 {i}", "discounted_price": 9900.0,
+            "category_code": "001", "discount": 10.0, "major_category": "top", "gender": "M",
+            "img_url": f"https://img.example.com/{i}.jpg", "like_count": i, "view_count": i * 3,
+            "purchase_count": i // 2, "sub_category": "tshirt", "rank": i, "price": 11000.0,
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z", "brand_id": i % 10,
+            "name_ngrams": ["반팔", "팔티", "티셔", "셔츠"],
+        })
+    return docs
+
+
+BRAND = {"id": 1, "brand_kor": "브랜드", "brand_eng": "brand", "like_count": 100}
+ADAPTER = TypeAdapter(PaginatedProducts)
+
+
+def before(docs):
+    items = []
+    for prod in docs:
+        data = prod.copy()
+        data.update({"brand_kor": BRAND["brand_kor"], "brand_eng": BRAND["brand_eng"],
+                     "brand_like_count": BRAND["like_count"]})
+        items.append(CombinedProduct(**data))
+    page = PaginatedProducts(total=len(items), items=items)
+    # FastAPI response_model 경로: 재검증 후 JSON 호환 dict 로 덤프
+    validated = ADAPTER.validate_python(page, from_attributes=True)
+    return json.dumps(ADAPTER.dump_python(validated, mode="json"), ensure_ascii=False).encode()
+
+
+def after(docs):
+    items = [combined_product(prod, BRAND) for prod in docs]
+    return orjson.dumps({"total": len(items), "items": items, "next_cursor": None})
+
+
+def measure(fn, docs, rounds: int) -> float:
+    fn(docs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(docs)
+    return (time.perf_counter() - start) / rounds / len(docs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_docs(args.items)
+    projected = [{k: d[k] for k in d if k in PRODUCT_PROJECTION and PRODUCT_PROJECTION[k]} for d in docs]
+    result = {
+        "items": args.items,
+        "rounds": args.rounds,
+        "before_us_per_item": round(measure(before, docs, args.rounds), 3),
+        "after_us_per_item": round(measure(after, projected, args.rounds), 3),
+    }
+    result["speedup"] = round(result["before_us_per_item"] / result["after_us_per_item"], 2)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
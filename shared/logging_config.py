@@ -1,21 +1,157 @@
 # File: product/shared/logging_config.py
 
+import atexit
 import logging, sys
-from logging.handlers import WatchedFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, WatchedFileHandler
+from typing import List, Optional
 
+# 큐가 가득 찼을 때 정책
+#   drop_new: 새 레코드를 버림 / drop_old: 가장 오래된 레코드를 버리고 넣음 / block: 빈 자리가 날 때까지 대기
+OVERFLOW_POLICIES = ("drop_new", "drop_old", "block")
 
-def configure_logging(log_file: str):
+
+class BatchWatchedFileHandler(WatchedFileHandler):
+    """
+    여러 레코드를 한 번에 기록하는 WatchedFileHandler
+    - 배치당 os.stat(재열기 확인) 1회 + write 1회 + flush 1회
+    """
+
+    def emit_batch(self, records: List[logging.LogRecord]):
+        self.acquire()
+        try:
+            self.reopenIfNeeded()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write("".join(self.format(r) + self.terminator for r in records))
+            self.stream.flush()
+        except Exception:
+            for r in records:
+                self.handleError(r)
+        finally:
+            self.release()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """크기 제한 큐에 넣는 QueueHandler. 넘치면 overflow 정책대로 처리하고 카운트"""
+
+    def __init__(self, q: "queue.Queue", overflow: str = "drop_new"):
+        super().__init__(q)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.overflow = overflow
+        self.enqueued = 0
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.overflow == "block":
+            self.queue.put(record)
+            self.enqueued += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "drop_new":
+                self.dropped += 1
+                return
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return
+        self.enqueued += 1
+
+
+class BatchQueueListener:
+    """
+    큐를 비우는 백그라운드 스레드
+    - 한 번 깨어날 때 최대 batch_size 개를 모아 핸들러에 전달 (emit_batch 가 있으면 한 번에 기록)
+    """
+
+    _sentinel = None
+
+    def __init__(self, q: "queue.Queue", handlers: List[logging.Handler], batch_size: int = 1):
+        self.queue = q
+        self.handlers = handlers
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.batches = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name="log-queue-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """남은 레코드를 모두 기록하고 스레드 종료"""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def _dispatch(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            if hasattr(handler, "emit_batch") and len(records) > 1:
+                handler.emit_batch(records)
+            else:
+                for r in records:
+                    handler.handle(r)
+        self.written += len(records)
+        self.batches += 1
+
+    def _monitor(self):
+        stopping = False
+        while True:
+            records = []
+            if not stopping:
+                record = self.queue.get()
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    records.append(record)
+            while len(records) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stopping = True
+                    continue
+                records.append(record)
+            if records:
+                self._dispatch(records)
+            elif stopping:
+                return
+
+
+_queue_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[BatchQueueListener] = None
+
+
+def configure_logging(log_file: str, queue_mode: bool = False, queue_size: int = 10000,
+                      overflow: str = "drop_new", batch_size: int = 1) -> Optional[BatchQueueListener]:
     """
     표준 logging 사용 + 외부 cron log_rotate.sh와 호환 가능한 WatchedFileHandler 설정
     - 탭(\t) 구분 포맷으로 asctime, levelname, message 기록
+    - queue_mode=True 면 요청 처리 스레드는 큐에 넣기만 하고, 파일/콘솔 기록은 리스너 스레드가 담당
+      (queue_size 로 크기 제한, overflow 정책, batch_size 단위 일괄 기록)
     """
+    global _queue_handler, _listener
+
     fmt = logging.Formatter(
         "%(asctime)s\t%(levelname)s\t%(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
 
     # 1) 파일 핸들러 (외부에서 파일을 비워도 자동 재열기)
-    fh = WatchedFileHandler(log_file, encoding="utf-8")
+    fh = BatchWatchedFileHandler(log_file, encoding="utf-8")
     fh.setFormatter(fmt)
 
     # 2) 콘솔 핸들러
@@ -25,5 +161,28 @@ def configure_logging(log_file: str):
     # 3) 루트 로거 설정
     root = logging.getLogger()
     root.setLevel(logging.INFO)
-    root.addHandler(fh)
-    root.addHandler(ch)
\ No newline at end of file
+    if not queue_mode:
+        root.addHandler(fh)
+        root.addHandler(ch)
+        return None
+
+    q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    _queue_handler = BoundedQueueHandler(q, overflow=overflow)
+    _listener = BatchQueueListener(q, [fh, ch], batch_size=batch_size)
+    _listener.start()
+    atexit.register(_listener.stop)
+    root.addHandler(_queue_handler)
+    return _listener
+
+
+def log_queue_stats() -> dict:
+    if _queue_handler is None or _listener is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": _queue_handler.queue.qsize(),
+        "enqueued": _queue_handler.enqueued,
+        "dropped": _queue_handler.dropped,
+        "written": _listener.written,
+        "batches": _listener.batches,
+    }
@@ -0,0 +1,29 @@
+"""
+pytest 공용 fixture
+
+- Mongo 는 mongomock-motor 인-프로세스 스탠드인 (benchmarks.backend 와 같은 설정). app 모듈은 import 시점의
+  컬렉션을 잡으므로 여기서 먼저 한 번 바꿔 두고, 테스트마다 컬렉션을 비운다
+- 비동기 테스트는 anyio pytest 플러그인(@pytest.mark.anyio)으로 asyncio 위에서 실행
+
+    pip install -r requirements.txt -r tests/requirements.txt
+    python -m pytest -q
+"""
+import pytest
+
+from benchmarks.backend import install_mock_backend
+
+install_mock_backend("test")
+
+import app.database as database  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    for name in await database.db.list_collection_names():
+        await database.db.drop_collection(name)
+    return database.db
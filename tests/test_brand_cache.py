@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.brand_cache import BrandCache
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowBrands:
+    """find() 시점의 문서를 release 될 때까지 붙잡고 있는 brand 컬렉션"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    def find(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length=None):
+        self.calls += 1
+        snapshot = [dict(d) for d in self.docs]
+        self.started.set()
+        await self.release.wait()
+        return snapshot
+
+
+async def test_misses_are_cached():
+    coll = SlowBrands([{"id": 1, "like_count": 0}])
+    coll.release.set()
+    cache = BrandCache(ttl=60, maxsize=10)
+
+    assert await cache.get_many(coll, [1, 2]) == {1: {"id": 1, "like_count": 0}}
+    assert await cache.get_many(coll, [1, 2]) == {1: {"id": 1, "like_count": 0}}
+    assert coll.calls == 1
+
+
+async def test_invalidate_during_fetch_does_not_cache_the_old_document():
+    coll = SlowBrands([{"id": 1, "like_count": 0}])
+    cache = BrandCache(ttl=60, maxsize=10)
+    fetch = asyncio.create_task(cache.get(coll, 1))
+    await coll.started.wait()
+
+    coll.docs[0]["like_count"] = 1
+    cache.invalidate(1)
+    coll.release.set()
+
+    assert (await fetch)["like_count"] == 0
+    assert (await cache.get(coll, 1))["like_count"] == 1
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+import app.cache as cache_module
+from app.cache import KEY_PREFIX, MemoryBackend, ResponseCache, build_response_cache
+
+pytestmark = pytest.mark.anyio
+
+
+def counting_loader(value):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return value
+
+    return load, calls
+
+
+async def test_hit_returns_cached_text_without_loading():
+    cache = ResponseCache(MemoryBackend())
+    load, calls = counting_loader({"id": 1, "name": "상품"})
+    key = cache.product_key(1)
+
+    first = await cache.get_or_load_text(key, 30, load)
+    second = await cache.get_or_load_text(key, 30, load)
+
+    assert first == second == '{"id":1,"name":"상품"}'
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_none_is_not_cached():
+    cache = ResponseCache(MemoryBackend())
+    load, calls = counting_loader(None)
+
+    assert await cache.get_or_load_text(cache.product_key(1), 30, load) is None
+    assert await cache.get_or_load_text(cache.product_key(1), 30, load) is None
+    assert len(calls) == 2
+
+
+async def test_invalidate_product_drops_detail_entry():
+    cache = ResponseCache(MemoryBackend())
+    key = cache.product_key(7)
+    await cache.get_or_load_text(key, 30, counting_loader({"v": 1})[0])
+
+    await cache.invalidate_product(7)
+
+    assert await cache.get_or_load_text(key, 30, counting_loader({"v": 2})[0]) == '{"v":2}'
+
+
+async def test_invalidate_products_drops_only_given_ids():
+    cache = ResponseCache(MemoryBackend())
+    for id in (1, 2, 3):
+        await cache.put(cache.product_key(id), {"id": id}, 30)
+
+    await cache.invalidate_products([1, 3])
+
+    assert await cache.backend.get(cache.product_key(1)) is None
+    assert await cache.backend.get(cache.product_key(2)) == '{"id":2}'
+    assert await cache.backend.get(cache.product_key(3)) is None
+
+
+async def test_invalidate_lists_moves_every_list_key_to_a_new_generation():
+    cache = ResponseCache(MemoryBackend())
+    params = {"major_category": "top", "page": 1}
+    key = await cache.list_key("list", params)
+    await cache.get_or_load_text(key, 15, counting_loader({"items": [1]})[0])
+
+    await cache.invalidate_lists()
+    new_key = await cache.list_key("list", params)
+
+    assert new_key != key
+    assert await cache.get_or_load_text(new_key, 15, counting_loader({"items": [2]})[0]) == '{"items":[2]}'
+
+
+async def test_list_generation_is_shared_through_the_backend(monkeypatch):
+    backend = MemoryBackend()
+    a, b = ResponseCache(backend), ResponseCache(backend)
+    params = {"gender": "F"}
+    before = await b.list_key("list", params)
+
+    await a.invalidate_lists()
+    # 로컬에 들고 있는 세대 값은 CACHE_GEN_LOCAL_TTL 동안 유지된다
+    assert await b.list_key("list", params) == before
+
+    monkeypatch.setattr(cache_module, "CACHE_GEN_LOCAL_TTL", 0)
+    b._gen = None
+    assert await b.list_key("list", params) == await a.list_key("list", params) != before
+
+
+async def test_params_hash_ignores_empty_values_and_order():
+    assert ResponseCache.params_hash({"a": 1, "b": None, "c": ""}) == ResponseCache.params_hash({"a": 1})
+    assert ResponseCache.params_hash({"a": 1, "b": 2}) == ResponseCache.params_hash({"b": 2, "a": 1})
+
+
+async def test_disabled_cache_always_loads():
+    cache = ResponseCache(MemoryBackend(), enabled=False)
+    load, calls = counting_loader({"v": 1})
+
+    await cache.get_or_load_text("k", 30, load)
+    await cache.get_or_load_text("k", 30, load)
+
+    assert len(calls) == 2
+    assert await cache.backend.get("k") is None
+
+
+async def test_memory_backend_evicts_oldest_key():
+    backend = MemoryBackend(maxsize=2)
+    for key in ("a", "b", "c"):
+        await backend.set(key, key)
+
+    assert await backend.get("a") is None
+    assert await backend.get("c") == "c"
+
+
+async def test_memory_backend_never_evicts_the_list_generation():
+    cache = ResponseCache(MemoryBackend(maxsize=2))
+    await cache.invalidate_lists()
+    for key in ("a", "b", "c"):
+        await cache.backend.set(key, key)
+
+    assert await cache.backend.get(f"{KEY_PREFIX}:list-gen") == "1"
+
+
+async def test_list_fill_reads_from_primary_right_after_invalidation(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_PRIMARY_READ_WINDOW", 0.05)
+    cache = ResponseCache(MemoryBackend())
+    assert cache.read_from_primary() is False
+
+    await cache.invalidate_lists()
+    assert cache.read_from_primary() is True
+    await asyncio.sleep(0.06)
+    assert cache.read_from_primary() is False
+
+
+async def test_multi_worker_memory_cache_requires_change_stream():
+    # 명시한 memory 는 기동 실패, 기본값이면 캐시를 끈다
+    with pytest.raises(RuntimeError):
+        build_response_cache(None, change_stream=False, mode="memory", workers=2)
+    assert build_response_cache(None, change_stream=False, mode="", workers=2).enabled is False
+
+    assert build_response_cache(None, change_stream=True, mode="", workers=2).enabled is True
+    assert build_response_cache(None, change_stream=False, mode="", workers=1).enabled is True
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import OperationFailure, PyMongoError
+from starlette.requests import Request
+
+from app import changes
+from app.cache import MemoryBackend, ResponseCache
+from app.changes import ChangeStreamConsumer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_reset_is_retried_before_consuming_again(db, monkeypatch):
+    monkeypatch.setattr(changes, "CHANGE_STREAM_RETRY_DELAY", 0)
+    consumer = ChangeStreamConsumer(db, name="test")
+    calls = []
+
+    async def consume():
+        calls.append("consume")
+        if calls.count("consume") == 1:
+            raise OperationFailure("history lost", code=286)
+        await asyncio.Event().wait()
+
+    async def rebuild():
+        calls.append("reset")
+        if calls.count("reset") == 1:
+            raise PyMongoError("rebuild failed")
+
+    consumer._consume = consume
+    consumer.reset_handlers.append(rebuild)
+    consumer.start()
+    for _ in range(20):
+        await asyncio.sleep(0)
+    task = consumer._task
+    await consumer.stop()
+
+    # 리셋이 실패해도 태스크가 죽지 않고, 리셋이 성공한 뒤에만 스트림을 다시 연다
+    assert calls == ["consume", "reset", "reset", "consume"]
+    assert consumer.resets == 2
+    assert task.cancelled()
+
+
+async def test_delete_without_pre_image_invalidates_cached_detail(db, monkeypatch):
+    import app.main as main
+
+    cache = ResponseCache(MemoryBackend())
+    monkeypatch.setattr(main, "response_cache", cache)
+    await db["product"].insert_one({"id": 7, "name": "상품"})
+    request = Request({"type": "http", "method": "GET", "path": "/product/7", "headers": []})
+    await main.get_product(request, 7, db["product"], db["brand"])
+    assert await cache.backend.get(cache.product_key(7)) is not None
+
+    oid = (await db["product"].find_one({"id": 7}))["_id"]
+    await db["product"].delete_one({"id": 7})
+    # pre-image 가 없으면 삭제 이벤트에는 documentKey._id 만 있다
+    await main._on_product_change({"operationType": "delete", "ns": {"coll": "product"}, "documentKey": {"_id": oid}})
+
+    assert await cache.backend.get(cache.product_key(7)) is None
+
+
+async def test_saved_token_has_a_date_for_the_ttl_index(db):
+    consumer = ChangeStreamConsumer(db, name="test")
+    consumer._token = {"_data": "token"}
+    await consumer._save_token()
+
+    doc = await db[changes.TOKEN_COLLECTION].find_one({})
+    assert doc["token"] == {"_data": "token"}
+    assert isinstance(doc["updated_at"], datetime)
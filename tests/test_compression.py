@@ -0,0 +1,32 @@
+import zlib
+
+import pytest
+
+from app.compression import GzipResponder
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_streamed_gzip_chunks_are_decodable_as_they_arrive():
+    chunks = [b'{"id": 1}\n' * 200, b'{"id": 2}\n' * 200]
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await GzipResponder(app, minimum_size=10, level=5)({"type": "http"}, None, send)
+
+    start, first, last = sent
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # 다음 청크를 받기 전에 첫 청크가 전부 풀린다
+    assert decoder.decompress(first["body"]) == chunks[0]
+    assert decoder.decompress(last["body"]) == chunks[1]
+    assert decoder.eof
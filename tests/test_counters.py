@@ -0,0 +1,186 @@
+import asyncio
+import os
+
+import pytest
+
+from app.counters import CounterTarget, LikeCounter
+
+pytestmark = pytest.mark.anyio
+
+
+def make_counter(db, tmp_path, **kwargs) -> LikeCounter:
+    counter = LikeCounter({"product": CounterTarget(db["product"], db["likes"])},
+                          journal_path=str(tmp_path / "likes.journal"), **kwargs)
+    counter.reconcile_settle = 0
+    return counter
+
+
+async def like_counts(db):
+    return {d["id"]: d["like_count"] async for d in db["product"].find({}, {"_id": 0})}
+
+
+async def test_journal_replay_recovers_unflushed_and_in_flight_deltas(db, tmp_path):
+    await db["product"].insert_many([{"id": i, "like_count": 0} for i in (1, 2, 3)])
+    journal = tmp_path / "likes.journal"
+    # 이전 프로세스: flush 도중(.flushing)과 그 뒤에 쌓인 델타, 크래시로 잘린 마지막 줄
+    (tmp_path / "likes.journal.flushing").write_text("product\t1\t2\nproduct\t2\t1\n")
+    journal.write_text("product\t1\t1\nproduct\t2\t-1\nproduct\t3\t1\nproduct\t3")
+
+    counter = make_counter(db, tmp_path)
+    counter._replay_journal()
+
+    assert (counter.pending("product", 1), counter.pending("product", 2), counter.pending("product", 3)) == (3, 0, 1)
+    assert not os.path.exists(tmp_path / "likes.journal.flushing")
+    # 합쳐서 압축한 저널 (0 인 키는 빠진다)
+    assert sorted(journal.read_text().splitlines()) == ["product\t1\t3", "product\t3\t1"]
+
+    await counter.flush()
+    assert await like_counts(db) == {1: 3, 2: 0, 3: 1}
+    assert journal.read_text() == ""
+
+
+async def test_add_is_journaled_until_flushed(db, tmp_path):
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+    counter = make_counter(db, tmp_path)
+    counter._replay_journal()
+
+    counter.add("product", 1, 1)
+    counter.add("product", 1, 1)
+    # 기록은 저널 스레드가 한다
+    await counter._journal.sync()
+    assert (tmp_path / "likes.journal").read_text() == "product\t1\t1\nproduct\t1\t1\n"
+
+    # 재기동 시 저널에서 복구
+    restarted = make_counter(db, tmp_path)
+    restarted._replay_journal()
+    assert restarted.pending("product", 1) == 2
+
+
+async def test_journal_lines_added_during_flush_go_to_the_new_journal(db, tmp_path):
+    await db["product"].insert_many([{"id": 1, "like_count": 0}, {"id": 2, "like_count": 0}])
+    counter = make_counter(db, tmp_path)
+    counter._replay_journal()
+    products = counter.targets["product"].collection
+    bulk_write = products.bulk_write
+    writing = asyncio.Event()
+
+    async def slow_bulk_write(*args, **kwargs):
+        writing.set()
+        await asyncio.sleep(0.05)
+        return await bulk_write(*args, **kwargs)
+
+    products.bulk_write = slow_bulk_write
+    counter.add("product", 1, 1)
+    flush = asyncio.ensure_future(counter.flush())
+    await writing.wait()
+    counter.add("product", 2, 1)
+    await counter._journal.sync()
+    # flush 중인 델타는 .flushing 에, 그 뒤 델타는 새 저널에
+    assert (tmp_path / "likes.journal.flushing").read_text() == "product\t1\t1\n"
+    assert (tmp_path / "likes.journal").read_text() == "product\t2\t1\n"
+
+    await flush
+    assert not os.path.exists(tmp_path / "likes.journal.flushing")
+    await counter.stop()
+    assert (tmp_path / "likes.journal").read_text() == ""
+    assert await like_counts(db) == {1: 1, 2: 1}
+
+
+async def test_flush_keeps_deltas_it_could_not_write(db, tmp_path):
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+    counter = make_counter(db, tmp_path, shards=1)
+    counter._replay_journal()
+    counter.add("product", 1, 1)
+    counter.add("unknown", 5, 2)
+
+    with pytest.raises(KeyError):
+        await counter.flush()
+
+    # 기록하지 못한 델타는 메모리와 새 저널에 다시 합쳐진다
+    assert counter.pending("unknown", 5) == 2
+    assert "unknown\t5\t2" in (tmp_path / "likes.journal").read_text()
+    assert not os.path.exists(tmp_path / "likes.journal.flushing")
+
+
+async def test_listener_error_does_not_stop_flush(db, tmp_path):
+    await db["product"].insert_many([{"id": 1, "like_count": 0}, {"id": 2, "like_count": 0}])
+    counter = make_counter(db, tmp_path)
+    notified = []
+
+    def broken(target, ids):
+        raise RuntimeError("listener")
+
+    counter.listeners += [broken, lambda target, ids: notified.extend(ids)]
+    counter.add("product", 1, 1)
+    counter.add("product", 2, 1)
+    await counter.flush()
+
+    assert await like_counts(db) == {1: 1, 2: 1}
+    assert sorted(notified) == [1, 2]
+    assert counter.stats()["listener_errors"] >= 1
+    assert counter.stats()["pending_keys"] == 0
+
+
+async def test_reconcile_fixes_drift_with_compare_and_set(db, tmp_path):
+    await db["product"].insert_many([
+        {"id": 1, "like_count": 5},  # 실제 2
+        {"id": 2, "like_count": 0},  # 실제 1
+        {"id": 3, "like_count": 1},  # 정상
+    ])
+    await db["likes"].insert_many([
+        {"id": 1, "user_id": "a"}, {"id": 1, "user_id": "b"}, {"id": 2, "user_id": "a"}, {"id": 3, "user_id": "c"},
+    ])
+    counter = make_counter(db, tmp_path)
+
+    assert await counter.reconcile() == 2
+    assert await like_counts(db) == {1: 2, 2: 1, 3: 1}
+    assert await counter.reconcile() == 0
+
+
+async def test_reconcile_skips_products_that_changed_while_settling(db, tmp_path):
+    await db["product"].insert_one({"id": 1, "like_count": 5})
+    await db["likes"].insert_one({"id": 1, "user_id": "a"})
+    counter = make_counter(db, tmp_path)
+    counter.reconcile_settle = 0.2
+
+    task = asyncio.ensure_future(counter.reconcile())
+    await asyncio.sleep(0.05)
+    # 후보를 다시 확인하기 전에 다른 워커의 flush 가 들어온 경우
+    await db["product"].update_one({"id": 1}, {"$inc": {"like_count": 1}})
+
+    assert await task == 0
+    assert await like_counts(db) == {1: 6}
+    assert counter.stats()["reconcile_conflicts"] == 1
+
+
+async def test_reconcile_runs_in_one_worker_per_interval(db, tmp_path):
+    await db["product"].insert_one({"id": 1, "like_count": 3})
+    first, second = make_counter(db, tmp_path), make_counter(db, tmp_path)
+
+    assert await first.reconcile_once() is True
+    assert await second.reconcile_once() is False
+    assert await like_counts(db) == {1: 0}
+
+
+async def test_concurrent_flushes_do_not_share_the_flushing_journal(db, tmp_path):
+    await db["product"].insert_many([{"id": 1, "like_count": 0}, {"id": 2, "like_count": 0}])
+    counter = make_counter(db, tmp_path)
+    counter._replay_journal()
+    products = counter.targets["product"].collection
+    bulk_write = products.bulk_write
+
+    async def slow_bulk_write(*args, **kwargs):
+        # 첫 flush 가 쓰는 도중 두 번째 flush 와 새 델타가 들어오게
+        await asyncio.sleep(0.01)
+        return await bulk_write(*args, **kwargs)
+
+    products.bulk_write = slow_bulk_write
+    counter.add("product", 1, 1)
+    first = asyncio.ensure_future(counter.flush())
+    await asyncio.sleep(0)
+    counter.add("product", 2, 1)
+
+    assert await asyncio.gather(first, counter.flush()) == [None, None]
+    assert await like_counts(db) == {1: 1, 2: 1}
+    assert not os.path.exists(tmp_path / "likes.journal.flushing")
+    assert (tmp_path / "likes.journal").read_text() == ""
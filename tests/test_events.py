@@ -0,0 +1,147 @@
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.events import EVENT_TIME_FIELD, EventBuffer, EventSink
+
+pytestmark = pytest.mark.anyio
+
+
+def make_buffer(db, **kwargs):
+    products = db["product"]
+    buffer = EventBuffer(products, {
+        "view": EventSink(db["product_views"], "view_count", "viewed_at"),
+        "purchase": EventSink(db["product_purchases"], "purchase_count", "purchased_at"),
+    }, flush_interval=0.01, **kwargs)
+    return buffer, products
+
+
+def fail_times(coll, n):
+    """coll.bulk_write 를 n 번 실패시킨다 (primary step-down 흉내)"""
+    bulk_write = coll.bulk_write
+    left = [n]
+
+    async def flaky(*args, **kwargs):
+        if left[0]:
+            left[0] -= 1
+            raise AutoReconnect("primary stepped down")
+        return await bulk_write(*args, **kwargs)
+
+    coll.bulk_write = flaky
+
+
+async def counts(db, id):
+    doc = await db["product"].find_one({"id": id})
+    return doc.get("view_count", 0), doc.get("purchase_count", 0)
+
+
+async def test_flush_writes_raw_events_and_counters_in_one_batch(db):
+    await db["product"].insert_many([{"id": 1}, {"id": 2}])
+    buffer, _ = make_buffer(db)
+    batches = []
+    buffer.listeners.append(batches.append)
+
+    await buffer.record("view", 1, "a")
+    await buffer.record("view", 1, "b")
+    await buffer.record("purchase", 2, "a")
+    await buffer._drain()
+
+    assert await counts(db, 1) == (2, 0)
+    assert await counts(db, 2) == (0, 1)
+    view = await db["product_views"].find_one({"user_id": "a"})
+    assert view["product_id"] == 1 and view["viewed_at"].endswith("Z") and view[EVENT_TIME_FIELD] is not None
+    assert [len(b) for b in batches] == [3]
+
+
+async def test_failed_batch_is_retried_without_duplicate_raw_events(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, products = make_buffer(db)
+    fail_times(products, 2)
+
+    for user in ("a", "b", "c"):
+        await buffer.record("purchase", 1, user)
+    await buffer._drain()
+    await buffer._drain()
+    assert await counts(db, 1) == (0, 0)
+
+    await buffer._drain()
+    assert await counts(db, 1) == (0, 3)
+    assert await db["product_purchases"].count_documents({}) == 3
+    assert buffer.stats()["flush_errors"] == 2
+    assert buffer.stats()["failed_events"] == 0
+
+
+async def test_new_batches_wait_behind_a_failed_one(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, products = make_buffer(db, flush_size=1)
+    fail_times(products, 1)
+
+    await buffer.record("view", 1, "a")
+    await buffer.record("view", 1, "b")
+    await buffer._drain()
+    assert buffer.stats()["queued"] == 1
+
+    await buffer._drain()
+    assert await counts(db, 1) == (2, 0)
+
+
+async def test_batch_is_discarded_after_max_retries(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, products = make_buffer(db, max_retries=1)
+    fail_times(products, 2)
+
+    await buffer.record("view", 1, "a")
+    await buffer._drain()
+    await buffer._drain()
+    await buffer._drain()
+
+    assert await counts(db, 1) == (0, 0)
+    assert buffer.stats()["failed_events"] == 1
+
+
+async def test_listener_error_does_not_stop_other_listeners(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, _ = make_buffer(db)
+    seen = []
+
+    def broken(batch):
+        raise RuntimeError("listener")
+
+    buffer.listeners += [broken, seen.extend]
+    await buffer.record("view", 1, "a")
+    await buffer._drain()
+
+    assert len(seen) == 1
+    assert buffer.stats()["listener_errors"] == 1
+
+
+async def test_stop_flushes_remaining_events(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, _ = make_buffer(db)
+    buffer.start()
+    await buffer.record("view", 1, "a")
+    await buffer.stop()
+
+    assert await counts(db, 1) == (1, 0)
+
+
+async def test_stop_counts_events_it_could_not_write(db):
+    await db["product"].insert_one({"id": 1})
+    buffer, products = make_buffer(db, flush_size=1)
+    fail_times(products, 100)
+
+    await buffer.record("view", 1, "a")
+    await buffer.record("view", 1, "b")
+    await buffer.stop()
+
+    assert buffer.stats()["failed_events"] == 2
+    assert buffer.stats()["queued"] == 0
+
+
+async def test_full_queue_drops_after_enqueue_timeout(db):
+    buffer, _ = make_buffer(db, max_size=1, enqueue_timeout=0.01)
+
+    await buffer.record("view", 1, "a")
+    await buffer.record("view", 1, "b")
+
+    assert buffer.stats()["dropped"] == 1
+    assert buffer.stats()["enqueued"] == 1
@@ -0,0 +1,69 @@
+import pytest
+from starlette.requests import Request
+
+from app.compression import CompressionMiddleware
+from app.http_cache import conditional_response, make_etag
+
+pytestmark = pytest.mark.anyio
+
+BODY = '{"id":1,"like_count":0,"updated_at":"2024-01-01T00:00:00Z"}'
+
+
+def request(**headers):
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/product/1", "headers": raw})
+
+
+def test_matching_if_none_match_returns_304_without_body():
+    etag = make_etag(BODY.encode())
+
+    response = conditional_response(request(if_none_match=etag), BODY, "product")
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+
+def test_changed_counter_changes_the_etag():
+    etag = make_etag(BODY.encode())
+    liked = BODY.replace('"like_count":0', '"like_count":1')
+
+    response = conditional_response(request(if_none_match=etag), liked, "product")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_if_modified_since_alone_never_returns_304():
+    # 카운터는 updated_at 을 바꾸지 않으므로 날짜만으로는 변경 여부를 알 수 없다
+    response = conditional_response(request(if_modified_since="Fri, 01 Jan 2100 00:00:00 GMT"), BODY, "product")
+
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
+
+
+async def run_middleware(accept_encoding, body):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    await CompressionMiddleware(app, minimum_size=100)({"type": "http", "headers": headers}, None, send)
+    return dict(sent[0]["headers"])
+
+
+@pytest.mark.parametrize("accept_encoding, body", [
+    ("gzip", b"x" * 1000),  # 압축
+    ("gzip", b"x"),  # 작아서 그대로
+    (None, b"x" * 1000),  # 압축을 받지 않는 클라이언트
+])
+async def test_every_response_varies_on_accept_encoding(accept_encoding, body):
+    headers = await run_middleware(accept_encoding, body)
+
+    assert headers[b"vary"] == b"Accept-Encoding"
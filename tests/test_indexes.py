@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.indexes import INDEX_SPECS, LEGACY_INDEXES, IndexSpec, ensure_indexes, index_setup_fingerprint
+from app.workers import run_once_and_wait
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_ensure_indexes_replaces_baseline_single_field_indexes(db):
+    await db["product"].create_index([("major_category", 1)], name="idx_major_category")
+    await db["product"].create_index([("gender", 1)], name="idx_gender")
+
+    await ensure_indexes(db)
+
+    product = await db["product"].index_information()
+    assert not set(LEGACY_INDEXES["product"]) & set(product)
+    assert "idx_category_gender_brand_id" in product
+    likes = await db["likes"].index_information()
+    assert likes["idx_like_user_created"]["key"] == [("user_id", 1), ("created_at", -1), ("id", 1)]
+
+
+def test_fingerprint_changes_when_index_specs_change():
+    added = INDEX_SPECS + [IndexSpec("product", [("created_at", -1)], {"name": "idx_created"})]
+
+    assert index_setup_fingerprint() == index_setup_fingerprint(INDEX_SPECS)
+    assert index_setup_fingerprint(added) != index_setup_fingerprint()
+
+
+async def test_workers_wait_for_the_leaders_index_build(db):
+    release = asyncio.Event()
+    order = []
+
+    async def build():
+        await release.wait()
+        await ensure_indexes(db)
+        order.append("built")
+
+    async def worker(name):
+        leader = await run_once_and_wait(db, "ensure_indexes:test", 60, build, poll=0.01)
+        # 대기한 워커도 인덱스가 생긴 뒤에야 기동을 마친다
+        order.append(name)
+        return leader
+
+    leader = asyncio.ensure_future(worker("leader"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(worker("follower"))
+    await asyncio.sleep(0.05)
+    assert not follower.done()
+
+    release.set()
+    assert await asyncio.gather(leader, follower) == [True, False]
+    assert order[0] == "built"
+    assert "uniq_like_id_user" in await db["likes"].index_information()
+
+
+async def test_waiting_worker_takes_over_when_the_leader_fails(db):
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("index build failed")
+
+    async def build():
+        pass
+
+    leader = asyncio.ensure_future(run_once_and_wait(db, "ensure_indexes:test", 60, failing, poll=0.01))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(run_once_and_wait(db, "ensure_indexes:test", 60, build, poll=0.01))
+    await asyncio.sleep(0.02)
+    release.set()
+
+    with pytest.raises(RuntimeError):
+        await leader
+    assert await follower is True
@@ -0,0 +1,107 @@
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.ingest import _INVALID, BulkIngestor, iter_ndjson
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def ingest(coll, items, **kwargs):
+    ingestor = BulkIngestor(coll, **kwargs)
+    for index, item in enumerate(items):
+        await ingestor.add(index, item)
+    return await ingestor.finish()
+
+
+async def test_ndjson_lines_split_across_chunks(db):
+    parsed = [item async for item in iter_ndjson(chunks(b'{"id": 1}\n\n{"id"', b': 2}\nnot json\n{"id": 3}'))]
+
+    # 빈 줄은 건너뛰고, 잘린 줄은 다음 조각과 합치고, 마지막 줄은 줄바꿈 없이도 읽는다
+    assert parsed == [(0, {"id": 1}), (1, {"id": 2}), (2, _INVALID), (3, {"id": 3})]
+
+
+async def test_invalid_items_are_reported_and_valid_ones_written(db):
+    items = [{"id": 1, "name": "상품1"}, _INVALID, {"name": "id 없음"}, {"id": 2, "price": "비쌈"}, [1, 2],
+             {"id": 3, "name": "상품3"}]
+
+    result = await ingest(db["product"], items, batch_size=2)
+
+    assert (result["received"], result["inserted"], result["failed"]) == (6, 2, 4)
+    assert [(e["index"], e["id"]) for e in result["errors"]] == [(1, None), (2, None), (3, 2), (4, None)]
+    assert result["errors"][0]["error"] == "invalid json"
+    assert result["errors"][2]["error"].startswith("price:")
+    assert sorted([d["id"] async for d in db["product"].find({})]) == [1, 3]
+
+
+async def test_upsert_keeps_existing_counters_and_fills_new_products(db):
+    await db["product"].insert_one({"id": 1, "name": "예전", "like_count": 7, "view_count": 3,
+                                    "created_at": "2024-01-01T00:00:00Z"})
+    written = []
+
+    async def on_batch(ids):
+        written.append(sorted(ids))
+
+    result = await ingest(db["product"], [{"id": 1, "name": "새 이름"}, {"id": 2, "name": "신상품", "like_count": None}],
+                          on_batch=on_batch)
+
+    assert (result["inserted"], result["updated"], result["failed"]) == (1, 1, 0)
+    assert written == [[1, 2]]
+    old = await db["product"].find_one({"id": 1})
+    assert (old["name"], old["like_count"], old["view_count"], old["created_at"]) == ("새 이름", 7, 3,
+                                                                                      "2024-01-01T00:00:00Z")
+    new = await db["product"].find_one({"id": 2})
+    # null 로 온 정렬 필드와 빠진 정렬 필드 모두 0
+    assert (new["like_count"], new["view_count"], new["purchase_count"]) == (0, 0, 0)
+    assert new["created_at"] == new["updated_at"]
+
+
+async def test_insert_mode_leaves_existing_products_alone(db):
+    await db["product"].insert_one({"id": 1, "name": "예전", "like_count": 7})
+
+    result = await ingest(db["product"], [{"id": 1, "name": "덮어쓰기"}, {"id": 2, "name": "신상품"}], mode="insert")
+
+    assert (result["inserted"], result["updated"], result["failed"]) == (1, 0, 0)
+    assert (await db["product"].find_one({"id": 1}))["name"] == "예전"
+    assert (await db["product"].find_one({"id": 2}))["like_count"] == 0
+
+
+async def test_unordered_batch_writes_past_a_failed_item(db):
+    await db["product"].create_index("name", unique=True)
+    await db["product"].insert_one({"id": 9, "name": "중복"})
+    written = []
+
+    async def on_batch(ids):
+        written.extend(ids)
+
+    result = await ingest(db["product"], [{"id": 1, "name": "a"}, {"id": 2, "name": "중복"}, {"id": 3, "name": "b"}],
+                          on_batch=on_batch)
+
+    # 가운데 항목만 실패하고 나머지는 기록, 무효화는 기록된 id 만
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert [(e["index"], e["id"]) for e in result["errors"]] == [(1, 2)]
+    assert sorted(written) == [1, 3]
+    assert result["batches"] == [{**result["batches"][0], "items": 3, "failed": 1}]
+
+
+async def test_failed_batch_marks_every_item_and_skips_invalidation(db, monkeypatch):
+    coll = db["product"]
+    written = []
+
+    async def broken(*args, **kwargs):
+        raise AutoReconnect("primary stepped down")
+
+    async def on_batch(ids):
+        written.extend(ids)
+
+    monkeypatch.setattr(coll, "bulk_write", broken)
+    result = await ingest(coll, [{"id": 1}, {"id": 2}, {"id": 3}], batch_size=2, on_batch=on_batch)
+
+    assert result["failed"] == 3
+    assert [e["id"] for e in result["errors"]] == [1, 2, 3]
+    assert [b["failed"] for b in result["batches"]] == [2, 1]
+    assert written == []
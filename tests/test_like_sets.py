@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from app.like_sets import LikeSetCache
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowLikes:
+    """find() 시점의 스냅샷을 release 될 때까지 붙잡고 있는 likes 컬렉션"""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    def find(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length=None):
+        snapshot = [{"id": i} for i in self.ids]
+        self.started.set()
+        await self.release.wait()
+        return snapshot
+
+
+async def test_like_during_cold_load_is_kept_locally():
+    cache = LikeSetCache()
+    coll = SlowLikes([1])
+    load = asyncio.create_task(cache.get("product", coll, "u1"))
+    await coll.started.wait()
+
+    coll.ids.append(2)
+    await cache.add("product", "u1", 2)
+    coll.release.set()
+
+    assert await load == {1, 2}
+    assert await cache.get("product", coll, "u1") == {1, 2}
+
+
+async def test_like_on_another_worker_during_cold_load_does_not_leave_a_stale_redis_set():
+    redis = FakeAsyncRedis(decode_responses=True)
+    loading, other = LikeSetCache(redis=redis), LikeSetCache(redis=redis)
+    coll = SlowLikes([1])
+    load = asyncio.create_task(loading.get("product", coll, "u1"))
+    await coll.started.wait()
+
+    # 다른 워커의 좋아요: Mongo 기록 후 Redis 키 무효화
+    coll.ids.append(2)
+    await other.add("product", "u1", 2)
+    coll.release.set()
+    await load
+
+    assert loading.redis_conflicts == 1
+    assert not await redis.exists(LikeSetCache.redis_key("product", "u1"))
+    coll.release.set()
+    assert await other.get("product", coll, "u1") == {1, 2}
+
+
+async def test_cold_load_is_shared_through_redis():
+    redis = FakeAsyncRedis(decode_responses=True)
+    first, second = LikeSetCache(redis=redis), LikeSetCache(redis=redis)
+    coll = SlowLikes([1, 3])
+    coll.release.set()
+
+    assert await first.get("product", coll, "u1") == {1, 3}
+    coll.ids = []
+    assert await second.get("product", coll, "u1") == {1, 3}
+    assert second.redis_hits == 1
@@ -0,0 +1,190 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.likes as likes_module
+from app.counters import CounterTarget, LikeCounter
+from app.indexes import ensure_indexes
+from app.likes import LIKED_CURSOR_SORT, AlreadyLiked, LikeNotFound, TargetNotFound, add_like, liked_page, \
+    like_timestamp, remove_like, toggle_like
+from app.pagination import decode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+async def pages(coll, user_id, limit):
+    seen, after = [], None
+    while True:
+        docs, next_cursor = await liked_page(coll, user_id, limit, after)
+        seen.append([d["id"] for d in docs])
+        if next_cursor is None:
+            return seen
+        after = decode_cursor(next_cursor, LIKED_CURSOR_SORT)
+
+
+async def test_liked_pages_are_newest_first_and_reach_undated_legacy_likes(db):
+    await db["likes"].insert_many([
+        {"id": 1, "user_id": "u", "created_at": "2024-01-01T00:00:00.000000Z"},
+        {"id": 2, "user_id": "u", "created_at": "2024-01-01T00:00:00.500000Z"},
+        {"id": 3, "user_id": "u", "created_at": "2024-01-02T00:00:00.000000Z"},
+        {"id": 4, "user_id": "u", "created_at": "2024-01-02T00:00:00.000000Z"},
+        # created_at 없는 예전 기록
+        {"id": 7, "user_id": "u"},
+        {"id": 5, "user_id": "u"},
+        {"id": 6, "user_id": "u"},
+        {"id": 9, "user_id": "other", "created_at": "2024-01-03T00:00:00.000000Z"},
+    ])
+
+    assert await pages(db["likes"], "u", 2) == [[3, 4], [2, 1], [5, 6], [7]]
+
+
+def test_like_timestamps_sort_as_strings_in_time_order():
+    stamp = like_timestamp()
+
+    assert len(stamp) == len("2024-01-01T00:00:00.000000Z")
+    assert stamp.endswith("Z")
+
+
+async def test_unpaged_liked_ids_keep_storage_order(db):
+    from app.main import liked_ids
+
+    await db["likes"].insert_many([
+        {"id": 2, "user_id": "u", "created_at": "2024-01-01T00:00:00.000000Z"},
+        {"id": 1, "user_id": "u", "created_at": "2024-01-02T00:00:00.000000Z"},
+        {"id": 3, "user_id": "u"},
+    ])
+
+    assert await liked_ids(db["likes"], "u", None, None) == ([2, 1, 3], None)
+
+
+async def like_state(db, id):
+    product = await db["product"].find_one({"id": id})
+    return product["like_count"] if product else None, await db["likes"].count_documents({"id": id})
+
+
+async def test_like_and_unlike_keep_record_and_counter_together(db):
+    await ensure_indexes(db)
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+
+    await add_like(db["likes"], db["product"], 1, "u")
+    assert await like_state(db, 1) == (1, 1)
+    with pytest.raises(AlreadyLiked):
+        await add_like(db["likes"], db["product"], 1, "u")
+    assert await like_state(db, 1) == (1, 1)
+
+    await remove_like(db["likes"], db["product"], 1, "u")
+    assert await like_state(db, 1) == (0, 0)
+    with pytest.raises(LikeNotFound):
+        await remove_like(db["likes"], db["product"], 1, "u")
+    assert await like_state(db, 1) == (0, 0)
+
+
+async def test_concurrent_duplicate_likes_count_once(db):
+    await ensure_indexes(db)
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+
+    results = await asyncio.gather(*(add_like(db["likes"], db["product"], 1, "u") for _ in range(5)),
+                                   return_exceptions=True)
+
+    assert sum(r is None for r in results) == 1
+    assert all(isinstance(r, AlreadyLiked) for r in results if r is not None)
+    assert await like_state(db, 1) == (1, 1)
+
+
+async def test_missing_target_undoes_the_like_record_without_transactions(db):
+    await ensure_indexes(db)
+
+    with pytest.raises(TargetNotFound):
+        await add_like(db["likes"], db["product"], 404, "u")
+    assert await db["likes"].count_documents({}) == 0
+
+    # 상품이 사라진 뒤의 취소는 지운 좋아요 기록을 되돌린다
+    await db["likes"].insert_one({"id": 404, "user_id": "u", "created_at": "2024-01-01T00:00:00.000000Z"})
+    with pytest.raises(TargetNotFound):
+        await remove_like(db["likes"], db["product"], 404, "u")
+    restored = await db["likes"].find_one({"id": 404}, {"_id": 0})
+    assert restored == {"id": 404, "user_id": "u", "created_at": "2024-01-01T00:00:00.000000Z"}
+
+
+class FakeSession:
+    """with_transaction 이 예외 시 abort 하는 것만 흉내낸다 (mongomock 은 트랜잭션이 없다)"""
+
+    def __init__(self):
+        self.aborted = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, op):
+        try:
+            return await op(self)
+        except BaseException:
+            self.aborted = True
+            raise
+
+
+class SessionRecorder:
+    """세션을 여는 client 와 각 호출에 넘어온 session 을 기록하는 컬렉션 래퍼"""
+
+    def __init__(self, coll, session: FakeSession):
+        self._coll = coll
+        self.sessions = []
+
+        async def start_session():
+            return session
+
+        self.database = SimpleNamespace(client=SimpleNamespace(start_session=start_session))
+
+    def __getattr__(self, name):
+        method = getattr(self._coll, name)
+
+        def call(*args, **kwargs):
+            self.sessions.append(kwargs.pop("session", None))
+            return method(*args, **kwargs)
+
+        return call
+
+
+async def test_transaction_path_aborts_instead_of_compensating(db, monkeypatch):
+    monkeypatch.setattr(likes_module, "MONGO_USE_TRANSACTIONS", True)
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+    session = FakeSession()
+    likes, products = SessionRecorder(db["likes"], session), SessionRecorder(db["product"], session)
+
+    await add_like(likes, products, 1, "u")
+    assert likes.sessions == products.sessions == [session]
+    assert not session.aborted
+
+    # 대상이 없으면 보상 쓰기 없이 예외로 abort (기록은 트랜잭션이 되돌린다)
+    with pytest.raises(TargetNotFound):
+        await add_like(likes, products, 404, "u")
+    assert session.aborted
+    assert likes.sessions == [session, session]
+
+
+async def test_buffered_like_defers_the_counter_and_skips_duplicates(db):
+    await ensure_indexes(db)
+    await db["product"].insert_one({"id": 1, "like_count": 0})
+    counter = LikeCounter({"product": CounterTarget(db["product"], db["likes"])})
+
+    await toggle_like(True, db["likes"], db["product"], counter, "product", 1, "u")
+    with pytest.raises(AlreadyLiked):
+        await toggle_like(True, db["likes"], db["product"], counter, "product", 1, "u")
+    with pytest.raises(TargetNotFound):
+        await toggle_like(True, db["likes"], db["product"], counter, "product", 404, "u")
+    assert counter.pending("product", 1) == 1
+    assert await db["likes"].count_documents({}) == 1
+    # like_count 는 flush 때 반영
+    assert await like_state(db, 1) == (0, 1)
+
+    await toggle_like(False, db["likes"], db["product"], counter, "product", 1, "u")
+    with pytest.raises(LikeNotFound):
+        await toggle_like(False, db["likes"], db["product"], counter, "product", 1, "u")
+    assert counter.pending("product", 1) == 0
+
+    await counter.flush()
+    assert await like_state(db, 1) == (0, 0)
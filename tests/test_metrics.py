@@ -0,0 +1,33 @@
+from app import metrics
+
+
+def test_collectors_render_numbers_nested_dicts_and_strings():
+    metrics.register_collector("test_component", lambda: {
+        "hits": 3, "enabled": True, "mode": "buffered", "idle_seconds": None, "by_kind": {"view": 2},
+    })
+    try:
+        lines = metrics.render().splitlines()
+    finally:
+        metrics._collectors.pop("test_component")
+
+    assert "product_test_component_hits 3.0" in lines
+    assert "product_test_component_enabled 1.0" in lines
+    assert 'product_test_component_mode{value="buffered"} 1.0' in lines
+    assert 'product_test_component_view{name="by_kind"} 2.0' in lines
+    assert "# TYPE product_test_component_hits gauge" in lines
+    assert not any(line.startswith("product_test_component_idle_seconds") for line in lines)
+
+
+def test_collector_series_sharing_a_metric_are_grouped_under_one_type_line():
+    metrics.register_collector("test_flights", lambda: {
+        "a": {"calls": 1, "shared": 0}, "b": {"calls": 2, "shared": 1},
+    })
+    try:
+        lines = metrics.render().splitlines()
+    finally:
+        metrics._collectors.pop("test_flights")
+
+    start = lines.index("# TYPE product_test_flights_calls gauge")
+    assert lines[start + 1:start + 3] == [
+        'product_test_flights_calls{name="a"} 1.0', 'product_test_flights_calls{name="b"} 2.0']
+    assert lines.count("# TYPE product_test_flights_calls gauge") == 1
@@ -0,0 +1,86 @@
+import base64
+import json
+
+import httpx
+import pytest
+
+from app.cache import MemoryBackend, ResponseCache
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+def forge(payload) -> str:
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == (None, 42)
+    assert decode_cursor(encode_cursor(42, "popular", 17), "popular") == (17, 42)
+    assert decode_cursor(encode_cursor(42, "price_asc", 9.5), "price_asc") == (9.5, 42)
+    assert decode_cursor(encode_cursor(42, "created_at", "2024-01-01T00:00:00.000000Z"), "created_at") == \
+        ("2024-01-01T00:00:00.000000Z", 42)
+    # 빈 토큰은 첫 페이지
+    assert decode_cursor("") is None
+    # 패딩 없는 base64url 이라 쿼리 문자열에 그대로 쓸 수 있다
+    assert "=" not in encode_cursor(1, "popular", 1) and "+" not in encode_cursor(10 ** 12)
+
+
+@pytest.mark.parametrize("token", [
+    "not a cursor!",
+    "%%%",
+    forge([1, 2]),
+    forge({"id": "1"}),
+    forge({"id": None}),
+    forge({"id": True}),
+    forge({"v": 3}),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    encode_cursor(1)[:-2],
+])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_cursor_from_another_sort_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(1, "popular", 3), "price_asc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(1, "popular", 3))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(1), "popular")
+    # 정렬 값이 객체/불리언으로 바뀐 토큰
+    for value in ({"$gt": 0}, [1], None, True):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(forge({"id": 1, "s": "popular", "v": value}), "popular")
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    import app.main as main
+
+    monkeypatch.setattr(main, "response_cache", ResponseCache(MemoryBackend(), enabled=False))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_list_cursor_pages_cover_every_product_once(db, client):
+    await db["product"].insert_many([{"id": i, "name": f"상품{i}", "major_category": "top"} for i in range(1, 8)])
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        res = await client.get("/product", params={"major_category": "top", "size": 3, "cursor": cursor})
+        assert res.status_code == 200
+        body = res.json()
+        seen.append([p["id"] for p in body["items"]])
+        cursor = body["next_cursor"]
+
+    assert seen == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+async def test_list_rejects_tampered_cursor_with_400(db, client):
+    for cursor in ("garbage", forge({"id": "1"}), encode_cursor(1, "popular", 3)):
+        res = await client.get("/product", params={"cursor": cursor})
+        assert res.status_code == 400
@@ -0,0 +1,228 @@
+import pytest
+
+from app.pagination import decode_cursor
+from app.rankings import Ranking, RankingStore, _TopN, backfill_sort_fields, rank_key, rank_value
+
+pytestmark = pytest.mark.anyio
+
+
+def keys(*ids):
+    return [(float(i), i) for i in ids]
+
+
+def test_offer_past_limit_drops_worst_and_marks_truncated():
+    ranking = Ranking(3, keys(1, 2, 3), truncated=False)
+
+    ranking.offer((0.5, 9))
+
+    assert ranking.keys == [(0.5, 9), (1.0, 1), (2.0, 2)]
+    assert ranking.truncated
+    assert 3 not in ranking.by_id
+
+
+def test_truncated_ranking_ignores_keys_beyond_its_tail():
+    ranking = Ranking(3, keys(1, 2, 3), truncated=True)
+
+    # 리스트 밖 상품이 마지막 키보다 나쁘면 순서를 알 수 없으므로 넣지 않는다
+    ranking.offer((9.0, 9))
+
+    assert ranking.keys == keys(1, 2, 3)
+
+
+def test_untruncated_ranking_accepts_tail_keys():
+    ranking = Ranking(5, keys(1, 2), truncated=False)
+
+    ranking.offer((9.0, 9))
+
+    assert ranking.keys[-1] == (9.0, 9)
+
+
+def test_page_past_truncated_tail_needs_the_database():
+    ranking = Ranking(3, keys(1, 2, 3), truncated=True)
+
+    assert ranking.page(0, 3) == keys(1, 2, 3)
+    assert ranking.page(2, 2) is None
+    assert ranking.page_after((1.0, 1), 2) == keys(2, 3)
+    assert ranking.page_after((2.0, 2), 2) is None
+
+
+def test_page_past_untruncated_tail_is_short():
+    ranking = Ranking(10, keys(1, 2), truncated=False)
+
+    assert ranking.page(1, 5) == keys(2)
+    assert ranking.page(5, 5) == []
+
+
+def test_remove_frees_a_slot():
+    ranking = Ranking(3, keys(1, 2, 3), truncated=True)
+
+    ranking.remove(2)
+
+    assert ranking.keys == keys(1, 3)
+    assert 2 not in ranking.by_id
+
+
+def test_topn_keeps_best_keys_and_reports_truncation():
+    top = _TopN(2)
+    for key in keys(5, 1, 4, 2):
+        top.push(key)
+
+    ranking = top.ranking()
+    assert ranking.keys == keys(1, 2)
+    assert ranking.truncated
+
+    exact = _TopN(5)
+    for key in keys(3, 1):
+        exact.push(key)
+    assert not exact.ranking().truncated
+
+
+def test_rank_key_round_trips_descending_values():
+    key = rank_key("popular", 7, 3)
+    assert key == (-7, 3)
+    assert rank_value("popular", key) == 7
+    assert rank_key("price_asc", 100, 3) == (100, 3)
+
+
+async def test_store_serves_top_pages_and_falls_back_past_the_list(db):
+    await db["product"].insert_many([
+        {"id": i, "like_count": i, "major_category": "top" if i % 2 else "bottom", "gender": "F", "brand_id": 1}
+        for i in range(1, 11)
+    ])
+    store = RankingStore(db["product"], size=3)
+    await store.rebuild()
+
+    assert [k[1] for k in store.page_keys({}, "popular", 0, 3)] == [10, 9, 8]
+    assert [k[1] for k in store.page_keys({"major_category": "top"}, "popular", 0, 2)] == [9, 7]
+    # 상위 3 개 밖은 랭킹만으로 알 수 없다
+    assert store.page_keys({}, "popular", 2, 3) is None
+    # 유지하지 않는 범위 조합
+    assert store.page_keys({"major_category": "top", "brand_id": 1}, "popular", 0, 3) is None
+
+
+async def test_store_applies_dirty_products_incrementally(db):
+    await db["product"].insert_many([
+        {"id": i, "like_count": i, "major_category": "top", "gender": "F", "brand_id": 1} for i in range(1, 6)
+    ])
+    store = RankingStore(db["product"], size=3)
+    await store.rebuild()
+
+    await db["product"].update_one({"id": 1}, {"$set": {"like_count": 100}})
+    await db["product"].delete_one({"id": 5})
+    store.mark_dirty([1, 5])
+    await store.apply_dirty()
+
+    assert [k[1] for k in store.page_keys({}, "popular", 0, 2)] == [1, 4]
+
+
+async def test_store_keeps_attrs_only_for_listed_products(db):
+    await db["product"].insert_many([
+        {"id": i, "like_count": i, "view_count": i, "purchase_count": i, "discount": i, "discounted_price": i * 1000,
+         "major_category": "top", "gender": "F", "brand_id": 1}
+        for i in range(1, 11)
+    ])
+    store = RankingStore(db["product"], size=3)
+    await store.rebuild()
+
+    # 싼 순 1~3, 나머지 정렬은 8~10
+    assert set(store._attrs) == {1, 2, 3, 8, 9, 10}
+
+    # 새로 들어온 상품이 리스트 끝 상품을 밀어내면 밀려난 상품의 값도 버린다
+    await db["product"].update_one({"id": 5}, {"$set": {"like_count": 100, "view_count": 100, "purchase_count": 100,
+                                                        "discount": 100, "discounted_price": 100000}})
+    store.mark_dirty([5])
+    await store.apply_dirty()
+
+    assert set(store._attrs) == {1, 2, 3, 5, 9, 10}
+
+
+async def test_store_trims_lists_to_the_entry_budget(db):
+    await db["product"].insert_many([
+        {"id": i, "like_count": i, "major_category": "top", "gender": "F", "brand_id": 1} for i in range(1, 11)
+    ])
+    store = RankingStore(db["product"], size=5, max_entries=0)
+    await store.rebuild()
+    lists = store.stats()["lists"]
+
+    budgeted = RankingStore(db["product"], size=5, max_entries=lists * 2)
+    await budgeted.rebuild()
+
+    assert budgeted.stats()["entries"] == lists * 2
+    assert [k[1] for k in budgeted.page_keys({}, "popular", 0, 2)] == [10, 9]
+    assert budgeted.page_keys({}, "popular", 0, 3) is None
+
+
+async def test_periodic_rebuild_is_staggered_across_workers(db):
+    await db["product"].insert_one({"id": 1, "like_count": 1, "major_category": "top", "gender": "F", "brand_id": 1})
+    first = RankingStore(db["product"], size=3, rebuild_stagger=60)
+    second = RankingStore(db["product"], size=3, rebuild_stagger=60)
+
+    # 첫 구성은 워커마다 바로
+    assert await first._rebuild_staggered()
+    assert await second._rebuild_staggered()
+    assert second.ready
+
+    # 이후 재계산은 잠금을 잡은 한 워커만
+    assert await first._rebuild_staggered()
+    assert not await second._rebuild_staggered()
+
+
+def test_rebuild_stagger_is_capped_by_the_interval():
+    # 워커 수 x 간격이 재계산 주기를 넘지 않도록 (기본 비율 0.05 면 20 워커까지)
+    store = RankingStore(None, rebuild_interval=600, rebuild_stagger=120)
+    assert store.rebuild_stagger == 30
+    assert RankingStore(None, rebuild_interval=600, rebuild_stagger=10).rebuild_stagger == 10
+
+
+async def test_cursor_pages_include_never_liked_products(db):
+    from app.main import create_product, sorted_page
+    from app.schemas import ProductBase
+
+    for i in range(1, 8):
+        await create_product(ProductBase(id=i, name=f"상품{i}", **({"like_count": 5} if i == 2 else {})), db["product"])
+
+    # 랭킹 없이 DB 폴백 (filters=None) 으로 커서를 끝까지 따라간다
+    seen, last = [], None
+    while True:
+        products, next_cursor = await sorted_page(db["product"], {}, None, "popular", 1, 3, True, last)
+        seen.extend(p["id"] for p in products)
+        if next_cursor is None:
+            break
+        last = decode_cursor(next_cursor, "popular")
+
+    assert seen == [2, 1, 3, 4, 5, 6, 7]
+
+
+async def test_backfill_sort_fields_sets_missing_counters_to_zero(db):
+    await db["product"].insert_many([{"id": 1}, {"id": 2, "like_count": 3, "view_count": None}])
+
+    await backfill_sort_fields(db["product"])
+
+    docs = await db["product"].find({}, {"_id": 0}).sort("id", 1).to_list(length=None)
+    assert docs[0] == {"id": 1, "like_count": 0, "view_count": 0, "purchase_count": 0, "discount": 0,
+                       "discounted_price": 0}
+    assert docs[1]["like_count"] == 3 and docs[1]["view_count"] == 0
+
+
+async def test_cursor_pages_continue_past_ranked_products_missing_from_mongo(db, monkeypatch):
+    import app.main as main
+
+    await db["product"].insert_many([
+        {"id": i, "like_count": i, "major_category": "top", "gender": "F", "brand_id": 1} for i in range(1, 7)
+    ])
+    store = RankingStore(db["product"], size=10)
+    await store.rebuild()
+    monkeypatch.setattr(main, "rankings", store)
+    # 랭킹에는 남아 있지만 Mongo 에서는 지워진 상품
+    await db["product"].delete_many({"id": {"$in": [5, 4]}})
+
+    seen, last = [], None
+    while True:
+        products, next_cursor = await main.sorted_page(db["product"], {}, {}, "popular", 1, 2, True, last)
+        seen.extend(p["id"] for p in products)
+        if next_cursor is None:
+            break
+        last = decode_cursor(next_cursor, "popular")
+
+    assert seen == [6, 3, 2, 1]
+    assert {4, 5} <= store._dirty
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from app.events import EVENT_TIME_FIELD
+from app.rollups import HOURLY_COLLECTION, RollupWriter, backfill
+
+pytestmark = pytest.mark.anyio
+
+SINKS = {"view": ("product_views", "viewed_at")}
+
+
+async def test_backfill_stops_on_rollup_failure_and_reaggregates_on_rerun(db, monkeypatch):
+    await db["product_views"].insert_many([
+        {"product_id": 1, "viewed_at": "2024-01-01T10:15:00Z"},
+        {"product_id": 1, "viewed_at": "2024-01-01T10:45:00Z"},
+    ])
+    apply = RollupWriter.apply
+
+    async def failing(self, batch):
+        raise AutoReconnect("primary stepped down")
+
+    monkeypatch.setattr(RollupWriter, "apply", failing)
+    with pytest.raises(AutoReconnect):
+        await backfill(db, SINKS)
+
+    # 버킷에 들어가지 않은 이벤트는 처리됨으로 표시하지 않는다
+    assert await db["product_views"].count_documents({EVENT_TIME_FIELD: {"$exists": True}}) == 0
+
+    monkeypatch.setattr(RollupWriter, "apply", apply)
+    assert await backfill(db, SINKS) == 2
+    assert await backfill(db, SINKS) == 0
+
+    bucket = await db[HOURLY_COLLECTION].find_one({"product_id": 1})
+    assert bucket["bucket"] == datetime(2024, 1, 1, 10)
+    assert bucket["views"] == 2
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("t")
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"id": 1}
+
+    waiters = [asyncio.ensure_future(flight.do("k", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats()["shared"] == 4
+    assert flight.stats()["inflight"] == 0
+
+
+async def test_different_keys_run_separately():
+    flight = SingleFlight("t")
+
+    async def load(v):
+        await asyncio.sleep(0)
+        return v
+
+    assert await asyncio.gather(flight.do("a", lambda: load(1)), flight.do("b", lambda: load(2))) == [1, 2]
+    assert flight.stats()["shared"] == 0
+
+
+async def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight("t")
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+    # 실패한 호출은 남지 않으므로 다음 호출은 다시 실행된다
+    async def ok():
+        return "ok"
+
+    assert await flight.do("k", ok) == "ok"
+
+
+async def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("t")
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return 42
+
+    first = asyncio.ensure_future(flight.do("k", load))
+    second = asyncio.ensure_future(flight.do("k", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == 42
+    with pytest.raises(asyncio.CancelledError):
+        await first